@@ -1,33 +1,121 @@
-from django.contrib import admin
+import datetime
 
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.utils import unquote
+from django.db.models import Prefetch
+from django.template.response import TemplateResponse
+
+from . import loans, search
+from .forms import BulkLoanForm
 from .models import Author, Genre, Book, BookInstance
+from .pagination import EstimatedCountPaginator
 
 #admin.site.register(Book)
 #admin.site.register(Author)
-admin.site.register(Genre)
 #admin.site.register(BookInstance)
 
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    # search_fields lo requiere el autocompletado de Book.genre
+    search_fields = ['name']
+
+
 class AuthorAdmin(admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    search_fields = ['last_name', 'first_name']
+    # Por author_last_name_idx (last_name, id), sin ordenar en memoria.
+    ordering = ['last_name', 'pk']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 # Register the admin class with the associated model
 admin.site.register(Author, AuthorAdmin)
 
 class BooksInstanceInline(admin.TabularInline):
+    """
+    Ejemplares del libro de a ``per_page`` por página (?copies_page=N), plegados: un libro
+    con miles de copias no las carga todas en el formulario. La plantilla enlaza a la
+    lista de ejemplares filtrada por el libro.
+    """
     model = BookInstance
-    
+    template = 'admin/catalog/book/copies_inline.html'
+    fields = ('imprint', 'status', 'due_back', 'borrower')
+    autocomplete_fields = ['borrower']
+    classes = ['collapse']
+    extra = 0
+    show_change_link = True
+    per_page = 20
+    page_param = 'copies_page'
+
+    def get_page_number(self, request):
+        try:
+            return max(int(request.GET.get(self.page_param, 1)), 1)
+        except ValueError:
+            return 1
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        self.page = self.get_page_number(request)
+        self.has_previous = self.page > 1
+        self.has_next = False
+        object_id = request.resolver_match.kwargs.get('object_id') if request.resolver_match else None
+        if object_id is None:
+            return queryset
+        # Los pk de la página primero (una fila extra indica si hay siguiente): el formset
+        # filtra el queryset por el libro y no admite uno ya recortado.
+        offset = (self.page - 1) * self.per_page
+        ids = list(
+            queryset.filter(book_id=unquote(object_id)).order_by('pk')
+            .values_list('pk', flat=True)[offset:offset + self.per_page + 1]
+        )
+        self.has_next = len(ids) > self.per_page
+        # El título del libro aparece en cada fila (BookInstance.__str__).
+        return queryset.filter(pk__in=ids[:self.per_page]).select_related('book').order_by('pk')
+
+
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'display_genre')
+    # Autor en el mismo JOIN; géneros precargados en get_queryset (display_genre)
+    list_select_related = ('author',)
+    autocomplete_fields = ['author', 'genre']
+    search_fields = ['title']
+    search_limit = 500
+    # Por el índice del pk; también ordena los resultados del autocompletado.
+    ordering = ['-pk']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     inlines = [BooksInstanceInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('genre', queryset=Genre.objects.only('id', 'name'))
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        # Índice de texto completo (catalog/search.py) en lugar de LIKE '%...%' sobre el
+        # título; también lo usa el autocompletado de BookInstance.book.
+        if not search_term:
+            return queryset, False
+        ids = search.search(search_term, limit=self.search_limit, using=queryset.db)
+        return queryset.filter(pk__in=ids), False
+
 # Register the Admin classes for BookInstance using the decorator
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    list_select_related = ('book', 'borrower')
+    autocomplete_fields = ['book', 'borrower']
+    # Por bookinst_status_due_idx: el orden de Meta (due_back y el pk como desempate) obliga a
+    # recorrer y ordenar toda la tabla para mostrar cada página.
+    ordering = ['status', 'due_back', 'id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {
             'fields': ('book', 'imprint', 'id')
@@ -36,3 +124,54 @@ class BookInstanceAdmin(admin.ModelAdmin):
             'fields': ('status', 'due_back', 'borrower')
         }),
     )
+    actions = ['renew_loans', 'return_loans']
+
+    def has_mark_returned_permission(self, request):
+        return request.user.has_perm('catalog.can_mark_returned')
+
+    def selected_copy_ids(self, request, queryset):
+        """
+        pks de la selección, o None (con un mensaje) si pasa de BulkLoanForm.MAX_COPIES: con
+        "seleccionar todos" podría ser la tabla entera.
+        """
+        copy_ids = list(queryset.order_by().values_list('pk', flat=True)[:BulkLoanForm.MAX_COPIES + 1])
+        if len(copy_ids) > BulkLoanForm.MAX_COPIES:
+            self.message_user(
+                request, 'Seleccione como mucho %d ejemplares.' % BulkLoanForm.MAX_COPIES, messages.ERROR,
+            )
+            return None
+        return copy_ids
+
+    def apply_bulk_loan_form(self, request, form):
+        if form.is_valid():
+            self.message_user(request, form.save())
+            return True
+        return False
+
+    @admin.action(description='Renovar los préstamos seleccionados', permissions=['mark_returned'])
+    def renew_loans(self, request, queryset):
+        # Página intermedia con la fecha, como delete_selected; el POST de confirmación trae "apply".
+        copy_ids = self.selected_copy_ids(request, queryset)
+        if copy_ids is None:
+            return None
+        data = {'copies': copy_ids, 'action': 'renew', 'renewal_date': request.POST.get('renewal_date')}
+        form = BulkLoanForm(data if 'apply' in request.POST else None, initial={
+            'renewal_date': datetime.date.today() + loans.LOAN_PERIOD,
+        })
+        if self.apply_bulk_loan_form(request, form):
+            return None
+        return TemplateResponse(request, 'admin/catalog/bookinstance/renew_loans.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Renovar préstamos',
+            'opts': self.model._meta,
+            'form': form,
+            'copy_ids': copy_ids,
+            'on_loan': queryset.filter(status='o').count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+
+    @admin.action(description='Devolver los ejemplares seleccionados', permissions=['mark_returned'])
+    def return_loans(self, request, queryset):
+        copy_ids = self.selected_copy_ids(request, queryset)
+        if copy_ids is not None:
+            self.apply_bulk_loan_form(request, BulkLoanForm({'copies': copy_ids, 'action': 'return'}))
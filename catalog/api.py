@@ -0,0 +1,333 @@
+"""
+API JSON de sólo lectura del catálogo: libros, autores, géneros y ejemplares de un libro.
+
+    GET /catalog/api/books/             ?sort=available como la lista HTML
+    GET /catalog/api/books/<pk>/
+    GET /catalog/api/books/<pk>/copies/ disponibles primero
+    GET /catalog/api/authors/
+    GET /catalog/api/authors/<pk>/
+    GET /catalog/api/genres/
+
+``?fields=id,title,author`` elige los campos de cada resultado. Los campos pedidos
+deciden las columnas del SELECT: las filas se leen con values() y se serializan tal
+cual, sin construir instancias de los modelos. Las relaciones se incrustan con un
+número fijo de consultas: el autor de un libro viene en el mismo JOIN, y los géneros de
+los libros o los libros de los autores en una consulta más para toda la página.
+
+Las listas se paginan por cursor (catalog/pagination.py) con ``?cursor=`` y ``?limit=``
+(hasta MAX_LIMIT); cada respuesta trae las URL de la página siguiente y la anterior.
+Las respuestas a anónimos pasan por la cache de páginas (catalog/page_cache.py) con las
+mismas versiones que las páginas HTML: un acierto no toca la base de datos.
+"""
+import operator
+
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import generic
+
+from . import page_cache
+from .models import Author, Book, BookInstance, Genre
+from .page_cache import CachedPageMixin
+from .pagination import CursorPaginator, InvalidCursor
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _column(name):
+    return (name,), operator.itemgetter(name)
+
+
+def _url(name):
+    return ('id',), lambda row: reverse(name, args=[row['id']])
+
+
+def _author(row):
+    if row['author_id'] is None:
+        return None
+    return {'id': row['author_id'], 'first_name': row['author__first_name'], 'last_name': row['author__last_name']}
+
+
+def _group(rows):
+    grouped = {}
+    for key, item in rows:
+        grouped.setdefault(key, []).append(item)
+    return grouped
+
+
+def book_genres(book_ids, using):
+    rows = (
+        Book.genre.through.objects.using(using).filter(book_id__in=book_ids)
+        .order_by('genre__name', 'genre_id').values_list('book_id', 'genre_id', 'genre__name')
+    )
+    return _group((book_id, {'id': genre_id, 'name': name}) for book_id, genre_id, name in rows)
+
+
+def author_books(author_ids, using):
+    rows = (
+        Book.objects.using(using).filter(author_id__in=author_ids)
+        .order_by('title', 'id').values_list('author_id', 'id', 'title')
+    )
+    return _group((author_id, {'id': pk, 'title': title}) for author_id, pk, title in rows)
+
+
+class Resource:
+    """
+    Campos de un modelo en la API. ``fields`` asocia cada campo a las columnas de
+    values() que necesita y a la función que lo arma a partir de la fila; ``related``
+    son los campos que se cargan aparte, con una consulta para todas las filas.
+    ``list_fields`` son los campos por omisión en las listas (en el detalle, todos).
+    """
+
+    def __init__(self, model, fields, list_fields, related=None):
+        self.model = model
+        self.fields = fields
+        self.related = related or {}
+        self.list_fields = list_fields
+
+    def parse_fields(self, raw, detail=False):
+        if not raw:
+            return list(self.fields) + list(self.related) if detail else list(self.list_fields)
+        names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields and name not in self.related]
+        if unknown:
+            raise ApiError('Campos desconocidos: %s.' % ', '.join(unknown))
+        return names
+
+    def columns(self, names):
+        # El pk siempre: con él se cargan las relaciones.
+        columns = ['id']
+        for name in names:
+            if name in self.fields:
+                columns.extend(self.fields[name][0])
+        return list(dict.fromkeys(columns))
+
+    def serialize(self, rows, names, using):
+        related = {
+            name: self.related[name]([row['id'] for row in rows], using) if rows else {}
+            for name in names if name in self.related
+        }
+        builders = [
+            (name, None if name in related else self.fields[name][1]) for name in names
+        ]
+        return [
+            {
+                name: related[name].get(row['id'], []) if build is None else build(row)
+                for name, build in builders
+            }
+            for row in rows
+        ]
+
+
+BOOKS = Resource(
+    Book,
+    fields={
+        'id': _column('id'),
+        'title': _column('title'),
+        'summary': _column('summary'),
+        'isbn': _column('isbn'),
+        'author': (('author_id', 'author__first_name', 'author__last_name'), _author),
+        'copies_total': _column('copies_total'),
+        'copies_available': _column('copies_available'),
+        'url': _url('api-book'),
+    },
+    related={'genres': book_genres},
+    list_fields=['id', 'title', 'author', 'genres', 'copies_total', 'copies_available', 'url'],
+)
+
+AUTHORS = Resource(
+    Author,
+    fields={
+        'id': _column('id'),
+        'first_name': _column('first_name'),
+        'last_name': _column('last_name'),
+        'date_of_birth': _column('date_of_birth'),
+        'date_of_death': _column('date_of_death'),
+        'url': _url('api-author'),
+    },
+    related={'books': author_books},
+    list_fields=['id', 'first_name', 'last_name', 'date_of_birth', 'date_of_death', 'url'],
+)
+
+GENRES = Resource(
+    Genre,
+    fields={'id': _column('id'), 'name': _column('name')},
+    list_fields=['id', 'name'],
+)
+
+COPIES = Resource(
+    BookInstance,
+    fields={
+        'id': _column('id'),
+        'imprint': _column('imprint'),
+        'status': _column('status'),
+        'due_back': _column('due_back'),
+    },
+    list_fields=['id', 'imprint', 'status', 'due_back'],
+)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def error_response(error):
+    return json_response({'error': str(error)}, status=error.status)
+
+
+class ApiView(CachedPageMixin, generic.View):
+    """
+    Base de las vistas de la API. Los campos se validan antes de consultar la cache.
+    """
+    resource = None
+    detail = False
+    http_method_names = ['get', 'head', 'options']
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.field_names = self.resource.parse_fields(request.GET.get('fields'), self.detail)
+        except ApiError as e:
+            return error_response(e)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return json_response(self.get_data())
+        except ApiError as e:
+            return error_response(e)
+
+
+class ApiListView(ApiView):
+    ordering = ['pk']
+
+    def get_queryset(self):
+        return self.resource.model.objects.all()
+
+    def get_ordering(self):
+        return self.ordering
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ApiError('limit debe ser un número entero.')
+        return min(max(limit, 1), MAX_LIMIT)
+
+    def get_data(self):
+        ordering = self.get_ordering()
+        opts = self.resource.model._meta
+        # Las columnas de orden van en la fila: de ahí salen los cursores.
+        columns = self.resource.columns(self.field_names) + [
+            opts.get_field(name.lstrip('-')).attname for name in ordering if name.lstrip('-') != 'pk'
+        ]
+        queryset = self.get_queryset().values(*dict.fromkeys(columns))
+        paginator = CursorPaginator(queryset, self.get_limit(), ordering)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError('Cursor inválido.')
+        if not page.object_list and not self.request.GET.get('cursor'):
+            self.check_empty()
+        return {
+            'results': self.resource.serialize(page.object_list, self.field_names, queryset.db),
+            'next': self.page_url(page.next_cursor),
+            'previous': self.page_url(page.previous_cursor),
+        }
+
+    def check_empty(self):
+        """Una lista vacía puede querer decir que el objeto padre no existe (404)."""
+
+    def page_url(self, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query['cursor'] = cursor
+        return '%s?%s' % (self.request.path, query.urlencode())
+
+
+class ApiDetailView(ApiView):
+    detail = True
+
+    def get_data(self):
+        queryset = self.resource.model.objects.filter(pk=self.kwargs['pk'])
+        try:
+            row = queryset.values(*self.resource.columns(self.field_names)).get()
+        except self.resource.model.DoesNotExist:
+            raise ApiError('No existe.', status=404)
+        return self.resource.serialize([row], self.field_names, queryset.db)[0]
+
+
+class BookList(ApiListView):
+    model = Book
+    resource = BOOKS
+    ordering = ['title']
+    sort_orderings = {'available': ['-copies_available', 'title']}
+
+    def get_cache_dependencies(self):
+        dependencies = [page_cache.BOOK_LIST]
+        if 'genres' in self.field_names:
+            dependencies.append(page_cache.GENRE_LIST)
+        return dependencies
+
+    def get_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get('sort'), self.ordering)
+
+
+class BookDetail(ApiDetailView):
+    model = Book
+    resource = BOOKS
+
+    def get_cache_dependencies(self):
+        return [page_cache.book_key(self.kwargs['pk'])]
+
+
+class BookCopyList(ApiListView):
+    model = Book
+    resource = COPIES
+    # 'a' (disponible) es el primer estado en orden alfabético.
+    ordering = ['status']
+
+    def get_cache_dependencies(self):
+        return [page_cache.book_key(self.kwargs['pk'])]
+
+    def get_queryset(self):
+        return BookInstance.objects.filter(book_id=self.kwargs['pk'])
+
+    def check_empty(self):
+        if not Book.objects.filter(pk=self.kwargs['pk']).exists():
+            raise ApiError('No existe.', status=404)
+
+
+class AuthorList(ApiListView):
+    model = Author
+    resource = AUTHORS
+    ordering = ['last_name']
+
+    def get_cache_dependencies(self):
+        dependencies = [page_cache.AUTHOR_LIST]
+        if 'books' in self.field_names:
+            dependencies.append(page_cache.BOOK_LIST)
+        return dependencies
+
+
+class AuthorDetail(ApiDetailView):
+    model = Author
+    resource = AUTHORS
+
+    def get_cache_dependencies(self):
+        return [page_cache.author_key(self.kwargs['pk'])]
+
+
+class GenreList(ApiListView):
+    model = Genre
+    resource = GENRES
+    ordering = ['name']
+
+    def get_cache_dependencies(self):
+        return [page_cache.GENRE_LIST]
@@ -0,0 +1,108 @@
+"""
+Versiones asíncronas de las páginas de lectura del catálogo.
+
+Bajo un servidor ASGI (locallibrary/asgi.py activa CATALOG_ASYNC_VIEWS) catalog/urls.py
+usa estas vistas en lugar de las de catalog/views.py: así la petición no pasa entera por
+sync_to_async, sólo las consultas. Cada vista hereda de su versión síncrona las
+consultas, plantillas, permisos y dependencias de cache; aquí sólo cambian get() y
+dispatch(), que usan la API asíncrona del ORM (aget, async for, auser...).
+
+En contexto asíncrono no se puede consultar la base de datos desde código síncrono, así
+que dispatch() carga el usuario y sus permisos antes de que los mixins de acceso y las
+plantillas los lean.
+"""
+import asyncio
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from . import counters, views, visits
+
+
+async def load_user(request):
+    """
+    Carga request.user (y la cache de permisos si está autenticado) sin bloquear.
+    """
+    user = await request.auser()
+    if user.is_authenticated:
+        await user.aget_all_permissions()
+    request.user = user
+    return user
+
+
+async def index(request):
+    """
+    Página de inicio: contadores y visitas de la sesión a la vez.
+    """
+    await load_user(request)
+    catalog_counters, num_visits = await asyncio.gather(
+        counters.aget_counters(),
+        sync_to_async(visits.record_visit)(request),
+    )
+    return render(request, 'index.html', context=views.index_context(catalog_counters, num_visits))
+
+
+class AsyncViewMixin:
+    async def dispatch(self, request, *args, **kwargs):
+        await load_user(request)
+        # Los mixins síncronos (LoginRequiredMixin, CachedPageMixin...) devuelven una
+        # respuesta o la corrutina del manejador.
+        response = super().dispatch(request, *args, **kwargs)
+        return await response if inspect.isawaitable(response) else response
+
+
+class AsyncListMixin(AsyncViewMixin):
+    """
+    get() de ListView con la página de CursorPaginationMixin leída de forma asíncrona.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        self.cursor_page = await self.apaginate_queryset(self.object_list, self.get_paginate_by(self.object_list))
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.cursor_page
+
+
+class AsyncDetailMixin(AsyncViewMixin):
+    """
+    get() de DetailView con el objeto (y sus prefetch) leído de forma asíncrona.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        try:
+            return await queryset.aget(pk=self.kwargs[self.pk_url_kwarg])
+        except queryset.model.DoesNotExist:
+            raise Http404('No %s found matching the query' % queryset.model._meta.verbose_name)
+
+
+class BookListView(AsyncListMixin, views.BookListView):
+    pass
+
+
+class BookDetailView(AsyncDetailMixin, views.BookDetailView):
+    pass
+
+
+class AuthorListView(AsyncListMixin, views.AuthorListView):
+    pass
+
+
+class AuthorDetailView(AsyncDetailMixin, views.AuthorDetailView):
+    pass
+
+
+class LoanedBooksByUserListView(AsyncListMixin, views.LoanedBooksByUserListView):
+    pass
+
+
+class AllLoanedBooksListView(AsyncListMixin, views.AllLoanedBooksListView):
+    pass
@@ -0,0 +1,96 @@
+"""
+Utilidades compartidas por los comandos de benchmark (manage.py bench_*).
+"""
+import contextlib
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+SERVERS = {
+    # nombre: (descripción, argumentos después de "python -m")
+    'gunicorn': ('WSGI, gunicorn (workers síncronos)', [
+        'gunicorn', 'locallibrary.wsgi:application', '--workers', '{workers}', '--bind', '127.0.0.1:{port}',
+        '--log-level', 'warning',
+    ]),
+    'uvicorn': ('ASGI, uvicorn (vistas asíncronas)', [
+        'uvicorn', 'locallibrary.asgi:application', '--workers', '{workers}', '--port', '{port}',
+        '--log-level', 'warning', '--no-access-log',
+    ]),
+}
+
+
+def percentile(values, pct):
+    """
+    Percentil ``pct`` (0-100) por interpolación lineal; None si no hay valores.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(timings_ms):
+    """
+    Resumen estándar de una lista de tiempos en milisegundos.
+    """
+    return {
+        'count': len(timings_ms),
+        'mean_ms': statistics.fmean(timings_ms) if timings_ms else None,
+        'p50_ms': percentile(timings_ms, 50),
+        'p95_ms': percentile(timings_ms, 95),
+        'p99_ms': percentile(timings_ms, 99),
+        'max_ms': max(timings_ms) if timings_ms else None,
+    }
+
+
+def time_calls(func, repeat):
+    """
+    Ejecuta ``func`` ``repeat`` veces y devuelve la duración de cada llamada en ms.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def run_server(name, workers=1, env=None, timeout=30):
+    """
+    Levanta el sitio con el servidor ``name`` de SERVERS en un puerto libre y devuelve
+    el puerto cuando ya acepta conexiones. ``env`` se agrega al entorno actual.
+    """
+    from django.core.management.base import CommandError
+
+    port = free_port()
+    command = [sys.executable, '-m'] + [arg.format(workers=workers, port=port) for arg in SERVERS[name][1]]
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})})
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise CommandError('%s terminó al arrancar (¿está instalado?).' % name)
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise CommandError('%s no aceptó conexiones en %d s.' % (name, timeout))
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,36 @@
+"""
+Comprobaciones del sistema del catálogo (manage.py check). Se registran en CatalogConfig.ready().
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if getattr(settings, 'CATALOG_SHARED_CACHE', True):
+        return []
+    return [Warning(
+        'La cache por defecto es de cada proceso: con varios workers los contadores del '
+        'catálogo difieren entre ellos y la cache de páginas está desactivada.',
+        hint='Use un backend compartido (Redis, Memcached, FileBasedCache) con DJANGO_CACHE_BACKEND.',
+        id='catalog.W001',
+    )]
+
+
+CACHED_SESSION_ENGINES = ('django.contrib.sessions.backends.cache', 'django.contrib.sessions.backends.cached_db')
+
+
+@register(Tags.caches, Tags.security)
+def check_session_cache(app_configs, **kwargs):
+    # Una sesión cerrada en un worker seguiría siendo válida en la cache local de los demás.
+    backend = settings.CACHES.get(settings.SESSION_CACHE_ALIAS, {}).get('BACKEND')
+    if settings.SESSION_ENGINE not in CACHED_SESSION_ENGINES:
+        return []
+    if backend not in getattr(settings, 'PROCESS_LOCAL_CACHE_BACKENDS', ()):
+        return []
+    return [Warning(
+        'SESSION_ENGINE guarda las sesiones en una cache de cada proceso (%s): con varios '
+        'workers una sesión cerrada sigue siendo válida en los demás.' % backend,
+        hint='Use django.contrib.sessions.backends.db o un backend de cache compartido.',
+        id='catalog.W002',
+    )]
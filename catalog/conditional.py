@@ -0,0 +1,126 @@
+"""
+GET condicional (ETag y Last-Modified) para las páginas de lectura del catálogo.
+
+Book, Author y BookInstance guardan updated_at (auto_now al guardar). Los cambios que no
+pasan por save() también lo actualizan: los préstamos (catalog/loans.py), los contadores
+de ejemplares (catalog/counters.py) y los géneros de un libro, el autor que pierde un
+libro o los libros de un autor borrado (catalog/signals.py).
+
+Antes de renderizar, cada vista lee con una consulta las fechas de lo que muestra la
+página. Si el navegador ya tiene esa versión (If-None-Match o If-Modified-Since) se
+responde 304 sin cuerpo. La barra lateral cambia según quién pide la página, así que el
+ETag incluye al usuario.
+
+Las listas sólo llevan ETag: borrar un libro no cambia el updated_at más reciente, así
+que su ETag suma los contadores del catálogo y Last-Modified no serviría.
+"""
+import hashlib
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import counters
+from .models import Author, Book, BookInstance
+
+
+def _latest(model, **filters):
+    return Subquery(model.objects.filter(**filters).order_by('-updated_at').values('updated_at')[:1])
+
+
+def user_key(request):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    # Con otra cookie CSRF (p. ej. tras iniciar sesión otra vez) el token del formulario
+    # de salida de la página guardada ya no vale.
+    return user.pk, request.META.get('CSRF_COOKIE')
+
+
+def make_validators(request, values, last_modified=True):
+    """
+    Devuelve (etag, last_modified) para los valores de la página. ``last_modified`` es
+    la fecha más reciente de ``values``, si se pide.
+    """
+    if values is None:
+        return None, None
+    raw = repr((user_key(request), tuple(values)))
+    etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+    dates = [value for value in values if hasattr(value, 'timestamp')]
+    return etag, int(max(dates).timestamp()) if last_modified and dates else None
+
+
+class ConditionalGetMixin:
+    """
+    Responde 304 a las peticiones GET cuyo ETag o fecha coincidan, sin llamar a get().
+    Las subclases calculan los validadores con get_validators(), con una consulta.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._conditional_adispatch(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    async def _conditional_adispatch(self, request, *args, **kwargs):
+        etag = last_modified = None
+        response = None
+        if request.method in ('GET', 'HEAD'):
+            etag, last_modified = await sync_to_async(self.get_validators)()
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        return set_validators(response, etag, last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        if etag and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def book_page_validators(request, pk):
+    # Fechas del libro, de su autor y del último cambio en sus ejemplares.
+    dates = Book.objects.filter(pk=pk).annotate(
+        copies_updated_at=_latest(BookInstance, book=OuterRef('pk')),
+    ).values_list('updated_at', 'author__updated_at', 'copies_updated_at').first()
+    return make_validators(request, dates)
+
+
+def author_page_validators(request, pk):
+    # Fechas del autor y del último cambio en sus libros.
+    dates = Author.objects.filter(pk=pk).annotate(
+        books_updated_at=_latest(Book, author=OuterRef('pk')),
+    ).values_list('updated_at', 'books_updated_at').first()
+    return make_validators(request, dates)
+
+
+def book_list_validators(request):
+    # Último cambio en los libros y en los autores (índices de updated_at) y cuántos hay.
+    dates = Book.objects.order_by('-updated_at').annotate(
+        authors_updated_at=_latest(Author),
+    ).values_list('updated_at', 'authors_updated_at').first()
+    catalog_counters = counters.get_counters()
+    values = (dates or ()) + (catalog_counters['num_books'], catalog_counters['num_authors'])
+    return make_validators(request, values, last_modified=False)
+
+
+def author_list_validators(request):
+    dates = Author.objects.order_by('-updated_at').values_list('updated_at').first()
+    values = (dates or ()) + (counters.get_counters()['num_authors'],)
+    return make_validators(request, values, last_modified=False)
@@ -0,0 +1,174 @@
+"""
+Contadores globales del catálogo (libros, ejemplares, ejemplares disponibles y autores).
+
+Los totales se calculan en una sola consulta agregada y se guardan en el framework
+de cache. Las señales de Book, BookInstance y Author los ajustan de forma incremental,
+por lo que la página de inicio no recorre ninguna tabla mientras la cache esté caliente.
+
+Los ajustes sólo son exactos si todos los procesos comparten la cache (Redis, Memcached,
+FileBasedCache...; ver CATALOG_SHARED_CACHE en settings). Con una cache de cada proceso
+(LocMemCache) cada worker ajusta sólo su copia: ahí los valores caducan a los
+LOCAL_CACHE_TIMEOUT segundos y se recalculan, y rebuild_counters no llega al servidor.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import metrics
+from .models import Author, Book, BookInstance
+
+CACHE_PREFIX = 'catalog:counters:'
+LOCAL_CACHE_TIMEOUT = 60
+
+COUNTER_NAMES = ('num_books', 'num_instances', 'num_instances_available', 'num_authors')
+
+
+def _cache_key(name):
+    return CACHE_PREFIX + name
+
+
+def is_shared():
+    return getattr(settings, 'CATALOG_SHARED_CACHE', True)
+
+
+def cache_timeout():
+    # Sin expiración en una cache compartida: las señales mantienen los valores al día.
+    return None if is_shared() else LOCAL_CACHE_TIMEOUT
+
+
+def compute_counters(using=DEFAULT_DB_ALIAS):
+    """
+    Calcula todos los contadores en una única consulta (subconsultas escalares).
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    book_table = qn(Book._meta.db_table)
+    instance_table = qn(BookInstance._meta.db_table)
+    author_table = qn(Author._meta.db_table)
+    sql = (
+        'SELECT '
+        f'(SELECT COUNT(*) FROM {book_table}), '
+        f'(SELECT COUNT(*) FROM {instance_table}), '
+        f'(SELECT COUNT(*) FROM {instance_table} WHERE {qn("status")} = %s), '
+        f'(SELECT COUNT(*) FROM {author_table})'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ['a'])
+        row = cursor.fetchone()
+    return dict(zip(COUNTER_NAMES, row))
+
+
+def rebuild(using=DEFAULT_DB_ALIAS):
+    """
+    Recalcula los contadores desde cero y los guarda en la cache.
+    """
+    counters = compute_counters(using)
+    cache.set_many({_cache_key(name): value for name, value in counters.items()}, cache_timeout())
+    return counters
+
+
+def invalidate(using=DEFAULT_DB_ALIAS):
+    """
+    Descarta los contadores al confirmar la transacción actual de ``using``: el próximo
+    get_counters() los recalcula. Para cambios que no se pueden ajustar con un delta.
+    """
+    transaction.on_commit(lambda: cache.delete_many([_cache_key(name) for name in COUNTER_NAMES]), using=using)
+
+
+def copies_subquery(model, **filters):
+    """
+    Número de ejemplares del libro de la fila exterior que cumplen ``filters``.
+    ``model`` es BookInstance (o su versión histórica en una migración).
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(book=OuterRef('pk'), **filters)
+        .order_by().values('book').annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def stale_book_copies(using=DEFAULT_DB_ALIAS):
+    """
+    Libros cuyos contadores de ejemplares no coinciden con sus ejemplares.
+    """
+    return Book.objects.using(using).annotate(
+        actual_total=copies_subquery(BookInstance), actual_available=copies_subquery(BookInstance, status='a'),
+    ).exclude(copies_total=F('actual_total'), copies_available=F('actual_available'))
+
+
+def rebuild_book_copies(books=None, using=DEFAULT_DB_ALIAS):
+    """
+    Recalcula Book.copies_total y Book.copies_available de ``books`` (por defecto todos)
+    en un único UPDATE con subconsultas, sin cargar filas en Python.
+    """
+    books = (books if books is not None else Book.objects.all()).using(using)
+    return books.update(
+        copies_total=copies_subquery(BookInstance),
+        copies_available=copies_subquery(BookInstance, status='a'),
+        updated_at=timezone.now(),
+    )
+
+
+def adjust_book_copies(deltas, using=DEFAULT_DB_ALIAS):
+    """
+    Suma ``{book_id: (total, disponibles)}`` a los contadores de ejemplares con
+    UPDATE ... F(), en la transacción en curso: un UPDATE por cada delta distinto, no por
+    libro. La disponibilidad se ve en la página del libro: también cambia updated_at.
+    Devuelve si cambió algún libro.
+    """
+    now = timezone.now()
+    groups = {}
+    for book_id, delta in deltas.items():
+        if book_id and any(delta):
+            groups.setdefault(tuple(delta), []).append(book_id)
+    for (total, available), book_ids in groups.items():
+        Book.objects.using(using).filter(pk__in=book_ids).update(
+            copies_total=F('copies_total') + total,
+            copies_available=F('copies_available') + available,
+            updated_at=now,
+        )
+    return bool(groups)
+
+
+def get_counters():
+    """
+    Devuelve los contadores desde la cache, recalculándolos sólo si falta alguno.
+    """
+    cached = cache.get_many([_cache_key(name) for name in COUNTER_NAMES])
+    metrics.cache_result('counters', len(cached) == len(COUNTER_NAMES))
+    if len(cached) != len(COUNTER_NAMES):
+        return rebuild()
+    return {name: cached[_cache_key(name)] for name in COUNTER_NAMES}
+
+
+async def aget_counters():
+    """
+    Versión asíncrona de get_counters().
+    """
+    cached = await cache.aget_many([_cache_key(name) for name in COUNTER_NAMES])
+    metrics.cache_result('counters', len(cached) == len(COUNTER_NAMES))
+    if len(cached) != len(COUNTER_NAMES):
+        return await sync_to_async(rebuild)()
+    return {name: cached[_cache_key(name)] for name in COUNTER_NAMES}
+
+
+def _apply(deltas):
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            cache.incr(_cache_key(name), delta)
+        except ValueError:
+            # La clave no existe (cache fría o expulsada): el próximo get_counters() la recalcula.
+            pass
+
+
+def adjust(using=DEFAULT_DB_ALIAS, **deltas):
+    """
+    Ajusta los contadores cuando la transacción actual de ``using`` confirma, p. ej.
+    adjust(num_books=1).
+    """
+    transaction.on_commit(lambda: _apply(deltas), using=using)
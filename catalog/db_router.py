@@ -0,0 +1,113 @@
+"""
+Enrutado de lecturas a réplicas con lectura de las propias escrituras.
+
+Las escrituras van siempre a ``default`` (la primaria). Las lecturas de la app catalog
+van a una réplica de ``settings.DATABASE_REPLICAS`` elegida al azar, salvo que:
+
+* haya una transacción abierta en la primaria (lo leído se va a usar para escribir);
+* la petición sea "pegajosa": usa un método que escribe (POST, PUT...) o la sesión ya
+  escribió en el catálogo. ``ReplicaStickinessMiddleware`` marca la sesión la primera
+  vez que una petición escribe en catalog (o en el historial del admin) y desde entonces
+  el resto de la sesión lee de la primaria, así que el usuario nunca ve una réplica que
+  todavía no tiene su cambio.
+
+Sesiones, usuarios y permisos se leen siempre de la primaria: se escriben en casi todas
+las peticiones y una réplica retrasada cerraría sesiones recién abiertas.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SESSION_KEY = '_catalog_read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+REPLICATED_APP_LABELS = {'catalog'}
+STICKY_APP_LABELS = {'catalog', 'admin'}
+
+# Estado de la petición en curso: {'primary': bool, 'wrote': bool}. Es un dict mutable y no
+# dos ContextVar para que las escrituras hechas en sync_to_async o en tareas hijas (que
+# trabajan sobre una copia del contexto) se vean al volver al middleware.
+_request_state = ContextVar('catalog_replica_state', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        state = _request_state.get()
+        if (not aliases or model._meta.app_label not in REPLICATED_APP_LABELS or (state and state['primary'])
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label in STICKY_APP_LABELS:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas tienen los mismos datos: se pueden relacionar objetos leídos de cualquiera.
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación, no con migrate.
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Decide si la petición lee de la primaria y marca la sesión cuando escribe en el
+    catálogo. Debe ir después de SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        session = getattr(request, 'session', None)
+        sticky = session is not None and bool(session.get(SESSION_KEY))
+        state, token = self._start(request, sticky)
+        try:
+            response = self.get_response(request)
+            if state['wrote'] and session is not None and not sticky:
+                session[SESSION_KEY] = True
+            return response
+        finally:
+            _request_state.reset(token)
+
+    async def __acall__(self, request):
+        session = getattr(request, 'session', None)
+        sticky = session is not None and bool(await session.aget(SESSION_KEY))
+        state, token = self._start(request, sticky)
+        try:
+            response = await self.get_response(request)
+            if state['wrote'] and session is not None and not sticky:
+                await session.aset(SESSION_KEY, True)
+            return response
+        finally:
+            _request_state.reset(token)
+
+    def _start(self, request, sticky):
+        state = {'primary': sticky or request.method not in SAFE_METHODS, 'wrote': False}
+        return state, _request_state.set(state)
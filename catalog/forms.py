@@ -1,34 +1,43 @@
 import datetime
+import uuid
 
 from django import forms
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.forms import ModelForm
+from django.db import DEFAULT_DB_ALIAS
+
+from . import loans
 from .models import BookInstance
 
 
 
+def validate_renewal_date(data):
+    """
+    Reglas de la fecha de renovación, compartidas por todos los formularios de préstamos.
+    """
+    # VERIFICAR PRIMERO QUE data NO SEA None
+    if data is None:
+        raise ValidationError(_('Invalid date - no date provided'))
+
+    # Check if a date is not in the past.
+    if data < datetime.date.today():
+        raise ValidationError(_('Invalid date - renewal in past'))
+
+    # Check if a date is in the allowed range (+4 weeks from today).
+    if data > datetime.date.today() + datetime.timedelta(weeks=4):
+        raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+
+    # Remember to always return the cleaned data.
+    return data
+
+
 class RenewBookForm(forms.Form):
     renewal_date = forms.DateField(help_text="Enter a date between now and 4 weeks (default 3).")
 
     def clean_renewal_date(self):
-        data = self.cleaned_data['renewal_date']
-        
-        # VERIFICAR PRIMERO QUE data NO SEA None
-        if data is None:
-            raise ValidationError(_('Invalid date - no date provided'))
-        
-        # Check if a date is not in the past.
-        if data < datetime.date.today():
-            raise ValidationError(_('Invalid date - renewal in past'))
-
-        # Check if a date is in the allowed range (+4 weeks from today).
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
-
-        # Remember to always return the cleaned data.
-        return data
+        return validate_renewal_date(self.cleaned_data['renewal_date'])
     
 
 class RenewBookModelForm(ModelForm):
@@ -39,18 +48,63 @@ class RenewBookModelForm(ModelForm):
         help_texts = {'due_back': _('Enter a date between now and 4 weeks (default 3).')}
     
     def clean_due_back(self):
-        data = self.cleaned_data['due_back']
-        
-        # VERIFICAR PRIMERO QUE data NO SEA None
-        if data is None:
-            raise ValidationError(_('Invalid date - no date provided'))
-        
-        # Check if a date is not in the past.
-        if data < datetime.date.today():
-            raise ValidationError(_('Invalid date - renewal in past'))
-
-        # Check if a date is in the allowed range (+4 weeks from today).
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
-
-        return data
\ No newline at end of file
+        return validate_renewal_date(self.cleaned_data['due_back'])
+
+
+class MultipleUUIDField(forms.Field):
+    """
+    Lista de UUID (varios valores con el mismo nombre), sin consultar la base de datos.
+    """
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return list(dict.fromkeys(uuid.UUID(str(item)) for item in value))
+        except ValueError:
+            raise ValidationError(_('Invalid copy id'), code='invalid')
+
+
+class BulkLoanForm(forms.Form):
+    """
+    Renovación o devolución de varios ejemplares a la vez (bulk_loans y las acciones del admin).
+    """
+    ACTIONS = (('renew', _('Renew')), ('return', _('Return')))
+    # Cada ejemplar es un campo oculto del formulario y un parámetro del UPDATE.
+    MAX_COPIES = 500
+
+    copies = MultipleUUIDField()
+    action = forms.ChoiceField(choices=ACTIONS)
+    renewal_date = forms.DateField(required=False, help_text="Enter a date between now and 4 weeks (default 3).")
+
+    def clean_copies(self):
+        copies = self.cleaned_data['copies']
+        if len(copies) > self.MAX_COPIES:
+            raise ValidationError(_('Select at most %(limit)d copies.'), code='max_copies', params={'limit': self.MAX_COPIES})
+        return copies
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'renew' and 'renewal_date' in cleaned_data:
+            try:
+                cleaned_data['renewal_date'] = validate_renewal_date(cleaned_data['renewal_date'])
+            except ValidationError as e:
+                self.add_error('renewal_date', e)
+        return cleaned_data
+
+    def save(self, using=DEFAULT_DB_ALIAS):
+        """
+        Aplica la acción con un único UPDATE (catalog/loans.py) y devuelve un resumen.
+        """
+        copy_ids = self.cleaned_data['copies']
+        if self.cleaned_data['action'] == 'renew':
+            due_back = self.cleaned_data['renewal_date']
+            changed = loans.bulk_renew(copy_ids, due_back, using=using)
+            summary = 'Renovados %d préstamos hasta el %s.' % (changed, due_back.isoformat())
+        else:
+            changed = loans.bulk_return(copy_ids, using=using)
+            summary = 'Devueltos %d ejemplares.' % changed
+        if changed < len(copy_ids):
+            summary += ' %d de los seleccionados no estaban prestados.' % (len(copy_ids) - changed)
+        return summary
@@ -0,0 +1,143 @@
+"""
+Préstamos de ejemplares: prestar, devolver y renovar sin carreras entre bibliotecarios.
+
+Cada operación es una transacción corta con un UPDATE condicional de una sola
+sentencia (``WHERE status = 'a'`` para prestar, ``WHERE status = 'o'`` para devolver o
+renovar): si otro bibliotecario cambió el ejemplar antes, el UPDATE no afecta ninguna
+fila y la operación falla en lugar de pisar el préstamo ajeno. Para prestar "cualquier
+copia" de un libro, el ejemplar se elige con SELECT ... FOR UPDATE SKIP LOCKED, así dos
+préstamos simultáneos del mismo libro toman copias distintas sin esperarse (en SQLite,
+sin bloqueo de filas, el UPDATE condicional basta y se prueba con la siguiente copia).
+
+bulk_return y bulk_renew cambian muchos ejemplares con un único UPDATE cada una (las
+renovaciones de fin de semestre). Los ejemplares que ya no estaban prestados se omiten.
+
+Los UPDATE no pasan por save() ni disparan señales: aquí mismo se ajustan los
+contadores de ejemplares del libro, los contadores globales, la cache de páginas y
+updated_at (el GET condicional, catalog/conditional.py).
+"""
+import collections
+import datetime
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from . import counters, page_cache
+from .models import BookInstance
+
+LOAN_PERIOD = datetime.timedelta(weeks=3)
+# Copias que se intentan prestar antes de rendirse cuando otros las toman a la vez.
+CHECKOUT_ATTEMPTS = 5
+
+
+class LoanError(Exception):
+    pass
+
+
+class NoCopyAvailable(LoanError):
+    pass
+
+
+class CopyNotOnLoan(LoanError):
+    pass
+
+
+def _availability_changed(book_id, available, using):
+    counters.adjust_book_copies({book_id: (0, available)}, using=using)
+    counters.adjust(using, num_instances_available=available)
+    page_cache.bump(page_cache.BOOK_LIST, page_cache.book_key(book_id) if book_id else None)
+
+
+def checkout(book, borrower, due_back=None, using=DEFAULT_DB_ALIAS):
+    """
+    Presta a ``borrower`` una copia disponible de ``book`` (un Book o su pk) y devuelve
+    el pk del ejemplar prestado. Lanza NoCopyAvailable si no queda ninguna.
+    """
+    book_id = getattr(book, 'pk', book)
+    due_back = due_back or datetime.date.today() + LOAN_PERIOD
+    available = BookInstance.objects.using(using).filter(book_id=book_id, status='a').order_by('pk')
+    for _ in range(CHECKOUT_ATTEMPTS):
+        with transaction.atomic(using=using):
+            copy_id = available.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if copy_id is None:
+                raise NoCopyAvailable('No hay copias disponibles de %s.' % book)
+            updated = available.filter(pk=copy_id).update(
+                status='o', borrower=borrower, due_back=due_back, updated_at=timezone.now(),
+            )
+            if updated:
+                _availability_changed(book_id, -1, using)
+                return copy_id
+    raise NoCopyAvailable('Todas las copias de %s se prestaron a la vez.' % book)
+
+
+def return_copy(copy_id, using=DEFAULT_DB_ALIAS):
+    """
+    Devuelve un ejemplar prestado. Lanza CopyNotOnLoan si no estaba prestado.
+    """
+    with transaction.atomic(using=using):
+        book_id = _book_id(copy_id, using)
+        updated = BookInstance.objects.using(using).filter(pk=copy_id, status='o').update(
+            status='a', borrower=None, due_back=None, updated_at=timezone.now(),
+        )
+        if not updated:
+            raise CopyNotOnLoan('El ejemplar %s no está prestado.' % copy_id)
+        _availability_changed(book_id, 1, using)
+
+
+def renew(copy_id, due_back, using=DEFAULT_DB_ALIAS):
+    """
+    Cambia la fecha de devolución de un ejemplar prestado. Las reglas de la fecha las
+    valida el formulario (catalog/forms.py). Lanza CopyNotOnLoan si ya se devolvió.
+    """
+    with transaction.atomic(using=using):
+        book_id = _book_id(copy_id, using)
+        updated = BookInstance.objects.using(using).filter(pk=copy_id, status='o').update(
+            due_back=due_back, updated_at=timezone.now(),
+        )
+        if not updated:
+            raise CopyNotOnLoan('El ejemplar %s no está prestado.' % copy_id)
+        if book_id:
+            page_cache.bump(page_cache.book_key(book_id))
+
+
+def _book_id(copy_id, using):
+    try:
+        return BookInstance.objects.using(using).values_list('book_id', flat=True).get(pk=copy_id)
+    except BookInstance.DoesNotExist:
+        raise LoanError('El ejemplar %s no existe.' % copy_id)
+
+
+def bulk_return(copy_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Devuelve de una vez los ejemplares de ``copy_ids`` que estén prestados (los demás se
+    ignoran) con un único UPDATE, y devuelve cuántos se devolvieron.
+    """
+    with transaction.atomic(using=using):
+        # Se bloquean las filas para que los contadores por libro sean los de las que cambian.
+        rows = list(
+            BookInstance.objects.using(using).filter(pk__in=copy_ids, status='o')
+            .select_for_update().values_list('pk', 'book_id')
+        )
+        if not rows:
+            return 0
+        returned = BookInstance.objects.using(using).filter(pk__in=[pk for pk, book_id in rows], status='o').update(
+            status='a', borrower=None, due_back=None, updated_at=timezone.now(),
+        )
+        per_book = collections.Counter(book_id for pk, book_id in rows)
+        counters.adjust_book_copies({book_id: (0, count) for book_id, count in per_book.items()}, using=using)
+        counters.adjust(using, num_instances_available=returned)
+        page_cache.bump(page_cache.BOOK_LIST, *[page_cache.book_key(book_id) for book_id in per_book if book_id])
+    return returned
+
+
+def bulk_renew(copy_ids, due_back, using=DEFAULT_DB_ALIAS):
+    """
+    Cambia a ``due_back`` la fecha de devolución de los ejemplares prestados de
+    ``copy_ids`` con un único UPDATE y devuelve cuántos se renovaron.
+    """
+    with transaction.atomic(using=using):
+        on_loan = BookInstance.objects.using(using).filter(pk__in=copy_ids, status='o')
+        book_ids = set(on_loan.order_by().values_list('book_id', flat=True).distinct())
+        renewed = on_loan.update(due_back=due_back, updated_at=timezone.now())
+        page_cache.bump(*[page_cache.book_key(book_id) for book_id in book_ids if book_id])
+    return renewed
@@ -0,0 +1,283 @@
+import datetime
+import fnmatch
+import http.client
+import json
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from catalog.bench import run_server, summarize
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import QueryCapture, site_routes
+
+USERS = ('anonymous', 'patron', 'librarian')
+LIBRARIAN_USERNAME = 'bench-librarian'
+PATRON_USERNAME = 'bench-patron'
+
+
+class Command(BaseCommand):
+    help = (
+        'Recorre todas las rutas de catalog/urls.py y locallibrary/urls.py como usuario '
+        'anónimo, lector y bibliotecario sobre los datos actuales (ver seed_library) y mide '
+        'peticiones/s, p50/p95/p99, consultas SQL y memoria asignada por petición. Los '
+        'resultados se guardan en JSON (--output) y se comparan con una línea base (--baseline).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--client', choices=['test', 'gunicorn'], default='test',
+            help='test: cliente de pruebas en el mismo proceso (con consultas y memoria). '
+                 'gunicorn: peticiones HTTP a un gunicorn local (sólo tiempos).',
+        )
+        parser.add_argument('--users', nargs='+', choices=USERS, default=list(USERS))
+        parser.add_argument('--routes', nargs='+', default=['*'], help='Patrones (fnmatch) de nombres de ruta.')
+        parser.add_argument(
+            '--exclude', nargs='+', default=['export-*'],
+            help='Rutas excluidas. Por defecto las exportaciones, que recorren todo el catálogo.',
+        )
+        parser.add_argument('--repeat', type=int, default=20, help='Peticiones medidas por ruta y usuario.')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn.')
+        parser.add_argument('--no-page-cache', action='store_true')
+        parser.add_argument('--output', help='Archivo JSON donde guardar los resultados.')
+        parser.add_argument('--baseline', help='Archivo JSON de una ejecución anterior para comparar.')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Aumento de p95 (en %%) a partir del cual una ruta cuenta como regresión.',
+        )
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.created_users = []
+        dataset = self.dataset()
+        clients = {}
+        try:
+            routes = [
+                (name, url) for name, url in site_routes(dataset)
+                if any(fnmatch.fnmatch(name, pattern) for pattern in options['routes'])
+                and not any(fnmatch.fnmatch(name, pattern) for pattern in options['exclude'])
+            ]
+            clients = {user: self.client_for(dataset, user) for user in options['users']}
+
+            page_cache = {} if not options['no_page_cache'] else {'CATALOG_PAGE_CACHE': False}
+            with override_settings(**page_cache):
+                if options['client'] == 'test':
+                    results = self.measure_in_process(clients, routes, options)
+                else:
+                    env = {'DJANGO_PAGE_CACHE': 'False'} if options['no_page_cache'] else {}
+                    with run_server('gunicorn', options['workers'], env) as port:
+                        results = self.measure_http(port, clients, routes, options)
+        finally:
+            self.remove_users(clients)
+
+        self.report(results)
+        report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+            self.stdout.write('Resultados guardados en %s' % path)
+        if options['baseline']:
+            baseline = json.loads(Path(options['baseline']).read_text())
+            regressions = self.compare(baseline, report, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError('%d regresiones respecto de %s.' % (len(regressions), options['baseline']))
+
+    def dataset(self):
+        book = Book.objects.order_by('pk').first()
+        if book is None:
+            raise CommandError('El catálogo está vacío: ejecute seed_library primero.')
+        librarian, created = User.objects.get_or_create(username=LIBRARIAN_USERNAME, defaults={'is_staff': True})
+        if created:
+            librarian.user_permissions.set(Permission.objects.filter(content_type__app_label='catalog'))
+            self.created_users.append(librarian)
+        # Un lector con préstamos, para que "mis préstamos" no salga vacía.
+        patron = User.objects.filter(bookinstance__status='o').exclude(pk=librarian.pk).order_by('pk').first()
+        if patron is None:
+            patron, created = User.objects.get_or_create(username=PATRON_USERNAME)
+            if created:
+                self.created_users.append(patron)
+        return {
+            'librarian': librarian,
+            'patron': patron,
+            'author': Author.objects.order_by('pk').first(),
+            'book': book,
+            'bookinstance': BookInstance.objects.on_loan().order_by('pk').first() or BookInstance.objects.first(),
+            'genre': Genre.objects.order_by('pk').first(),
+        }
+
+    def remove_users(self, clients):
+        """
+        Cierra las sesiones de la medición y borra los usuarios que creó: el bibliotecario
+        tiene todos los permisos del catálogo y no debe quedarse en la base de datos.
+        """
+        for client in clients.values():
+            client.logout()
+        User.objects.filter(pk__in=[user.pk for user in self.created_users]).delete()
+
+    def client_for(self, dataset, user):
+        client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        if user != 'anonymous':
+            client.force_login(dataset[user])
+        return client
+
+    def measure_in_process(self, clients, routes, options):
+        results = {}
+        for user, client in clients.items():
+            for name, url in routes:
+                def get():
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    return response
+
+                for _ in range(options['warmup']):
+                    get()
+                timings, queries = [], []
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    with QueryCapture() as capture:
+                        request_started = time.perf_counter()
+                        response = get()
+                        timings.append((time.perf_counter() - request_started) * 1000)
+                    queries.append(len(capture))
+                elapsed = time.perf_counter() - started
+
+                # Memoria en una petición aparte: tracemalloc vuelve más lentas las medidas.
+                tracemalloc.start()
+                try:
+                    before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    get()
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                results['%s %s' % (user, name)] = self.result(
+                    response.status_code, timings, elapsed, queries=max(queries), alloc_kib=(peak - before) / 1024,
+                )
+        return results
+
+    def measure_http(self, port, clients, routes, options):
+        results = {}
+        for user, client in clients.items():
+            cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+            headers = {'Host': 'localhost'}
+            if cookie is not None:
+                headers['Cookie'] = '%s=%s' % (settings.SESSION_COOKIE_NAME, cookie.value)
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            try:
+                for name, url in routes:
+                    def get():
+                        conn.request('GET', url, headers=headers)
+                        response = conn.getresponse()
+                        response.read()
+                        return response.status
+
+                    for _ in range(options['warmup']):
+                        get()
+                    timings = []
+                    started = time.perf_counter()
+                    for _ in range(options['repeat']):
+                        request_started = time.perf_counter()
+                        status = get()
+                        timings.append((time.perf_counter() - request_started) * 1000)
+                    results['%s %s' % (user, name)] = self.result(status, timings, time.perf_counter() - started)
+            finally:
+                conn.close()
+        return results
+
+    def result(self, status, timings, elapsed, queries=None, alloc_kib=None):
+        stats = summarize(timings)
+        return {
+            'status_code': status,
+            'requests': len(timings),
+            'rps': len(timings) / elapsed if elapsed else None,
+            'p50_ms': stats['p50_ms'],
+            'p95_ms': stats['p95_ms'],
+            'p99_ms': stats['p99_ms'],
+            'queries': queries,
+            'alloc_kib': alloc_kib,
+        }
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'client': options['client'],
+            'database': connection.vendor,
+            'page_cache': not options['no_page_cache'] and getattr(settings, 'CATALOG_PAGE_CACHE', True),
+            'repeat': options['repeat'],
+            'rows': {
+                'authors': Author.objects.count(),
+                'books': Book.objects.count(),
+                'copies': BookInstance.objects.count(),
+                'users': User.objects.count(),
+            },
+        }
+
+    def report(self, results):
+        self.stdout.write('%-48s %6s %8s %9s %9s %9s %8s %10s' % (
+            'usuario ruta', 'estado', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'consultas', 'memoria KiB',
+        ))
+        for key, result in results.items():
+            self.stdout.write('%-48s %6s %8.1f %9.2f %9.2f %9.2f %8s %10s' % (
+                key, result['status_code'], result['rps'], result['p50_ms'], result['p95_ms'], result['p99_ms'],
+                '-' if result['queries'] is None else result['queries'],
+                '-' if result['alloc_kib'] is None else '%.0f' % result['alloc_kib'],
+            ))
+        total = sum(result['requests'] for result in results.values())
+        seconds = sum(result['requests'] / result['rps'] for result in results.values() if result['rps'])
+        if seconds:
+            self.stdout.write('Total: %d peticiones, %.1f req/s' % (total, total / seconds))
+
+    def compare(self, baseline, report, threshold):
+        """
+        Muestra la variación de p50/p95 y consultas por ruta y devuelve las regresiones:
+        p95 más de ``threshold`` % por encima, más consultas o un estado distinto.
+        """
+        self.stdout.write(self.style.MIGRATE_HEADING('\nComparación con %s (%s)' % (
+            baseline['meta'].get('commit') or 'línea base', baseline['meta'].get('created', '?'),
+        )))
+        regressions = []
+        for key, result in report['results'].items():
+            before = baseline['results'].get(key)
+            if before is None:
+                continue
+            p50 = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            p95 = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            queries = (
+                result['queries'] - before['queries']
+                if result['queries'] is not None and before.get('queries') is not None else 0
+            )
+            problems = []
+            if result['status_code'] != before['status_code']:
+                problems.append('estado %s -> %s' % (before['status_code'], result['status_code']))
+            if p95 > threshold:
+                problems.append('p95 %+.0f%%' % p95)
+            if queries > 0:
+                problems.append('%+d consultas' % queries)
+            line = '%-48s p50 %+6.1f%%  p95 %+6.1f%%  consultas %+d' % (key, p50, p95, queries)
+            if problems:
+                regressions.append((key, problems))
+                self.stdout.write(self.style.ERROR(line + '  REGRESIÓN: ' + ', '.join(problems)))
+            else:
+                self.stdout.write(line)
+        missing = set(baseline['results']) - set(report['results'])
+        if missing:
+            self.stdout.write('%d rutas de la línea base no se midieron en esta ejecución.' % len(missing))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Sin regresiones (umbral p95 %.0f%%).' % threshold))
+        return regressions
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog.bench import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el costo de conexión por petición: conexión nueva en cada petición, '
+        'conexión persistente (CONN_MAX_AGE) y, en PostgreSQL, el pool de conexiones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        settings_dict = connection.settings_dict
+        original = (settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'])
+        uses_pool = bool(settings_dict.get('OPTIONS', {}).get('pool'))
+
+        self.stdout.write('Base de datos: %s (%s)' % (connection.vendor, settings_dict['NAME']))
+        try:
+            if uses_pool:
+                # El pool ya está configurado; Django fija CONN_MAX_AGE = 0 en ese caso.
+                scenarios = [('pool de conexiones', 0, False)]
+            else:
+                scenarios = [
+                    ('conexión nueva por petición', 0, False),
+                    ('persistente + health checks', None, True),
+                ]
+            for label, max_age, health_checks in scenarios:
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                connection.close()
+                stats = summarize(self.measure(connection, options['requests']))
+                self.stdout.write('%-32s p50 %.3f ms  p95 %.3f ms  p99 %.3f ms' % (
+                    label, stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                ))
+        finally:
+            settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = original
+            connection.close()
+        if not uses_pool and connection.vendor == 'postgresql':
+            self.stdout.write('Para medir el pool ejecute con DJANGO_DB_POOL=True.')
+
+    def measure(self, connection, requests):
+        # Simula el ciclo de una petición: close_old_connections() corre en
+        # request_started/request_finished y decide si la conexión se reutiliza.
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,111 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog import seeding
+from catalog.bench import summarize, time_calls
+from catalog.models import BookInstance
+from catalog.pagination import FORWARD, CursorPaginator
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara los planes (EXPLAIN) y tiempos de las consultas de préstamos con y sin '
+        'los índices compuestos de BookInstance, en la primera página y en una página profunda. '
+        'Borra los índices mientras mide: úsese en una base de datos de pruebas, no en producción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Ejemplares esperados en la tabla.')
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Inserta ejemplares sintéticos hasta llegar a --rows. Sin esta opción se usan los datos existentes.',
+        )
+        parser.add_argument('--repeat', type=int, default=50, help='Repeticiones por consulta.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='No pide confirmación antes de borrar los índices.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['interactive']:
+            confirm = input(
+                'Se borrarán los índices de préstamos de la base de datos "%s" mientras dura la medición '
+                '(se recrean al final).\nEscriba "yes" para continuar, o "no" para cancelar: ' % using
+            )
+            if confirm != 'yes':
+                raise CommandError('Medición cancelada.')
+        if options['seed']:
+            self.seed(using, options['rows'])
+        borrower_id = (
+            BookInstance.objects.using(using).filter(status='o', borrower__isnull=False)
+            .values_list('borrower_id', flat=True).first()
+        )
+        total = BookInstance.objects.using(using).count()
+        self.stdout.write('Ejemplares en la tabla: %d' % total)
+
+        queries = {
+            'all-borrowed': BookInstance.objects.using(using).filter(status='o'),
+            'my-borrowed': BookInstance.objects.using(using).filter(borrower_id=borrower_id, status='o'),
+        }
+        # La misma consulta que ejecutan las vistas: páginas por cursor sobre due_back.
+        paginators = {name: CursorPaginator(queryset, 10, ['due_back']) for name, queryset in queries.items()}
+        cursors = {name: self.deep_cursor(paginator) for name, paginator in paginators.items()}
+        indexes = BookInstance._meta.indexes
+        connection = connections[using]
+
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.remove_index(BookInstance, index)
+        try:
+            self.analyze(connection)
+            before = self.measure(paginators, cursors, options['repeat'])
+        finally:
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.add_index(BookInstance, index)
+        self.analyze(connection)
+        after = self.measure(paginators, cursors, options['repeat'])
+
+        for name in queries:
+            for page in ('primera página', 'página profunda'):
+                self.stdout.write(self.style.MIGRATE_HEADING('\n%s, %s' % (name, page)))
+                for label, results in (('sin índices', before), ('con índices', after)):
+                    plan, stats = results[name, page]
+                    self.stdout.write('  %s: p50 %.2f ms, p95 %.2f ms' % (label, stats['p50_ms'], stats['p95_ms']))
+                    for line in plan.splitlines():
+                        self.stdout.write('    ' + line)
+
+    def deep_cursor(self, paginator):
+        """
+        Cursor de la página que empieza a mitad de los resultados: con OFFSET sería la más
+        cara; por cursor debería costar lo mismo que la primera.
+        """
+        queryset = paginator.queryset.order_by(*paginator._ordering())
+        middle = queryset.count() // 2
+        rows = list(queryset[middle:middle + 1])
+        return paginator.encode_cursor(FORWARD, rows[0]) if rows else None
+
+    def measure(self, paginators, cursors, repeat):
+        results = {}
+        for name, paginator in paginators.items():
+            for page, cursor in (('primera página', None), ('página profunda', cursors[name])):
+                plan = paginator._page_queryset(cursor)[2].explain()
+                stats = summarize(time_calls(lambda: paginator.page(cursor), repeat))
+                results[name, page] = (plan, stats)
+        return results
+
+    def analyze(self, connection):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(BookInstance._meta.db_table))
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def seed(self, using, rows):
+        missing = rows - BookInstance.objects.using(using).count()
+        if missing <= 0:
+            return
+        self.stdout.write('Insertando %d ejemplares sintéticos...' % missing)
+        seeding.seed_library(authors=100, genres=10, books=1000, users=200, copies=missing, seed=6, using=using)
@@ -0,0 +1,91 @@
+import http.client
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from catalog.bench import SERVERS, run_server, summarize
+from catalog.models import Author, Book
+
+
+class Command(BaseCommand):
+    help = (
+        'Levanta el sitio con gunicorn (WSGI) y con uvicorn (ASGI, vistas asíncronas) sobre '
+        'la base de datos configurada y mide peticiones por segundo y percentiles de '
+        'latencia con clientes concurrentes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['gunicorn', 'uvicorn'])
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=16, help='Clientes simultáneos.')
+        parser.add_argument('--requests', type=int, default=2000, help='Peticiones por servidor.')
+        parser.add_argument(
+            '--no-page-cache', action='store_true',
+            help='Desactiva la cache de páginas anónimas para medir las vistas y no la cache.',
+        )
+
+    def handle(self, *args, **options):
+        paths = self.paths()
+        self.stdout.write('Rutas: %s' % ', '.join(paths))
+        env = {'DJANGO_PAGE_CACHE': 'False'} if options['no_page_cache'] else {}
+        for name in options['servers']:
+            with run_server(name, options['workers'], env) as port:
+                # Calentamiento: conexiones, caches y workers listos antes de medir.
+                self.load(port, paths, options['concurrency'], options['concurrency'] * len(paths))
+                timings, errors, elapsed = self.load(port, paths, options['concurrency'], options['requests'])
+            stats = summarize(timings)
+            self.stdout.write(self.style.MIGRATE_HEADING(SERVERS[name][0]))
+            self.stdout.write('  %.0f req/s  p50 %.2f ms  p95 %.2f ms  p99 %.2f ms  errores %d' % (
+                len(timings) / elapsed, stats['p50_ms'] or 0, stats['p95_ms'] or 0, stats['p99_ms'] or 0, errors,
+            ))
+
+    def paths(self):
+        paths = [reverse('index'), reverse('books'), reverse('authors')]
+        book = Book.objects.only('pk').first()
+        author = Author.objects.only('pk').first()
+        if book is not None:
+            paths.append(book.get_absolute_url())
+        if author is not None:
+            paths.append(author.get_absolute_url())
+        return paths
+
+    def load(self, port, paths, concurrency, requests):
+        """
+        Reparte ``requests`` peticiones GET entre ``concurrency`` hilos con conexiones
+        keep-alive. Devuelve (tiempos en ms, errores, segundos transcurridos).
+        """
+        timings, errors = [], [0]
+        lock = threading.Lock()
+        counter = iter(range(requests))
+
+        def client():
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            local_timings, local_errors = [], 0
+            for number in counter:
+                started = time.perf_counter()
+                try:
+                    connection.request('GET', paths[number % len(paths)], headers={'Host': 'localhost'})
+                    response = connection.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        local_errors += 1
+                    else:
+                        local_timings.append((time.perf_counter() - started) * 1000)
+                except (OSError, http.client.HTTPException):
+                    local_errors += 1
+                    connection.close()
+                    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            connection.close()
+            with lock:
+                timings.extend(local_timings)
+                errors[0] += local_errors
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, errors[0], time.perf_counter() - started
@@ -0,0 +1,125 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog.bench import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide lecturas y escrituras concurrentes (N hilos lectores + M escritores) sobre un '
+        'archivo SQLite temporal, con la configuración por defecto y con el perfil de '
+        'producción (SQLITE_PRAGMAS, transacciones IMMEDIATE, busy timeout).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0, help='Segundos por perfil.')
+        parser.add_argument('--rows', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('por defecto', {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0}),
+            ('perfil de producción', {
+                'pragmas': settings.SQLITE_PRAGMAS,
+                'begin': 'BEGIN IMMEDIATE',
+                'timeout': float(settings.SQLITE_BUSY_TIMEOUT),
+            }),
+        ]
+        for label, profile in profiles:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                path = os.path.join(tmpdir, 'bench.sqlite3')
+                self.create_table(path, options['rows'], profile)
+                results = self.run(path, profile, options)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for kind in ('reads', 'writes'):
+                timings, errors = results[kind]
+                stats = summarize(timings)
+                self.stdout.write('  %-6s %8.0f ops/s  p50 %.2f ms  p99 %.2f ms  errores "locked": %d' % (
+                    kind, len(timings) / options['duration'], stats['p50_ms'] or 0, stats['p99_ms'] or 0, errors,
+                ))
+
+    def connect(self, path, profile):
+        connection = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        for name, value in profile['pragmas'].items():
+            connection.execute('PRAGMA %s=%s' % (name, value))
+        return connection
+
+    def create_table(self, path, rows, profile):
+        connection = self.connect(path, profile)
+        connection.execute(
+            'CREATE TABLE loan (id INTEGER PRIMARY KEY, status TEXT NOT NULL, due_back TEXT, borrower_id INTEGER)'
+        )
+        connection.execute('CREATE INDEX loan_status_due ON loan (status, due_back, id)')
+        rng = random.Random(13)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO loan (status, due_back, borrower_id) VALUES (?, ?, ?)',
+            ((rng.choice('aomr'), '2030-01-%02d' % rng.randint(1, 28), rng.randint(1, 500)) for _ in range(rows)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, profile, options):
+        stop = threading.Event()
+        results = {'reads': ([], [0]), 'writes': ([], [0])}
+        lock = threading.Lock()
+
+        def reader():
+            connection = self.connect(path, profile)
+            timings, errors = [], 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute(
+                        "SELECT id, due_back FROM loan WHERE status = 'o' ORDER BY due_back, id LIMIT 10"
+                    ).fetchall()
+                    timings.append((time.perf_counter() - started) * 1000)
+                except sqlite3.OperationalError:
+                    errors += 1
+            connection.close()
+            with lock:
+                results['reads'][0].extend(timings)
+                results['reads'][1][0] += errors
+
+        def writer(seed):
+            # Igual que una renovación: leer el ejemplar y actualizarlo en la misma transacción.
+            connection = self.connect(path, profile)
+            rng = random.Random(seed)
+            timings, errors = [], 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                pk = rng.randint(1, options['rows'])
+                try:
+                    connection.execute(profile['begin'])
+                    connection.execute('SELECT status FROM loan WHERE id = ?', (pk,)).fetchone()
+                    connection.execute(
+                        "UPDATE loan SET due_back = ? WHERE id = ?", ('2030-02-%02d' % rng.randint(1, 28), pk),
+                    )
+                    connection.execute('COMMIT')
+                    timings.append((time.perf_counter() - started) * 1000)
+                except sqlite3.OperationalError:
+                    errors += 1
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+            connection.close()
+            with lock:
+                results['writes'][0].extend(timings)
+                results['writes'][1][0] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(seed,)) for seed in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return {kind: (timings, errors[0]) for kind, (timings, errors) in results.items()}
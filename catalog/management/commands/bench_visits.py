@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from catalog import counters
+
+SESSION_WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las escrituras a django_session por cada N visitas a la página de inicio, '
+        'con el contador clásico y con el contador agrupado. Los cambios se revierten al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        scenarios = [
+            ('escritura por visita (sesiones en BD)', {
+                'CATALOG_VISITS_FLUSH_EVERY': 1,
+                'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+            }),
+            ('agrupado, cached_db', {
+                'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+            }),
+            ('cookies firmadas', {
+                'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+            }),
+        ]
+        counters.rebuild()
+        for label, overrides in scenarios:
+            with override_settings(**overrides):
+                writes = self.measure(options['requests'], options['database'])
+            self.stdout.write('%-40s %6d escrituras / %d visitas' % (label, writes, options['requests']))
+
+    def measure(self, requests, using):
+        client = Client(HTTP_HOST='localhost')
+        url = reverse('index')
+        connection = connections[using]
+        try:
+            with transaction.atomic(using=using):
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(requests):
+                        client.get(url)
+                raise Rollback
+        except Rollback:
+            pass
+        return sum(
+            1 for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith(SESSION_WRITES) and 'django_session' in query['sql']
+        )
@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from catalog import exports
+
+
+class Command(BaseCommand):
+    help = 'Exporta el catálogo o los ejemplares en CSV/JSONL sin cargar las tablas en memoria.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS), help='books o loans.')
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida con gzip.')
+        parser.add_argument('-o', '--output', help='Archivo de salida (por defecto stdout).')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        chunks = exports.stream(
+            options['kind'], options['format'], compress=options['gzip'],
+            chunk_size=options['chunk_size'], using=options['database'],
+        )
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from catalog import page_cache
+
+
+class Command(BaseCommand):
+    help = 'Muestra los aciertos y fallos de la cache de páginas anónimas.'
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'CATALOG_SHARED_CACHE', True):
+            self.stderr.write(
+                'La cache es de este proceso: estas cifras no son las del servidor (y la cache '
+                'de páginas sólo se activa con una cache compartida).'
+            )
+        values = page_cache.stats()
+        self.stdout.write('hits: %(hits)d\nmisses: %(misses)d\nhit_ratio: %(hit_ratio).3f' % values)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from catalog import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde cero los contadores del catálogo y los guarda en la cache, y '
+        'corrige los contadores de ejemplares de cada libro con un único UPDATE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        values = counters.rebuild(using)
+        for name in counters.COUNTER_NAMES:
+            self.stdout.write('%s: %s' % (name, values[name]))
+        if not counters.is_shared():
+            self.stderr.write(
+                'La cache es de este proceso: los servidores en marcha recalculan sus '
+                'contadores al caducar (%d s).' % counters.LOCAL_CACHE_TIMEOUT
+            )
+        stale = counters.stale_book_copies(using).count()
+        if stale:
+            counters.rebuild_book_copies(using=using)
+        self.stdout.write('Libros con contadores de ejemplares desajustados: %d' % stale)
+        self.stdout.write(self.style.SUCCESS('Contadores reconstruidos.'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye en bloque el índice de búsqueda de texto completo de los libros.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Base de datos a reindexar.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic(using=options['database']):
+            search.rebuild(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            'Índice de búsqueda reconstruido en %.2f s.' % (time.perf_counter() - started)
+        ))
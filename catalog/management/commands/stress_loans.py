@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from catalog import counters, loans
+from catalog.bench import summarize
+from catalog.models import Book, BookInstance
+
+PREFIX = 'stress-loans'
+LOCK_RETRIES = 50
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de catalog/loans.py: varios hilos prestan y devuelven a la vez copias '
+        'de unos pocos libros (mucha contención). Comprueba que ninguna copia se prestó dos '
+        'veces y que los contadores de ejemplares cuadran, y mide préstamos por segundo. '
+        'Crea sus propios libros, ejemplares y lectores en la base de datos y los borra al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--books', type=int, default=3)
+        parser.add_argument('--copies', type=int, default=4, help='Copias por libro.')
+        parser.add_argument('--operations', type=int, default=200, help='Préstamos por hilo.')
+
+    def handle(self, *args, **options):
+        books, users = self.setup(options)
+        try:
+            results = self.run(books, users, options)
+            on_loan = BookInstance.objects.filter(book__in=books, status='o').count()
+            stale = counters.stale_book_copies().filter(pk__in=[book.pk for book in books]).count()
+        finally:
+            self.cleanup(books, users)
+
+        stats = summarize(results['checkout_ms'])
+        self.stdout.write('Hilos: %d, copias: %d' % (options['threads'], options['books'] * options['copies']))
+        self.stdout.write('Préstamos: %d (%.0f/s), sin copia libre: %d, reintentos por bloqueo: %d' % (
+            len(results['checkout_ms']), len(results['checkout_ms']) / results['elapsed'],
+            results['unavailable'], results['lock_retries'],
+        ))
+        self.stdout.write('Préstamo p50 %.2f ms, p99 %.2f ms' % (stats['p50_ms'] or 0, stats['p99_ms'] or 0))
+        self.stdout.write('Préstamos dobles: %d, copias sin devolver: %d, libros con contadores desajustados: %d' % (
+            len(results['double_loans']), on_loan, stale,
+        ))
+        if results['errors']:
+            raise CommandError('Errores en los hilos: %s' % '; '.join(results['errors'][:5]))
+        if results['double_loans'] or on_loan or stale:
+            raise CommandError('Los préstamos concurrentes dejaron datos inconsistentes.')
+        self.stdout.write(self.style.SUCCESS('Sin préstamos dobles.'))
+
+    def setup(self, options):
+        books = [
+            Book.objects.create(title='%s %d' % (PREFIX, i), summary=PREFIX, isbn='0')
+            for i in range(options['books'])
+        ]
+        for book in books:
+            for _ in range(options['copies']):
+                BookInstance.objects.create(book=book, imprint=PREFIX, status='a')
+        users = [
+            User.objects.get_or_create(username='%s-%d' % (PREFIX, i))[0] for i in range(options['threads'])
+        ]
+        return books, users
+
+    def cleanup(self, books, users):
+        BookInstance.objects.filter(book__in=books).delete()
+        Book.objects.filter(pk__in=[book.pk for book in books]).delete()
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def run(self, books, users, options):
+        lock = threading.Lock()
+        held = set()
+        results = {
+            'checkout_ms': [], 'unavailable': 0, 'lock_retries': 0, 'double_loans': [], 'errors': [],
+        }
+
+        def retry(operation):
+            # Sin el perfil de producción de SQLite (transacciones IMMEDIATE y busy timeout)
+            # las escrituras concurrentes fallan con "database is locked": se reintentan.
+            for attempt in range(LOCK_RETRIES):
+                try:
+                    return operation()
+                except OperationalError as e:
+                    if 'locked' not in str(e) or attempt == LOCK_RETRIES - 1:
+                        raise
+                    with lock:
+                        results['lock_retries'] += 1
+                    time.sleep(0.001 * (attempt + 1))
+
+        def give_back(copy_id):
+            # Se suelta antes de devolver: hasta que la devolución confirme nadie más puede tomarla.
+            with lock:
+                held.discard(copy_id)
+            retry(lambda: loans.return_copy(copy_id))
+
+        def worker(number):
+            # Cada hilo retiene su préstamo anterior mientras pide el siguiente.
+            rng = random.Random(number)
+            user = users[number]
+            current = None
+            try:
+                for _ in range(options['operations']):
+                    book = rng.choice(books)
+                    started = time.perf_counter()
+                    try:
+                        copy_id = retry(lambda: loans.checkout(book.pk, user))
+                    except loans.NoCopyAvailable:
+                        with lock:
+                            results['unavailable'] += 1
+                        continue
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        results['checkout_ms'].append(elapsed)
+                        if copy_id in held:
+                            results['double_loans'].append(copy_id)
+                        held.add(copy_id)
+                    if current is not None:
+                        give_back(current)
+                    current = copy_id
+                if current is not None:
+                    give_back(current)
+            except Exception as e:
+                with lock:
+                    results['errors'].append('%s: %s' % (type(e).__name__, e))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results['elapsed'] = time.perf_counter() - started
+        return results
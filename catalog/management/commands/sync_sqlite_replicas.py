@@ -0,0 +1,37 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia la base de datos SQLite primaria en las réplicas SQLite configuradas con '
+        'DATABASE_REPLICA_URLS. Sirve para probar en local el enrutado a réplicas: cada '
+        'ejecución equivale a que la réplica alcance a la primaria.'
+    )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        replicas = [
+            alias for alias in getattr(settings, 'DATABASE_REPLICAS', [])
+            if settings.DATABASES[alias]['ENGINE'] == SQLITE_ENGINE
+        ]
+        if primary['ENGINE'] != SQLITE_ENGINE or not replicas:
+            raise CommandError('Hace falta una primaria SQLite y al menos una réplica SQLite en DATABASE_REPLICA_URLS.')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(str(settings.DATABASES[alias]['NAME']))
+                try:
+                    # La API de backup copia una instantánea consistente aunque haya escrituras.
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write('%s <- default (%s)' % (alias, settings.DATABASES[alias]['NAME']))
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS('Réplicas sincronizadas.'))
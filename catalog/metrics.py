@@ -0,0 +1,123 @@
+"""
+Métricas de la aplicación en formato Prometheus (GET /metrics).
+
+MetricsMiddleware cuenta las peticiones y su latencia por nombre de ruta (``books``,
+``book-detail``, ``renew-book-librarian``...), y las consultas SQL y el tiempo en la
+base de datos que gastó cada ruta (con el mismo execute_wrapper que catalog/profiling.py).
+La cache de páginas y los contadores del catálogo registran sus aciertos y fallos.
+
+Con varios procesos (workers de gunicorn o uvicorn) los valores no se guardan en
+variables del proceso sino en archivos mapeados en memoria dentro de
+PROMETHEUS_MULTIPROC_DIR, uno por proceso, y /metrics suma los de todos
+(el modo multiproceso de prometheus_client). gunicorn.conf.py crea y vacía ese
+directorio al arrancar y da de baja los archivos de los workers que terminan.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+from . import profiling
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+REQUESTS = Counter(
+    'catalog_http_requests', 'Peticiones HTTP atendidas.', ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'catalog_http_request_duration_seconds', 'Duración de las peticiones HTTP.', ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Counter('catalog_db_queries', 'Consultas SQL ejecutadas por las peticiones.', ['view'])
+DB_SECONDS = Counter('catalog_db_query_seconds', 'Tiempo de las consultas SQL de las peticiones.', ['view'])
+CACHE_REQUESTS = Counter(
+    'catalog_cache_requests', 'Lecturas de cache: result="hit" o "miss".', ['cache', 'result'],
+)
+
+
+def cache_result(name, hit):
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def view_label(request):
+    # Las rutas que no resuelven (404) comparten etiqueta: la ruta en sí no está acotada.
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Debe ir primero en MIDDLEWARE, antes de RequestProfilingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'CATALOG_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        profiling.watch_queries()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = profiling.begin()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.end(token)
+        self.observe(request, response, state, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        state, token = profiling.begin()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.end(token)
+        self.observe(request, response, state, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, response, state, elapsed):
+        view = view_label(request)
+        method = request.method if request.method in METHODS else 'other'
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+        LATENCY.labels(view).observe(elapsed)
+        if state['queries']:
+            DB_QUERIES.labels(view).inc(state['queries'])
+            DB_SECONDS.labels(view).inc(state['db'])
+
+
+def registry():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Exposición para Prometheus. Sólo la ven los usuarios staff o, si se define
+    CATALOG_METRICS_TOKEN, quien envíe ``Authorization: Bearer <token>`` (el
+    ``bearer_token`` del scrape_config). Con CATALOG_METRICS=False no existe (404).
+    """
+    if not getattr(settings, 'CATALOG_METRICS', False):
+        raise Http404
+    token = getattr(settings, 'CATALOG_METRICS_TOKEN', '')
+    has_token = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), 'Bearer ' + token)
+    if not has_token and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
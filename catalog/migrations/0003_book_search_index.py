@@ -0,0 +1,82 @@
+# Índice de texto completo para libros (ver catalog/search.py).
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE catalog_book_fts USING fts5("
+            "title, summary, authors, genres, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE catalog_book_search ("
+            "book_id bigint PRIMARY KEY REFERENCES catalog_book (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX catalog_book_search_document_idx ON catalog_book_search USING GIN (document)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS catalog_book_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS catalog_book_search")
+
+
+def populate_search_index(apps, schema_editor):
+    # Copia del INSERT ... SELECT de catalog/search.py tal como era al crear el índice: una
+    # migración no debe depender de código de la aplicación que puede cambiar después.
+    connection = schema_editor.connection
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    qn = connection.ops.quote_name
+    Book = apps.get_model('catalog', 'Book')
+    book = qn(Book._meta.db_table)
+    author = qn(apps.get_model('catalog', 'Author')._meta.db_table)
+    genre = qn(apps.get_model('catalog', 'Genre')._meta.db_table)
+    book_genre = qn(Book.genre.through._meta.db_table)
+    if connection.vendor == 'postgresql':
+        genres = "string_agg(g.name, ' ')"
+        author_name = "concat_ws(' ', a.first_name, a.last_name)"
+    else:
+        genres = "group_concat(g.name, ' ')"
+        author_name = "COALESCE(a.first_name || ' ' || a.last_name, '')"
+    source = (
+        f"SELECT b.id, b.title, b.summary, {author_name}, "
+        f"COALESCE((SELECT {genres} FROM {book_genre} bg "
+        f"JOIN {genre} g ON g.id = bg.genre_id WHERE bg.book_id = b.id), '') "
+        f"FROM {book} b LEFT JOIN {author} a ON a.id = b.author_id"
+    )
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO catalog_book_fts (rowid, title, summary, authors, genres) {source}")
+        else:
+            config = getattr(settings, 'CATALOG_SEARCH_CONFIG', 'simple')
+            cursor.execute(
+                "INSERT INTO catalog_book_search (book_id, document) "
+                "SELECT id, setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') "
+                "|| setweight(to_tsvector(%s::regconfig, coalesce(authors, '')), 'B') "
+                "|| setweight(to_tsvector(%s::regconfig, coalesce(genres, '')), 'C') "
+                "|| setweight(to_tsvector(%s::regconfig, coalesce(summary, '')), 'D') "
+                f"FROM ({source}) AS src (id, title, summary, authors, genres)",
+                [config] * 4,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_alter_author_options_alter_bookinstance_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_copies(apps, schema_editor):
+    # Un único UPDATE con subconsultas, como catalog.counters.rebuild_book_copies().
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def copies(**filters):
+        return Coalesce(Subquery(
+            BookInstance.objects.filter(book=OuterRef('pk'), **filters)
+            .order_by().values('book').annotate(count=Count('pk')).values('count')
+        ), 0)
+
+    Book.objects.using(schema_editor.connection.alias).update(
+        copies_total=copies(), copies_available=copies(status='a'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_bookinstance_loan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_copies, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-copies_available', 'title', 'id'], name='book_available_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.urls import reverse #Used to generate URLs by reversing the URL patterns
 import uuid # Requerida para las instancias de libros únicos
 from django.contrib.auth.models import User  # NUEVA importación
@@ -40,12 +40,43 @@ class Book(models.Model):
     # ManyToManyField, porque un género puede contener muchos libros y un libro puede cubrir varios géneros.
     # La clase Genre ya ha sido definida, entonces podemos especificar el objeto arriba.
 
+    # Contadores de ejemplares, para mostrar la disponibilidad sin leer bookinstance_set.
+    # Los mantienen las señales de BookInstance con UPDATE ... F() en la misma transacción
+    # (catalog/signals.py); rebuild_counters los recalcula.
+    copies_total = models.IntegerField(default=0, editable=False)
+    copies_available = models.IntegerField(default=0, editable=False)
+
+    COPY_COUNTER_FIELDS = ('copies_total', 'copies_available')
+
+    # Última modificación de lo que muestra la página del libro (GET condicional,
+    # catalog/conditional.py). También la cambian los ejemplares y los géneros.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # BookListView ordenada por disponibilidad (?sort=available)
+            models.Index(fields=['-copies_available', 'title', 'id'], name='book_available_idx'),
+            # BookListView y la API: orden por título con el pk como desempate (paginación por cursor)
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+        ]
+
     def __str__(self):
         """
         String que representa al objeto Book
         """
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Un Book leído antes de prestar o devolver un ejemplar tiene contadores viejos:
+        # al guardarlo no se escriben, sólo los cambian los UPDATE de las señales.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COPY_COUNTER_FIELDS
+                and field.attname not in self.get_deferred_fields()
+            ]
+        super().save(*args, **kwargs)
+
 
     def get_absolute_url(self):
         """
@@ -60,6 +91,31 @@ class Book(models.Model):
         return ', '.join([ genre.name for genre in self.genre.all()[:3] ])
     display_genre.short_description = 'Genre'
 
+class BookInstanceQuerySet(models.QuerySet):
+    """
+    Consultas de préstamos resueltas en SQL (en vez de recorrer los ejemplares en Python).
+    """
+
+    def on_loan(self):
+        return self.filter(status__exact='o')
+
+    def overdue(self, today=None):
+        """
+        Ejemplares prestados con fecha de devolución vencida. Usa los índices de préstamos.
+        """
+        return self.on_loan().filter(due_back__lt=today or date.today())
+
+    def with_is_overdue(self, today=None):
+        """
+        Anota is_overdue calculado por la base de datos (misma regla que la propiedad).
+        """
+        return self.annotate(is_overdue=models.Case(
+            models.When(due_back__lt=today or date.today(), then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField(),
+        ))
+
+
 class BookInstance(models.Model):
     """
     Modelo que representa una copia específica de un libro (i.e. que puede ser prestado por la biblioteca).
@@ -78,22 +134,48 @@ class BookInstance(models.Model):
     )
 
     status = models.CharField(max_length=1, choices=LOAN_STATUS, blank=True, default='m', help_text='Disponibilidad del libro')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookInstanceQuerySet.as_manager()
     
     @property
     def is_overdue(self):
+        # Si la consulta ya lo anotó (with_is_overdue) no lo recalculamos.
+        if '_is_overdue' in self.__dict__:
+            return self._is_overdue
         if self.due_back and date.today() > self.due_back:
             return True
         return False
+
+    @is_overdue.setter
+    def is_overdue(self, value):
+        self._is_overdue = value
     
     class Meta:
         ordering = ["due_back"]
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # AllLoanedBooksListView: status='o' ordenado por due_back (y pk como desempate)
+            models.Index(fields=['status', 'due_back', 'id'], name='bookinst_status_due_idx'),
+            # LoanedBooksByUserListView: borrower + status='o' ordenado por due_back
+            models.Index(fields=['borrower', 'status', 'due_back', 'id'], name='bookinst_borrower_due_idx'),
+            # Índice parcial sólo con los préstamos activos (PostgreSQL y SQLite lo soportan)
+            models.Index(
+                fields=['due_back', 'id'], condition=models.Q(status='o'), name='bookinst_onloan_due_idx',
+            ),
+        ]
 
     def __str__(self):
         """
         String para representar el Objeto del Modelo
         """
         return '%s (%s)' % (self.id,self.book.title)
+
+    def save(self, *args, **kwargs):
+        # post_save actualiza los contadores de Book: que sea en la misma transacción que el ejemplar.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
     
 class Author(models.Model):
     """
@@ -103,9 +185,16 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('died', null=True, blank=True)
+    # Incluye los cambios en la lista de libros del autor (ver catalog/signals.py).
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['last_name']
+        indexes = [
+            # AuthorListView y la API: orden por apellido con el pk como desempate
+            models.Index(fields=['last_name', 'id'], name='author_last_name_idx'),
+        ]
+
     def get_absolute_url(self):
         """
         Retorna la url para acceder a una instancia particular de un autor.
@@ -119,3 +208,16 @@ class Author(models.Model):
         """
         return '%s, %s' % (self.last_name, self.first_name)
 
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Filas ya importadas de un archivo por import_catalog. Se guarda en la misma
+    transacción que cada lote, así al reanudar no se repite ni se salta ningún lote.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s (%d filas)' % (self.name, self.rows)
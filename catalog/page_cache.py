@@ -0,0 +1,213 @@
+"""
+Cache de respuestas completas para visitantes anónimos.
+
+Cada página depende de una o más claves de versión (p. ej. ``book:3`` o ``books``) que
+se guardan en la cache. La clave de la página incluye esas versiones, así que basta con
+incrementar una versión para que todas las páginas que dependen de ella dejen de
+servirse. Las señales de catalog/signals.py incrementan las versiones al guardar o
+borrar Book, Author, Genre y BookInstance. Un acierto sólo lee la cache: no toca la
+base de datos. Con la página se guardan su ETag y Last-Modified (catalog/conditional.py),
+así un acierto también puede responder 304.
+
+Las versiones y las páginas viven en la cache por defecto, que tiene que ser compartida
+por todos los procesos: con LocMemCache un worker no vería las versiones que incrementa
+otro y seguiría sirviendo sus copias. Por eso settings sólo activa CATALOG_PAGE_CACHE con
+una cache compartida (CATALOG_SHARED_CACHE).
+"""
+import hashlib
+import inspect
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import metrics
+
+VERSION_PREFIX = 'catalog:page-version:'
+PAGE_PREFIX = 'catalog:page:'
+STATS_PREFIX = 'catalog:page-stats:'
+LAST_CHANGE_KEY = 'catalog:page-last-change'
+PAGE_TIMEOUT = 60 * 60
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+BOOK_LIST = 'books'
+AUTHOR_LIST = 'authors'
+# Nombres de los géneros y qué libros tiene cada uno (la API los incrusta en las listas).
+GENRE_LIST = 'genres'
+
+
+def book_key(pk):
+    return 'book:%s' % pk
+
+
+def author_key(pk):
+    return 'author:%s' % pk
+
+
+def _new_version():
+    # Si una versión se pierde de la cache no la reiniciamos a 1: podría coincidir con
+    # páginas viejas todavía guardadas. Un valor basado en el reloj no se repite.
+    return time.time_ns()
+
+
+def get_versions(dependencies):
+    keys = [VERSION_PREFIX + dependency for dependency in dependencies]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        for key, value in missing.items():
+            if not cache.add(key, value, None):
+                value = cache.get(key, value)
+            versions[key] = value
+    return [versions[key] for key in keys]
+
+
+def _bump(dependencies):
+    for dependency in dependencies:
+        key = VERSION_PREFIX + dependency
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def bump(*dependencies):
+    """
+    Invalida las páginas que dependen de ``dependencies``. Se incrementa ahora y otra vez
+    al confirmar la transacción, para descartar también lo que se haya guardado en la
+    cache mientras el cambio aún no era visible.
+    """
+    dependencies = [dependency for dependency in dependencies if dependency]
+    if not dependencies:
+        return
+    _bump(dependencies)
+    transaction.on_commit(lambda: _committed(dependencies))
+
+
+def _committed(dependencies):
+    _bump(dependencies)
+    if getattr(settings, 'DATABASE_REPLICAS', None):
+        cache.set(LAST_CHANGE_KEY, time.time(), None)
+
+
+def _replicas_may_lag():
+    # Con réplicas, una página generada justo después de un cambio puede salir de una
+    # réplica que aún no lo tiene; se sirve pero no se guarda hasta que pase el retraso.
+    if not getattr(settings, 'DATABASE_REPLICAS', None):
+        return False
+    changed_at = cache.get(LAST_CHANGE_KEY)
+    return changed_at is not None and time.time() - changed_at < settings.DATABASE_REPLICA_LAG
+
+
+def is_enabled():
+    return getattr(settings, 'CATALOG_PAGE_CACHE', True)
+
+
+def is_cacheable(request):
+    return is_enabled() and request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+
+def page_key(request, dependencies):
+    versions = get_versions(dependencies)
+    raw = '%s|%s' % (request.get_full_path(), '|'.join(str(version) for version in versions))
+    return PAGE_PREFIX + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _count(name):
+    key = STATS_PREFIX + name
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def fetch(key):
+    cached = cache.get(key)
+    metrics.cache_result('page', cached is not None)
+    if cached is None:
+        _count('misses')
+        return None
+    _count('hits')
+    content, content_type, validators = cached
+    response = HttpResponse(content, content_type=content_type, headers=validators)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def store(key, response):
+    if response.status_code == 200 and not response.streaming and not response.cookies and not _replicas_may_lag():
+        validators = {header: response[header] for header in VALIDATOR_HEADERS if response.has_header(header)}
+        cache.set(key, (response.content, response['Content-Type'], validators), PAGE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def stats():
+    values = cache.get_many([STATS_PREFIX + 'hits', STATS_PREFIX + 'misses'])
+    hits = values.get(STATS_PREFIX + 'hits', 0)
+    misses = values.get(STATS_PREFIX + 'misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def lookup(request, dependencies):
+    """
+    Devuelve la clave de la página y la respuesta guardada (o None), que es un 304 si el
+    navegador ya tiene esa versión.
+    """
+    key = page_key(request, dependencies)
+    response = fetch(key)
+    if response is not None and any(response.has_header(header) for header in VALIDATOR_HEADERS):
+        response = get_conditional_response(
+            request, etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(response.get('Last-Modified', '')), response=response,
+        )
+    return key, response
+
+
+def render_and_store(key, response):
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return store(key, response)
+
+
+class CachedPageMixin:
+    """
+    Sirve la vista desde la cache a los visitantes anónimos. Las subclases indican de
+    qué versiones depende la página con get_cache_dependencies().
+
+    En vistas asíncronas request.user ya debe estar cargado (ver catalog/async_views.py)
+    y la cache se consulta en un solo salto a hilo: los backends de cache de Django
+    implementan su API asíncrona con sync_to_async llamada a llamada.
+    """
+
+    def get_cache_dependencies(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        if not is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        key, response = lookup(request, self.get_cache_dependencies())
+        if response is not None:
+            return response
+        return render_and_store(key, super().dispatch(request, *args, **kwargs))
+
+    async def _adispatch(self, request, *args, **kwargs):
+        if not is_cacheable(request):
+            response = super().dispatch(request, *args, **kwargs)
+            return await response if inspect.isawaitable(response) else response
+        key, response = await sync_to_async(lookup)(request, self.get_cache_dependencies())
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return await sync_to_async(render_and_store)(key, response)
@@ -0,0 +1,263 @@
+"""
+Paginación por cursor (keyset) para las listas del catálogo.
+
+En lugar de OFFSET y un COUNT(*) por página, cada página filtra a partir de los valores
+de ordenación de la última (o primera) fila de la página anterior, con el pk como
+desempate. Cualquier página cuesta lo mismo que la primera. Los cursores son opacos:
+JSON en base64 con la dirección y los valores de la fila límite.
+
+El admin pagina por número de página; EstimatedCountPaginator le evita el COUNT(*) de
+las tablas grandes sin filtrar.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import QuerySet
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """
+    Página de resultados con la interfaz mínima de django.core.paginator.Page.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %d items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _to_json(value):
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    return value
+
+
+class CursorPaginator:
+    """
+    Pagina ``queryset`` según ``ordering`` (nombres de campo, con '-' para descendente).
+    El pk se agrega siempre como último criterio. Los NULL quedan donde los pone la base
+    de datos (al final en PostgreSQL, al principio en SQLite para orden ascendente), así
+    el ORDER BY coincide con los índices y no hace falta ordenar en memoria.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.nulls_largest = connections[queryset.db].features.nulls_order_largest
+        opts = queryset.model._meta
+        self.keys = []
+        for name in list(ordering) + ['pk']:
+            descending = name.startswith('-')
+            field = opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-'))
+            if field in [key[0] for key in self.keys]:
+                continue
+            self.keys.append((field, descending))
+
+    def encode_cursor(self, direction, obj):
+        # Las filas pueden ser instancias o diccionarios de values() con las columnas de orden.
+        if isinstance(obj, dict):
+            values = [_to_json(obj[field.attname]) for field, descending in self.keys]
+        else:
+            values = [_to_json(getattr(obj, field.attname)) for field, descending in self.keys]
+        payload = json.dumps([direction, values], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(payload)
+            if direction not in (FORWARD, BACKWARD) or len(values) != len(self.keys):
+                raise ValueError
+            return direction, [
+                None if value is None else field.to_python(value)
+                for (field, descending), value in zip(self.keys, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError) as e:
+            raise InvalidCursor(str(e)) from e
+
+    def _ordering(self, reverse=False):
+        return [
+            F(field.name).desc() if descending != reverse else F(field.name).asc()
+            for field, descending in self.keys
+        ]
+
+    def _beyond(self, field, descending, value, direction):
+        """
+        Q de las filas estrictamente posteriores (FORWARD) o anteriores (BACKWARD) a ``value``.
+        """
+        name = field.name
+        nulls_at_end = self.nulls_largest != descending
+        if direction == FORWARD:
+            lookup, nulls_beyond = ('lt' if descending else 'gt'), nulls_at_end
+        else:
+            lookup, nulls_beyond = ('gt' if descending else 'lt'), not nulls_at_end
+        if value is None:
+            # Más allá de un NULL sólo hay valores no nulos o nada (los demás NULL empatan).
+            return None if nulls_beyond else Q(**{f'{name}__isnull': False})
+        q = Q(**{f'{name}__{lookup}': value})
+        return q | Q(**{f'{name}__isnull': True}) if field.null and nulls_beyond else q
+
+    def _filter(self, values, direction):
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.keys, values):
+            beyond = self._beyond(field, descending, value, direction)
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= Q(**{f'{field.name}__isnull': True}) if value is None else Q(**{field.name: value})
+        return condition
+
+    def _page_queryset(self, cursor):
+        direction, values = self.decode_cursor(cursor) if cursor else (FORWARD, None)
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._filter(values, direction))
+        queryset = queryset.order_by(*self._ordering(reverse=direction == BACKWARD))
+        # Una fila extra indica si hay más resultados en esa dirección, sin COUNT(*).
+        return direction, values, queryset[:self.per_page + 1]
+
+    def _build_page(self, rows, direction, values):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(FORWARD, rows[-1]) if has_next and rows else None,
+            previous_cursor=self.encode_cursor(BACKWARD, rows[0]) if has_previous and rows else None,
+        )
+
+    def page(self, cursor=None):
+        direction, values, queryset = self._page_queryset(cursor)
+        return self._build_page(list(queryset), direction, values)
+
+    async def apage(self, cursor=None):
+        direction, values, queryset = self._page_queryset(cursor)
+        return self._build_page([obj async for obj in queryset], direction, values)
+
+
+class CursorPaginationMixin:
+    """
+    Reemplaza la paginación por OFFSET de ListView. La página se elige con ?cursor=.
+    """
+    cursor_ordering = None
+    cursor_query_param = 'cursor'
+
+    def get_cursor_ordering(self):
+        if self.cursor_ordering is not None:
+            return self.cursor_ordering
+        return self.model._meta.ordering or []
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.get_cursor_ordering())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size, self.get_cursor_ordering())
+        try:
+            page = await paginator.apage(self.request.GET.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Filas de la tabla de ``model`` según las estadísticas de la base de datos (sin
+    recorrerla), o None si no hay estadísticas: PostgreSQL las actualiza con autovacuum,
+    MySQL siempre las tiene y SQLite sólo después de ANALYZE (seed_library lo ejecuta).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT table_rows FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = %s', [table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+                if cursor.fetchone() is None:
+                    return None
+                # Una fila por índice; la primera cifra de stat son sus filas (menos en los
+                # índices parciales, por eso el máximo).
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            else:
+                return None
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    estimates = [int(str(value).split()[0]) for value, in rows if value is not None]
+    # PostgreSQL devuelve -1 si la tabla nunca se analizó.
+    return max(estimates) if estimates and max(estimates) >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para las listas de cambios del admin. Sin filtros ni búsqueda, si la tabla
+    tiene más de ``exact_threshold`` filas según sus estadísticas, usa esa estimación en
+    lugar de COUNT(*). El número de páginas es aproximado: la última puede salir vacía.
+    Con filtros cuenta de verdad, que sólo recorre las filas que coinciden.
+    """
+    exact_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.exact_threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,237 @@
+"""
+Medición de cada petición: consultas SQL, render de plantillas y tiempo total.
+
+RequestProfilingMiddleware (activo con CATALOG_PROFILING) acumula por petición:
+
+* número y duración de las consultas, con un execute_wrapper que se instala en las
+  conexiones del hilo que atiende la petición (bajo ASGI, el de sync_to_async);
+* tiempo de render de plantillas, con el backend DjangoTemplates de este módulo
+  (configurado en TEMPLATES), que cronometra cada render de nivel superior;
+* tiempo total; lo que no es SQL ni plantillas es Python de la vista y los middlewares.
+
+Los valores se envían en la cabecera Server-Timing (con DEBUG o a usuarios staff) y en
+una línea de log JSON en el logger ``catalog.profiling``. Además, una fracción
+CATALOG_PROFILING_SAMPLE_RATE de las peticiones se ejecuta con un perfilador (cProfile
+o pyinstrument) y, si tarda más de CATALOG_PROFILING_SLOW_MS, el perfil se guarda en
+CATALOG_PROFILING_DIR.
+"""
+import cProfile
+import datetime
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.signals import request_started
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger('catalog.profiling')
+
+_request_state = ContextVar('catalog_profiling_state', default=None)
+
+
+def _new_state():
+    return {'queries': 0, 'db': 0.0, 'template': 0.0, 'template_db': 0.0, 'rendering': 0}
+
+
+def record_query(execute, sql, params, many, context):
+    state = _request_state.get()
+    if state is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        state['queries'] += 1
+        state['db'] += elapsed
+        if state['rendering']:
+            state['template_db'] += elapsed
+
+
+def begin():
+    """
+    Empieza a medir la petición en curso y devuelve ``(state, token)``. Si otro
+    middleware ya la está midiendo (catalog/metrics.py) se comparte su estado.
+    """
+    state = _request_state.get()
+    if state is not None:
+        return state, None
+    state = _new_state()
+    return state, _request_state.set(state)
+
+
+def end(token):
+    if token is not None:
+        _request_state.reset(token)
+
+
+def watch_queries():
+    request_started.connect(install_query_wrappers, dispatch_uid='catalog.profiling')
+
+
+def install_query_wrappers(**kwargs):
+    # Las conexiones son por hilo. request_started llega en el hilo que atiende la
+    # petición y, bajo ASGI, en el hilo de sync_to_async donde corre el ORM.
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_query)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        state = _request_state.get()
+        if state is None:
+            return super().render(context, request)
+        # Sólo se cronometra el render de nivel superior; los anidados ya están dentro.
+        state['rendering'] += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            state['rendering'] -= 1
+            if not state['rendering']:
+                state['template'] += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    El backend de plantillas de Django con el render cronometrado por petición.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class RequestProfilingMiddleware:
+    """
+    Debe ir primero en MIDDLEWARE para que el tiempo total incluya a los demás.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'CATALOG_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = settings.CATALOG_PROFILING_SLOW_MS
+        self.sample_rate = settings.CATALOG_PROFILING_SAMPLE_RATE
+        self.profile_dir = Path(settings.CATALOG_PROFILING_DIR)
+        self.profiler = settings.CATALOG_PROFILER
+        if self.profiler == 'pyinstrument':
+            try:
+                import pyinstrument  # NOQA
+            except ImportError:
+                raise ImproperlyConfigured('CATALOG_PROFILER = "pyinstrument" requiere instalar pyinstrument.')
+        elif self.profiler != 'cprofile':
+            raise ImproperlyConfigured('CATALOG_PROFILER debe ser "cprofile" o "pyinstrument".')
+        watch_queries()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token, profiler, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            end(token)
+        is_staff = getattr(getattr(request, 'user', None), 'is_staff', False)
+        return self._finish(request, response, state, profiler, started, is_staff)
+
+    async def __acall__(self, request):
+        # Con cProfile sólo se perfila el hilo del bucle de eventos, no los sync_to_async.
+        state, token, profiler, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end(token)
+        user = await request.auser() if hasattr(request, 'auser') else None
+        return self._finish(request, response, state, profiler, started, getattr(user, 'is_staff', False))
+
+    def _start(self):
+        state, token = begin()
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            profiler = self._start_profiler()
+        return state, token, profiler, time.perf_counter()
+
+    def _start_profiler(self):
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _finish(self, request, response, state, profiler, started, is_staff):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = state['db'] * 1000
+        template_ms = state['template'] * 1000
+        # Las consultas lanzadas desde las plantillas cuentan como SQL, no como plantilla.
+        template_only_ms = template_ms - state['template_db'] * 1000
+        python_ms = max(total_ms - db_ms - template_only_ms, 0.0)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+
+        if profiler is not None:
+            self._dump_profile(profiler, view, total_ms)
+
+        if settings.DEBUG or is_staff:
+            response['Server-Timing'] = ', '.join([
+                'db;dur=%.1f;desc="%d queries"' % (db_ms, state['queries']),
+                'tpl;dur=%.1f' % template_only_ms,
+                'py;dur=%.1f' % python_ms,
+                'total;dur=%.1f' % total_ms,
+            ])
+        logger.log(
+            logging.WARNING if total_ms >= self.slow_ms else logging.INFO,
+            json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 2),
+                'db_ms': round(db_ms, 2),
+                'queries': state['queries'],
+                'template_ms': round(template_only_ms, 2),
+                'python_ms': round(python_ms, 2),
+            }, sort_keys=True),
+        )
+        return response
+
+    def _dump_profile(self, profiler, view, total_ms):
+        if self.profiler == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+        if total_ms < self.slow_ms:
+            return
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = '%s-%s-%dms' % (
+            datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f'), (view or 'unknown').replace(':', '_'), total_ms,
+        )
+        if self.profiler == 'pyinstrument':
+            path = self.profile_dir / (stem + '.html')
+            path.write_text(profiler.output_html())
+        else:
+            path = self.profile_dir / (stem + '.prof')
+            profiler.dump_stats(path)
+        logger.warning(json.dumps({'profile': str(path), 'view': view, 'total_ms': round(total_ms, 2)}))
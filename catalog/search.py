@@ -0,0 +1,175 @@
+"""
+Búsqueda de texto completo sobre libros.
+
+El índice es una tabla auxiliar, una fila por libro, con el título, el resumen, el
+nombre del autor y los nombres de sus géneros:
+
+* SQLite: tabla virtual FTS5 ``catalog_book_fts`` (rowid = id del libro), ordenada con bm25.
+* PostgreSQL: tabla ``catalog_book_search`` con un tsvector ponderado y un índice GIN.
+
+Las señales de catalog/signals.py mantienen el índice al guardar y
+``manage.py rebuild_search_index`` lo reconstruye en bloque.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Author, Book, Genre
+
+FTS_TABLE = 'catalog_book_fts'
+SEARCH_TABLE = 'catalog_book_search'
+
+# Pesos por columna: título, resumen, autores, géneros.
+SQLITE_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+BATCH_SIZE = 500
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _config():
+    return getattr(settings, 'CATALOG_SEARCH_CONFIG', 'simple')
+
+
+def _tables(connection):
+    qn = connection.ops.quote_name
+    return {
+        'book': qn(Book._meta.db_table),
+        'author': qn(Author._meta.db_table),
+        'genre': qn(Genre._meta.db_table),
+        'book_genre': qn(Book.genre.through._meta.db_table),
+        'fts': qn(FTS_TABLE),
+        'search': qn(SEARCH_TABLE),
+    }
+
+
+def _source_sql(connection, where):
+    """
+    SELECT que produce (id, título, resumen, autores, géneros) de los libros que cumplen ``where``.
+    """
+    t = _tables(connection)
+    if connection.vendor == 'postgresql':
+        genres = "string_agg(g.name, ' ')"
+        author = "concat_ws(' ', a.first_name, a.last_name)"
+    else:
+        genres = "group_concat(g.name, ' ')"
+        author = "COALESCE(a.first_name || ' ' || a.last_name, '')"
+    return (
+        f"SELECT b.id, b.title, b.summary, {author}, "
+        f"COALESCE((SELECT {genres} FROM {t['book_genre']} bg "
+        f"JOIN {t['genre']} g ON g.id = bg.genre_id WHERE bg.book_id = b.id), '') "
+        f"FROM {t['book']} b LEFT JOIN {t['author']} a ON a.id = b.author_id "
+        f"WHERE {where}"
+    )
+
+
+def _reindex(where, params, using='default'):
+    connection = connections[using]
+    t = _tables(connection)
+    source = _source_sql(connection, where)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f"DELETE FROM {t['fts']} WHERE rowid IN (SELECT b.id FROM {t['book']} b WHERE {where})", params,
+            )
+            cursor.execute(f"INSERT INTO {t['fts']} (rowid, title, summary, authors, genres) {source}", params)
+        elif connection.vendor == 'postgresql':
+            config = _config()
+            cursor.execute(
+                f"INSERT INTO {t['search']} (book_id, document) "
+                f"SELECT id, setweight(to_tsvector(%s::regconfig, coalesce(title, '')), 'A') "
+                f"|| setweight(to_tsvector(%s::regconfig, coalesce(authors, '')), 'B') "
+                f"|| setweight(to_tsvector(%s::regconfig, coalesce(genres, '')), 'C') "
+                f"|| setweight(to_tsvector(%s::regconfig, coalesce(summary, '')), 'D') "
+                f"FROM ({source}) AS src (id, title, summary, authors, genres) "
+                f"ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document",
+                [config] * 4 + list(params),
+            )
+
+
+def _batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def index_books(book_ids, using='default'):
+    """
+    (Re)indexa los libros indicados.
+    """
+    for batch in _batches(book_ids):
+        _reindex('b.id IN (%s)' % ', '.join(['%s'] * len(batch)), batch, using)
+
+
+def index_author_books(author_id, using='default'):
+    _reindex('b.author_id = %s', [author_id], using)
+
+
+def index_genre_books(genre_id, using='default'):
+    t = _tables(connections[using])
+    _reindex(f"b.id IN (SELECT book_id FROM {t['book_genre']} WHERE genre_id = %s)", [genre_id], using)
+
+
+def remove_books(book_ids, using='default'):
+    connection = connections[using]
+    t = _tables(connection)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    table, column = (t['fts'], 'rowid') if connection.vendor == 'sqlite' else (t['search'], 'book_id')
+    with connection.cursor() as cursor:
+        for batch in _batches(book_ids):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {column} IN (%s)" % ', '.join(['%s'] * len(batch)), batch,
+            )
+
+
+def rebuild(using='default'):
+    """
+    Vacía y vuelve a llenar el índice completo con un único INSERT ... SELECT.
+    """
+    connection = connections[using]
+    t = _tables(connection)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {t['fts'] if connection.vendor == 'sqlite' else t['search']}")
+    _reindex('1 = 1', [], using)
+
+
+def fts_query(text):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra entre
+    comillas y como prefijo, todas obligatorias.
+    """
+    return ' '.join('"%s"*' % token for token in _TOKEN.findall(text))
+
+
+def search(text, limit=10, offset=0, using='default'):
+    """
+    Devuelve los ids de los libros que coinciden con ``text``, del más al menos relevante.
+    """
+    connection = connections[using]
+    t = _tables(connection)
+    if not _TOKEN.search(text):
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+            cursor.execute(
+                f"SELECT rowid FROM {t['fts']} WHERE {t['fts']} MATCH %s "
+                f"ORDER BY bm25({t['fts']}, {weights}), rowid LIMIT %s OFFSET %s",
+                [fts_query(text), limit, offset],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"SELECT book_id FROM {t['search']}, websearch_to_tsquery(%s::regconfig, %s) query "
+                f"WHERE document @@ query ORDER BY ts_rank(document, query) DESC, book_id LIMIT %s OFFSET %s",
+                [_config(), text, limit, offset],
+            )
+        else:
+            return list(
+                Book.objects.filter(title__icontains=text).order_by('title', 'pk')
+                .values_list('pk', flat=True)[offset:offset + limit]
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,274 @@
+"""
+Generación de catálogos sintéticos grandes y deterministas para pruebas de rendimiento.
+
+Con la misma semilla y la misma base de datos de partida se generan los mismos datos,
+salvo los UUID de los ejemplares: son nuevos en cada siembra, así que se puede volver a
+sembrar con la misma semilla sobre una base de datos que ya tiene datos.
+Las distribuciones imitan una biblioteca real: pocos autores con muchos libros, algunos
+libros con muchas copias, lectores que piden mucho prestado y una parte de los
+préstamos vencidos.
+
+Autores, géneros, libros y usuarios se insertan con bulk_create por lotes. Los
+ejemplares, que son la tabla grande, se insertan con executemany sin instanciar
+modelos (instanciar un millón de BookInstance cuesta más que insertarlos) y, si la
+carga es mayor que la tabla, sin sus índices secundarios (Meta.indexes y los de las
+claves foráneas), que se recrean al final. Solo esa inserción prescinde de los índices:
+las demás tablas son pequeñas en comparación. seed_library puede anotar los segundos de
+cada fase para ver dónde se va el tiempo.
+Como bulk_create y executemany no disparan señales, al terminar se reconstruyen los
+contadores (también los de ejemplares de los libros nuevos), se indexan los libros nuevos para la búsqueda y se invalidan las listas
+de la cache de páginas.
+"""
+import contextlib
+import datetime
+import itertools
+import os
+import random
+import time
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from . import counters, page_cache, search
+from .models import Author, Book, BookInstance, Genre
+
+USERNAME_PREFIX = 'reader'
+
+GENRE_NAMES = [
+    'Fantasy', 'Science Fiction', 'Mystery', 'Romance', 'Horror', 'Poetry', 'History',
+    'Biography', 'Philosophy', 'Children', 'Young Adult', 'Thriller', 'Travel', 'Cooking',
+    'Art', 'Science', 'Essays', 'Drama', 'Humor', 'Graphic Novels',
+]
+FIRST_NAMES = [
+    'Ana', 'Jorge', 'Ursula', 'Gabriel', 'Isabel', 'Julio', 'Toni', 'Octavio', 'Clarice',
+    'Italo', 'Virginia', 'Haruki', 'Chimamanda', 'Fyodor', 'Elena', 'Mario', 'Alice', 'Rosa',
+]
+LAST_NAMES = [
+    'García', 'Borges', 'Le Guin', 'Allende', 'Cortázar', 'Morrison', 'Paz', 'Lispector',
+    'Calvino', 'Woolf', 'Murakami', 'Adichie', 'Dostoevsky', 'Ferrante', 'Vargas', 'Munro',
+    'Castellanos', 'Rulfo', 'Pizarnik', 'Bolaño',
+]
+TITLE_WORDS = [
+    'Shadow', 'River', 'Garden', 'Night', 'Memory', 'City', 'Wind', 'Labyrinth', 'House',
+    'Silence', 'Mirror', 'Island', 'Winter', 'Letters', 'Fire', 'Stone', 'Map', 'Dream',
+]
+
+# Estado de los ejemplares: disponible, prestado, mantenimiento, reservado.
+STATUS_WEIGHTS = {'a': 55, 'o': 30, 'm': 8, 'r': 7}
+LOAN_WEEKS = 3
+MEAN_DAYS_OUT = 12  # Días medios desde el préstamo: ~17 % de los préstamos quedan vencidos.
+
+
+def _zipf_cum_weights(n, exponent=1.0):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def seed_library(authors=2000, genres=30, books=50_000, users=5000, copies=200_000, seed=0,
+                 batch_size=10_000, using=DEFAULT_DB_ALIAS, log=None, timings=None):
+    """
+    Agrega al catálogo los objetos pedidos y devuelve cuántos se crearon de cada tipo.
+    Si se pasa ``timings`` (un diccionario), anota en él los segundos de cada fase.
+    """
+    log = log or (lambda message: None)
+    timings = {} if timings is None else timings
+    connection = connections[using]
+    rng = random.Random(seed)
+    today = datetime.date.today()
+
+    with _phase(timings, 'genres'):
+        genre_objs = _bulk_create(Genre, (
+            Genre(name=GENRE_NAMES[i] if i < len(GENRE_NAMES) else 'Genre %d' % i) for i in range(genres)
+        ), batch_size, using)
+    log('%d géneros' % len(genre_objs))
+
+    with _phase(timings, 'authors'):
+        author_objs = _bulk_create(Author, (_author(rng) for _ in range(authors)), batch_size, using)
+    log('%d autores' % len(author_objs))
+
+    with _phase(timings, 'books'):
+        # Unos pocos autores escriben la mayoría de los libros.
+        author_weights = _zipf_cum_weights(len(author_objs), 0.8)
+        book_objs = _bulk_create(Book, (
+            Book(
+                title='%s %s' % (' '.join(rng.sample(TITLE_WORDS, rng.randint(1, 3))), i),
+                summary='A %s story about %s.' % (rng.choice(TITLE_WORDS).lower(), rng.choice(TITLE_WORDS).lower()),
+                isbn='%013d' % rng.randrange(10 ** 13),
+                author=author,
+            )
+            for i, author in enumerate(rng.choices(author_objs, cum_weights=author_weights, k=books))
+        ), batch_size, using)
+        genre_weights = _zipf_cum_weights(len(genre_objs), 0.7)
+        Through = Book.genre.through
+        for batch in _batched(book_objs, batch_size):
+            links = []
+            for book in batch:
+                chosen = {genre.pk for genre in rng.choices(genre_objs, cum_weights=genre_weights, k=rng.randint(1, 3))}
+                links.extend(Through(book_id=book.pk, genre_id=genre_id) for genre_id in sorted(chosen))
+            with transaction.atomic(using=using):
+                Through.objects.using(using).bulk_create(links)
+    log('%d libros' % len(book_objs))
+
+    with _phase(timings, 'users'):
+        # Los nombres de usuario continúan la numeración de una siembra anterior.
+        first_user = User.objects.using(using).filter(username__startswith=USERNAME_PREFIX).count()
+        password = make_password(None)
+        user_objs = _bulk_create(User, (
+            User(username='%s%07d' % (USERNAME_PREFIX, first_user + i), password=password) for i in range(users)
+        ), batch_size, using)
+    log('%d usuarios' % len(user_objs))
+
+    created = _insert_copies(connection, rng, today, book_objs, user_objs, copies, batch_size, log, timings)
+
+    with _phase(timings, 'counters'):
+        counters.rebuild(using)
+        if book_objs:
+            counters.rebuild_book_copies(
+                Book.objects.filter(pk__gte=book_objs[0].pk, pk__lte=book_objs[-1].pk), using=using,
+            )
+    with _phase(timings, 'search'):
+        search.index_books([book.pk for book in book_objs], using=using)
+    page_cache.bump(page_cache.BOOK_LIST, page_cache.AUTHOR_LIST, page_cache.GENRE_LIST)
+    return {
+        'genres': len(genre_objs),
+        'authors': len(author_objs),
+        'books': len(book_objs),
+        'users': len(user_objs),
+        'copies': created,
+    }
+
+
+@contextlib.contextmanager
+def _phase(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - started
+
+
+def _bulk_create(model, objs, batch_size, using):
+    created = []
+    for batch in _batched(objs, batch_size):
+        with transaction.atomic(using=using):
+            created.extend(model.objects.using(using).bulk_create(batch))
+    return created
+
+
+def _author(rng):
+    born = datetime.date(rng.randint(1850, 1995), rng.randint(1, 12), rng.randint(1, 28))
+    died = None
+    if born.year < 1960 and rng.random() < 0.6:
+        died = born + datetime.timedelta(days=365 * rng.randint(30, 95))
+    return Author(
+        first_name=rng.choice(FIRST_NAMES),
+        last_name=rng.choice(LAST_NAMES),
+        date_of_birth=born,
+        date_of_death=died if died and died < datetime.date.today() else None,
+    )
+
+
+def _field_indexes(connection, model):
+    """
+    Índices que Django crea para los campos con db_index (las claves foráneas), con su
+    nombre en la base de datos: [(campo, nombre)].
+    """
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return [
+        (field, name)
+        for field in model._meta.local_fields if field.db_index and not field.unique
+        for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key'] and info['columns'] == [field.column]
+    ]
+
+
+def _insert_copies(connection, rng, today, book_objs, user_objs, copies, batch_size, log, timings):
+    if not copies or not book_objs:
+        return 0
+    qn = connection.ops.quote_name
+    opts = BookInstance._meta
+    columns = ['id', 'book_id', 'imprint', 'status', 'due_back', 'borrower_id', 'updated_at']
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(opts.db_table), ', '.join(qn(opts.get_field(name).column) for name in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    native_uuid = connection.features.has_native_uuid_field
+    due_field = opts.get_field('due_back')
+    due_values = {}
+    updated_at = opts.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+
+    def due_back():
+        days = LOAN_WEEKS * 7 - min(int(rng.expovariate(1 / MEAN_DAYS_OUT)), 180)
+        if days not in due_values:
+            due_values[days] = due_field.get_db_prep_value(today + datetime.timedelta(days=days), connection)
+        return due_values[days]
+
+    # Los libros populares tienen más copias y algunos lectores piden mucho más que otros.
+    book_ids = [book.pk for book in book_objs]
+    book_weights = _zipf_cum_weights(len(book_ids), 0.5)
+    user_ids = [user.pk for user in user_objs] or [None]
+    user_weights = _zipf_cum_weights(len(user_ids), 0.7)
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+
+    # Los 48 bits altos del UUID crecen (como en UUIDv7): cada lote se agrega al final del
+    # índice primario en lugar de repartirse por todo el árbol, que con millones de filas
+    # es lo que más cuesta. El resto del UUID es aleatorio. Los pk no salen de la semilla:
+    # una segunda siembra con la misma semilla repetiría los de la primera.
+    pk_rng = random.Random(os.urandom(16))
+    pk_prefix = pk_rng.getrandbits(20) << 27
+
+    drop_indexes = copies > BookInstance.objects.using(connection.alias).count()
+    if drop_indexes:
+        field_indexes = _field_indexes(connection, BookInstance)
+        with _phase(timings, 'indexes'), connection.schema_editor() as editor:
+            for index in opts.indexes:
+                editor.remove_index(BookInstance, index)
+            for field, name in field_indexes:
+                editor.execute(editor._delete_index_sql(BookInstance, name))
+    try:
+        with _phase(timings, 'copies'):
+            created = 0
+            while created < copies:
+                size = min(batch_size, copies - created)
+                rows = []
+                for book_id, status, borrower_id in zip(
+                    rng.choices(book_ids, cum_weights=book_weights, k=size),
+                    rng.choices(statuses, weights=status_weights, k=size),
+                    rng.choices(user_ids, cum_weights=user_weights, k=size),
+                ):
+                    pk = uuid.UUID(int=(pk_prefix + created + len(rows)) << 80 | pk_rng.getrandbits(80), version=4)
+                    on_loan = status == 'o'
+                    rows.append((
+                        pk if native_uuid else pk.hex,
+                        book_id,
+                        'Imprint %d' % (book_id % 7),
+                        status,
+                        due_back() if on_loan else None,
+                        borrower_id if on_loan else None,
+                        updated_at,
+                    ))
+                with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+                created += size
+                log('%d ejemplares' % created)
+    finally:
+        if drop_indexes:
+            with _phase(timings, 'indexes'), connection.schema_editor() as editor:
+                for index in opts.indexes:
+                    editor.add_index(BookInstance, index)
+                for field, name in field_indexes:
+                    for statement in editor._field_indexes_sql(BookInstance, field):
+                        editor.execute(statement)
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with _phase(timings, 'indexes'), connection.cursor() as cursor:
+            cursor.execute('ANALYZE %s' % qn(opts.db_table))
+    return created
@@ -0,0 +1,287 @@
+"""
+Receptores de señales del catálogo. Se conectan en CatalogConfig.ready().
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, page_cache, search
+from .models import Author, Book, BookInstance, Genre
+
+
+@receiver(post_init, sender=BookInstance)
+def remember_loaded_status(sender, instance, **kwargs):
+    # Guardamos el estado y el libro con los que se cargó el ejemplar para detectar cambios al guardar.
+    instance._loaded_status = instance.__dict__.get('status')
+    instance._loaded_book_id = instance.__dict__.get('book_id')
+
+
+@receiver(pre_delete, sender=BookInstance)
+def load_deleted_copy(sender, instance, **kwargs):
+    # Los receptores de post_delete necesitan el estado y el libro del ejemplar, y tras el
+    # DELETE un campo diferido (p. ej. con only('pk')) ya no se puede leer.
+    if not {'status', 'book_id'} <= instance.__dict__.keys():
+        instance.refresh_from_db(using=kwargs['using'], fields=['status', 'book'])
+
+
+@receiver(post_init, sender=Book)
+def remember_loaded_author(sender, instance, **kwargs):
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+
+
+@receiver(post_save, sender=Book)
+def count_book_saved(sender, instance, created, raw=False, **kwargs):
+    # Las cargas de fixtures (loaddata) no ajustan los contadores: rebuild_counters los corrige.
+    if created and not raw:
+        counters.adjust(kwargs['using'], num_books=1)
+
+
+@receiver(post_delete, sender=Book)
+def count_book_deleted(sender, instance, **kwargs):
+    counters.adjust(kwargs['using'], num_books=-1)
+
+
+@receiver(post_save, sender=Author)
+def count_author_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.adjust(kwargs['using'], num_authors=1)
+
+
+@receiver(post_delete, sender=Author)
+def count_author_deleted(sender, instance, **kwargs):
+    counters.adjust(kwargs['using'], num_authors=-1)
+
+
+# Contadores de ejemplares de cada Book. Tienen que ir antes de count_instance_saved e
+# invalidate_copy_pages, que actualizan el estado y el libro recordados.
+
+def _adjust_book_copies(using, deltas):
+    if counters.adjust_book_copies(deltas, using=using):
+        # La lista de libros muestra (y puede ordenarse por) la disponibilidad.
+        page_cache.bump(page_cache.BOOK_LIST)
+
+
+def _copy_delta(deltas, book_id, status, sign):
+    total, available = deltas.get(book_id, (0, 0))
+    deltas[book_id] = (total + sign, available + sign * int(status == 'a'))
+
+
+@receiver(post_save, sender=BookInstance)
+def count_book_copies_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    deltas = {}
+    if created:
+        _copy_delta(deltas, instance.book_id, instance.status, 1)
+    else:
+        fields = set(update_fields) if update_fields is not None else None
+        if fields is not None and not fields & {'status', 'book'}:
+            return
+        # Un campo que no se guardó no cambió; si no se guardó por estar diferido, no hay valor recordado.
+        old_status = instance.status if fields is not None and 'status' not in fields else instance._loaded_status
+        old_book_id = instance.book_id if fields is not None and 'book' not in fields else instance._loaded_book_id
+        if old_status is None:
+            # Ejemplar guardado sin haberse leído (p. ej. con un pk explícito): rebuild_counters lo corrige.
+            return
+        _copy_delta(deltas, old_book_id, old_status, -1)
+        _copy_delta(deltas, instance.book_id, instance.status, 1)
+    _adjust_book_copies(kwargs['using'], deltas)
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_book_copies_deleted(sender, instance, **kwargs):
+    status = instance.__dict__.get('status')
+    if status is not None:
+        deltas = {}
+        _copy_delta(deltas, instance.__dict__.get('book_id'), status, -1)
+        _adjust_book_copies(kwargs['using'], deltas)
+
+
+@receiver(post_save, sender=BookInstance)
+def count_instance_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or update_fields is not None and 'status' not in update_fields:
+        return
+    available = int(instance.status == 'a')
+    loaded_status = getattr(instance, '_loaded_status', None)
+    if created:
+        counters.adjust(kwargs['using'], num_instances=1, num_instances_available=available)
+    elif loaded_status is not None:
+        # Si el estado se cargó diferido no sabemos el valor anterior; rebuild_counters lo corrige.
+        counters.adjust(kwargs['using'], num_instances_available=available - int(loaded_status == 'a'))
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=BookInstance)
+def count_instance_deleted(sender, instance, **kwargs):
+    # La fila ya no existe: un estado diferido no se puede leer.
+    status = getattr(instance, '_loaded_status', None) or instance.__dict__.get('status')
+    if status is None:
+        counters.invalidate(kwargs['using'])
+    else:
+        counters.adjust(kwargs['using'], num_instances=-1, num_instances_available=-int(status == 'a'))
+
+
+# Índice de búsqueda (catalog/search.py). Se actualiza en la misma transacción que el cambio.
+
+@receiver(post_save, sender=Book)
+def index_book_saved(sender, instance, **kwargs):
+    search.index_books([instance.pk], using=kwargs['using'])
+
+
+@receiver(post_delete, sender=Book)
+def index_book_deleted(sender, instance, **kwargs):
+    search.remove_books([instance.pk], using=kwargs['using'])
+
+
+@receiver(post_save, sender=Author)
+def index_author_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_author_books(instance.pk, using=kwargs['using'])
+
+
+@receiver(post_save, sender=Genre)
+def index_genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_genre_books(instance.pk, using=kwargs['using'])
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+def remember_indexed_books(sender, instance, **kwargs):
+    # Tras borrar un autor o un género sus libros ya no lo referencian; guardamos los ids antes.
+    if sender is Author:
+        books = Book.objects.using(kwargs['using']).filter(author=instance)
+    else:
+        books = Book.objects.using(kwargs['using']).filter(genre=instance)
+    instance._indexed_book_ids = list(books.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def index_related_books_deleted(sender, instance, **kwargs):
+    search.index_books(getattr(instance, '_indexed_book_ids', []), using=kwargs['using'])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def index_book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # genre.book_set.clear() no informa pk_set; guardamos los libros antes de vaciar.
+        instance._indexed_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    elif not reverse:
+        search.index_books([instance.pk], using=kwargs['using'])
+    elif action == 'post_clear':
+        search.index_books(getattr(instance, '_indexed_book_ids', []), using=kwargs['using'])
+    else:
+        search.index_books(pk_set, using=kwargs['using'])
+
+
+# updated_at de las páginas (GET condicional, catalog/conditional.py): los cambios que
+# no pasan por save() del modelo que muestra la página.
+
+def _touch(model, pks, using):
+    pks = [pk for pk in pks if pk]
+    if pks:
+        model.objects.using(using).filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def touch_books_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    else:
+        book_ids = pk_set if pk_set is not None else getattr(instance, '_indexed_book_ids', [])
+    _touch(Book, book_ids, kwargs['using'])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def touch_genre_books(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    book_ids = getattr(instance, '_indexed_book_ids', None)
+    if book_ids is None:
+        book_ids = Book.objects.using(kwargs['using']).filter(genre=instance).values_list('pk', flat=True)
+    _touch(Book, book_ids, kwargs['using'])
+
+
+@receiver(post_delete, sender=Author)
+def touch_author_books(sender, instance, **kwargs):
+    # on_delete=SET_NULL deja los libros sin autor con un UPDATE que no toca updated_at.
+    _touch(Book, getattr(instance, '_indexed_book_ids', []), kwargs['using'])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def touch_book_authors(sender, instance, created=False, **kwargs):
+    # El autor que pierde un libro (borrado o pasado a otro autor) cambia su página.
+    loaded_author_id = getattr(instance, '_loaded_author_id', None)
+    if kwargs['signal'] is post_delete:
+        _touch(Author, {instance.author_id, loaded_author_id}, kwargs['using'])
+    elif not created and loaded_author_id != instance.author_id:
+        _touch(Author, [loaded_author_id], kwargs['using'])
+
+
+# Cache de páginas anónimas (catalog/page_cache.py): cada cambio incrementa las versiones
+# de las páginas que lo muestran.
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_pages(sender, instance, **kwargs):
+    author_ids = {instance.author_id, getattr(instance, '_loaded_author_id', None)}
+    page_cache.bump(
+        page_cache.BOOK_LIST,
+        page_cache.book_key(instance.pk),
+        *[page_cache.author_key(author_id) for author_id in author_ids if author_id],
+    )
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_pages(sender, instance, **kwargs):
+    # El nombre del autor aparece en la lista de libros y en el detalle de cada libro suyo.
+    book_ids = getattr(instance, '_indexed_book_ids', None)
+    if kwargs.get('created'):
+        book_ids = []
+    elif book_ids is None:
+        book_ids = Book.objects.using(kwargs['using']).filter(author=instance).values_list('pk', flat=True)
+    page_cache.bump(
+        page_cache.AUTHOR_LIST,
+        page_cache.BOOK_LIST,
+        page_cache.author_key(instance.pk),
+        *[page_cache.book_key(book_id) for book_id in book_ids],
+    )
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_pages(sender, instance, **kwargs):
+    book_ids = getattr(instance, '_indexed_book_ids', None)
+    if kwargs.get('created'):
+        book_ids = []
+    elif book_ids is None:
+        book_ids = Book.objects.using(kwargs['using']).filter(genre=instance).values_list('pk', flat=True)
+    page_cache.bump(page_cache.GENRE_LIST, *[page_cache.book_key(book_id) for book_id in book_ids])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def invalidate_book_genre_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        page_cache.bump(page_cache.GENRE_LIST, page_cache.book_key(instance.pk))
+    else:
+        book_ids = pk_set if pk_set is not None else getattr(instance, '_indexed_book_ids', [])
+        page_cache.bump(page_cache.GENRE_LIST, *[page_cache.book_key(book_id) for book_id in book_ids])
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def invalidate_copy_pages(sender, instance, **kwargs):
+    book_ids = {instance.book_id, getattr(instance, '_loaded_book_id', None)}
+    page_cache.bump(*[page_cache.book_key(book_id) for book_id in book_ids if book_id])
+    instance._loaded_book_id = instance.book_id
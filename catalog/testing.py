@@ -0,0 +1,232 @@
+"""
+Utilidades para pruebas de rendimiento del catálogo: un conjunto de datos realista,
+el recorrido de todas las rutas con nombre y la captura/normalización de consultas SQL.
+"""
+import datetime
+import difflib
+import re
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from . import counters
+from .models import Author, Book, BookInstance, Genre
+
+LIBRARIAN_PASSWORD = 'librarian-password'
+PATRON_PASSWORD = 'patron-password'
+
+
+def seed_dataset(authors=12, genres=4, books=25, copies_per_book=3):
+    """
+    Crea un catálogo pequeño pero realista: varias páginas de libros y autores,
+    libros con varios géneros y ejemplares en todos los estados, algunos vencidos.
+    Devuelve un diccionario con objetos representativos para construir URLs.
+    """
+    librarian = User.objects.create_user('librarian', password=LIBRARIAN_PASSWORD, is_staff=True)
+    librarian.user_permissions.set(Permission.objects.filter(content_type__app_label='catalog'))
+    patron = User.objects.create_user('patron', password=PATRON_PASSWORD)
+
+    genre_objs = Genre.objects.bulk_create(Genre(name=f'Genre {i}') for i in range(genres))
+    author_objs = Author.objects.bulk_create(
+        Author(first_name=f'First {i}', last_name=f'Last {i:03d}', date_of_birth=datetime.date(1950, 1, 1))
+        for i in range(authors)
+    )
+    book_objs = Book.objects.bulk_create(
+        Book(
+            title=f'Book {i:03d}',
+            summary=f'Summary for book {i}',
+            isbn=f'{i:013d}',
+            author=author_objs[i % authors],
+        )
+        for i in range(books)
+    )
+    Book.genre.through.objects.bulk_create(
+        Book.genre.through(book_id=book.pk, genre_id=genre_objs[(i + offset) % genres].pk)
+        for i, book in enumerate(book_objs)
+        for offset in range(min(2, genres))
+    )
+
+    today = datetime.date.today()
+    statuses = ['a', 'o', 'm', 'r']
+    copies = []
+    for i, book in enumerate(book_objs):
+        for copy in range(copies_per_book):
+            status = statuses[(i + copy) % len(statuses)]
+            on_loan = status == 'o'
+            copies.append(BookInstance(
+                book=book,
+                imprint=f'Imprint {copy}',
+                status=status,
+                borrower=(patron if copy % 2 else librarian) if on_loan else None,
+                due_back=today + datetime.timedelta(days=(i % 10) - 3) if on_loan else None,
+            ))
+    BookInstance.objects.bulk_create(copies)
+    counters.rebuild_book_copies()
+
+    return {
+        'librarian': librarian,
+        'patron': patron,
+        'author': author_objs[0],
+        'book': book_objs[0],
+        'bookinstance': copies[1],
+        'genre': genre_objs[0],
+    }
+
+
+def _iter_patterns(patterns, prefix=''):
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            namespace = f'{prefix}{entry.namespace}:' if entry.namespace else prefix
+            yield from _iter_patterns(entry.url_patterns, namespace)
+        elif isinstance(entry, URLPattern) and entry.name:
+            yield prefix + entry.name, entry
+
+
+def _model_for(pattern):
+    view_class = getattr(pattern.callback, 'view_class', None)
+    return getattr(view_class, 'model', None)
+
+
+def route_kwargs(pattern, dataset):
+    """
+    Construye los kwargs de una ruta a partir del modelo de la vista (o del tipo del
+    conversor para las vistas de función: uuid -> BookInstance).
+    """
+    kwargs = {}
+    for name, converter in pattern.pattern.converters.items():
+        model = _model_for(pattern)
+        if model is None:
+            model = BookInstance if type(converter).__name__ == 'UUIDConverter' else Book
+        kwargs[name] = dataset[model._meta.model_name].pk
+    return kwargs
+
+
+def catalog_routes(dataset):
+    """
+    Devuelve [(nombre, url)] para cada ruta con nombre de catalog/urls.py y para la
+    lista de cambios de cada modelo del catálogo registrado en el admin.
+    """
+    from . import urls as catalog_urls
+
+    routes = [
+        (name, reverse(name, kwargs=route_kwargs(pattern, dataset)))
+        for name, pattern in _iter_patterns(catalog_urls.urlpatterns)
+    ]
+    for model in admin.site._registry:
+        if model._meta.app_label == 'catalog':
+            name = f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
+            routes.append((name, reverse(name)))
+    return routes
+
+
+# Rutas del sitio que sólo aceptan POST o necesitan argumentos que no salen del catálogo.
+SKIPPED_SITE_ROUTES = {'logout'}
+
+
+def site_routes(dataset):
+    """
+    catalog_routes() más las rutas de locallibrary/urls.py sin argumentos (redirección
+    de la raíz, login, cambio y recuperación de contraseña, índice del admin).
+    """
+    from . import urls as catalog_urls
+
+    routes = catalog_routes(dataset)
+    for entry in get_resolver().url_patterns:
+        if isinstance(entry, URLPattern) and not entry.pattern.converters:
+            routes.append((entry.name or '/' + str(entry.pattern), '/' + str(entry.pattern)))
+        elif isinstance(entry, URLResolver) and entry.namespace == 'admin':
+            routes.append(('admin:index', reverse('admin:index')))
+        elif isinstance(entry, URLResolver) and entry.urlconf_module is not catalog_urls:
+            for name, pattern in _iter_patterns(entry.url_patterns):
+                if name not in SKIPPED_SITE_ROUTES and not pattern.pattern.converters:
+                    routes.append((name, reverse(name)))
+    return routes
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'IN \((?:\?, )*\?\)')
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+
+def normalize_sql(sql):
+    """
+    Reemplaza literales por '?' para que la misma consulta sea comparable entre ejecuciones.
+    """
+    sql = _SAVEPOINT.sub('"savepoint"', sql)
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryCapture(CaptureQueriesContext):
+    """
+    CaptureQueriesContext con el SQL normalizado y el tiempo total en milisegundos.
+    """
+
+    def __init__(self, using=None):
+        from django.db import connections
+        super().__init__(connections[using] if using else connection)
+
+    @property
+    def normalized(self):
+        return [normalize_sql(query['sql']) for query in self.captured_queries]
+
+    @property
+    def time_ms(self):
+        return sum(float(query['time']) for query in self.captured_queries) * 1000
+
+
+def query_diff(expected, actual):
+    """
+    Diff unificado entre dos listas de consultas normalizadas.
+    """
+    return '\n'.join(difflib.unified_diff(expected, actual, 'budget', 'actual', lineterm=''))
+
+
+class CacheResetMixin:
+    """
+    Vacía la cache antes de cada prueba. Los datos de cada prueba se revierten, pero la
+    cache no: sin esto una prueba podría recibir páginas o contadores calculados con los
+    datos de otra.
+    """
+
+    @classmethod
+    def _pre_setup(cls):
+        super()._pre_setup()
+        cache.clear()
+
+
+class CatalogTestCase(CacheResetMixin, TestCase):
+    pass
+
+
+class CatalogTransactionTestCase(CacheResetMixin, TransactionTestCase):
+    pass
+
+
+class CatalogTestRunner(DiscoverRunner):
+    """
+    Las pruebas corren en un solo proceso, así que LocMemCache la comparte todo lo que
+    ejecutan: se consideran una cache compartida y la cache de páginas queda activa, como
+    en producción. Cada prueba empieza con la cache vacía (CatalogTestCase).
+    """
+    cache_settings = ('CATALOG_SHARED_CACHE', 'CATALOG_PAGE_CACHE')
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_settings = {name: getattr(settings, name, True) for name in self.cache_settings}
+        for name in self.cache_settings:
+            setattr(settings, name, True)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, value in self._cache_settings.items():
+            setattr(settings, name, value)
+        super().teardown_test_environment(**kwargs)
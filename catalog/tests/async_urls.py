@@ -0,0 +1,10 @@
+"""
+URLconf del sitio con las páginas de lectura asíncronas, como la sirve locallibrary/asgi.py.
+"""
+from django.urls import include, path
+
+from catalog import async_views
+from catalog.urls import build_urlpatterns
+from locallibrary.urls import urlpatterns as site_urlpatterns
+
+urlpatterns = [path('catalog/', include(build_urlpatterns(async_views)))] + site_urlpatterns
@@ -0,0 +1,156 @@
+import datetime
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.urls import reverse
+
+from catalog import search
+from catalog.forms import BulkLoanForm
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import CatalogTestCase, seed_dataset
+
+
+class BookInstanceAdminActionsTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user('librarian', is_staff=True)
+        cls.librarian.user_permissions.set(Permission.objects.filter(
+            codename__in=['view_bookinstance', 'change_bookinstance', 'can_mark_returned'],
+        ))
+        cls.patron = User.objects.create_user('patron')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1')
+        today = datetime.date.today()
+        cls.loans = [
+            BookInstance.objects.create(book=cls.book, imprint='Imprint', status='o', borrower=cls.patron, due_back=today)
+            for _ in range(3)
+        ]
+        cls.available = BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+
+    def setUp(self):
+        self.client.force_login(self.librarian)
+
+    def post_action(self, action, copies, **data):
+        return self.client.post(reverse('admin:catalog_bookinstance_changelist'), {
+            'action': action, helpers.ACTION_CHECKBOX_NAME: [copy.pk for copy in copies], **data,
+        }, follow=True)
+
+    def test_return_loans(self):
+        response = self.post_action('return_loans', self.loans[:2] + [self.available])
+        self.assertContains(response, 'Devueltos 2 ejemplares. 1 de los seleccionados no estaban prestados.')
+        self.assertEqual(BookInstance.objects.filter(status='a').count(), 3)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.copies_available, 3)
+
+    def test_renew_loans_asks_for_a_date(self):
+        response = self.post_action('renew_loans', self.loans)
+        self.assertTemplateUsed(response, 'admin/catalog/bookinstance/renew_loans.html')
+        self.assertContains(response, 'Se seleccionaron 3 ejemplares, 3 de ellos prestados.')
+
+        too_late = datetime.date.today() + datetime.timedelta(weeks=5)
+        response = self.post_action('renew_loans', self.loans, apply='1', renewal_date=too_late)
+        self.assertContains(response, 'Invalid date - renewal more than 4 weeks ahead')
+
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        response = self.post_action('renew_loans', self.loans, apply='1', renewal_date=due_back)
+        self.assertContains(response, 'Renovados 3 préstamos hasta el %s.' % due_back.isoformat())
+        self.assertEqual(set(BookInstance.objects.filter(status='o').values_list('due_back', flat=True)), {due_back})
+
+    def test_selection_is_capped(self):
+        with mock.patch.object(BulkLoanForm, 'MAX_COPIES', 2):
+            response = self.post_action('return_loans', self.loans)
+        self.assertContains(response, 'Seleccione como mucho 2 ejemplares.')
+        self.assertEqual(BookInstance.objects.filter(status='o').count(), 3)
+
+    def test_actions_require_permission(self):
+        self.librarian.user_permissions.remove(Permission.objects.get(codename='can_mark_returned'))
+        response = self.client.get(reverse('admin:catalog_bookinstance_changelist'))
+        self.assertNotContains(response, 'return_loans')
+
+
+class CatalogAdminScaleTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.book = cls.dataset['book']
+        BookInstance.objects.bulk_create(BookInstance(book=cls.book, imprint='Extra', status='a') for _ in range(42))
+        search.rebuild()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_book_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:catalog_book_changelist')
+        self.get(url)
+        # Sesión, usuario, estadísticas de SQLite, COUNT, libros y géneros.
+        with self.assertNumQueries(6):
+            self.get(url)
+        author = Author.objects.create(first_name='Nueva', last_name='Autora')
+        genre = Genre.objects.create(name='Nuevo')
+        for i in range(30):
+            Book.objects.create(title='Otro %d' % i, summary='-', isbn='0', author=author).genre.add(genre)
+        with self.assertNumQueries(6):
+            response = self.get(url)
+        self.assertContains(response, 'Autora, Nueva')
+        self.assertContains(response, 'Nuevo')
+
+    def test_copies_inline_is_paginated(self):
+        url = reverse('admin:catalog_book_change', args=[self.book.pk])
+        response = self.get(url)
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.total_form_count(), 20)
+        self.assertContains(response, '?copies_page=2')
+
+        response = self.get(url, copies_page=3)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.total_form_count(), self.book.bookinstance_set.count() - 40)
+
+    def test_save_on_a_later_copies_page(self):
+        url = reverse('admin:catalog_book_change', args=[self.book.pk])
+        response = self.get(url, copies_page=2)
+        formset = response.context['inline_admin_formsets'][0].formset
+        data = {
+            'title': self.book.title, 'summary': self.book.summary, 'isbn': self.book.isbn,
+            'author': self.book.author_id, 'genre': list(self.book.genre.values_list('pk', flat=True)),
+        }
+        for name, value in formset.management_form.initial.items():
+            data['%s-%s' % (formset.prefix, name)] = value
+        for form in formset.forms:
+            for name in ('id', 'book', 'imprint', 'status', 'due_back', 'borrower'):
+                value = form[name].value()
+                data[form.add_prefix(name)] = '' if value is None else value
+        first = formset.forms[0]
+        data[first.add_prefix('imprint')] = 'Reimpresión'
+        response = self.client.post(url + '?copies_page=2', data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BookInstance.objects.get(pk=first.instance.pk).imprint, 'Reimpresión')
+
+    def test_autocomplete_uses_the_search_index(self):
+        response = self.get(reverse('admin:autocomplete'), app_label='catalog', model_name='bookinstance',
+                            field_name='book', term='Book 000')
+        # El índice también busca en el autor: "Last 000" escribió Book 000, 012 y 024.
+        self.assertEqual(
+            {result['text'] for result in response.json()['results']}, {'Book 000', 'Book 012', 'Book 024'},
+        )
+
+    def test_changelists_skip_the_full_count(self):
+        for model in ('book', 'bookinstance', 'author'):
+            with self.subTest(model=model):
+                response = self.get(reverse('admin:catalog_%s_changelist' % model), q='zzz')
+                self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_changelists_order_by_an_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Se comprueba el plan de SQLite.')
+        for model in ('book', 'bookinstance', 'author'):
+            with self.subTest(model=model):
+                cl = self.get(reverse('admin:catalog_%s_changelist' % model)).context['cl']
+                plan = cl.queryset[:cl.list_per_page].explain()
+                self.assertIn('USING', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,99 @@
+from django.urls import reverse
+
+from catalog.models import Book
+from catalog.testing import CatalogTestCase, QueryCapture, seed_dataset
+
+
+class CatalogApiTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def get(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_book_list_walks_all_pages_in_title_order(self):
+        titles = []
+        data = self.get(reverse('api-books'), limit=7)
+        while True:
+            titles += [book['title'] for book in data['results']]
+            if not data['next']:
+                break
+            data = self.get(data['next'])
+        self.assertEqual(titles, list(Book.objects.order_by('title').values_list('title', flat=True)))
+
+        previous = self.get(data['previous'])
+        self.assertEqual(len(previous['results']), 7)
+
+    def test_book_list_embeds_author_and_genres_with_two_queries(self):
+        for limit in (5, 25):
+            with self.subTest(limit=limit), self.assertNumQueries(2):
+                data = self.get(reverse('api-books'), limit=limit)
+        book = data['results'][0]
+        self.assertEqual(
+            set(book), {'id', 'title', 'author', 'genres', 'copies_total', 'copies_available', 'url'},
+        )
+        expected = Book.objects.get(pk=book['id'])
+        self.assertEqual(book['author']['last_name'], expected.author.last_name)
+        self.assertEqual(
+            [genre['name'] for genre in book['genres']],
+            list(expected.genre.order_by('name').values_list('name', flat=True)),
+        )
+        self.assertEqual(book['copies_available'], expected.copies_available)
+
+    def test_fields_select_only_the_requested_columns(self):
+        with QueryCapture() as capture:
+            data = self.get(reverse('api-books'), fields='title,summary')
+        self.assertEqual(len(capture), 1)
+        self.assertEqual(set(data['results'][0]), {'title', 'summary'})
+        sql = capture.normalized[0]
+        self.assertIn('"summary"', sql)
+        self.assertNotIn('"isbn"', sql)
+        self.assertNotIn('catalog_author', sql)
+
+    def test_invalid_parameters(self):
+        self.assertIn('nope', self.get(reverse('api-books'), status=400, fields='title,nope')['error'])
+        self.get(reverse('api-books'), status=400, cursor='not-a-cursor')
+        self.get(reverse('api-books'), status=400, limit='many')
+        self.get(reverse('api-book', args=[0]), status=404)
+        self.get(reverse('api-book-copies', args=[0]), status=404)
+
+    def test_book_detail_and_copies(self):
+        book = self.dataset['book']
+        data = self.get(reverse('api-book', args=[book.pk]))
+        self.assertEqual(data['summary'], book.summary)
+        self.assertEqual(len(data['genres']), 2)
+
+        copies = self.get(reverse('api-book-copies', args=[book.pk]))['results']
+        self.assertEqual(len(copies), book.bookinstance_set.count())
+        self.assertEqual(copies[0]['status'], 'a')
+        self.assertNotIn('borrower', copies[0])
+
+    def test_authors_embed_their_books(self):
+        with self.assertNumQueries(2):
+            data = self.get(reverse('api-authors'), fields='last_name,books')
+        first = data['results'][0]
+        self.assertEqual(
+            [book['title'] for book in first['books']],
+            list(Book.objects.filter(author__last_name=first['last_name']).order_by('title')
+                 .values_list('title', flat=True)),
+        )
+        author = self.dataset['author']
+        self.assertEqual(self.get(reverse('api-author', args=[author.pk]))['last_name'], author.last_name)
+
+    def test_cached_responses_follow_genre_changes(self):
+        url = reverse('api-books')
+        self.get(url)
+        with self.assertNumQueries(0):
+            self.get(url)
+        self.get(reverse('api-genres'))
+
+        genre = self.dataset['genre']
+        genre.name = 'Renamed'
+        genre.save()
+        names = {g['name'] for book in self.get(url)['results'] for g in book['genres']}
+        self.assertIn('Renamed', names)
+        self.assertIn('Renamed', {g['name'] for g in self.get(reverse('api-genres'))['results']})
@@ -0,0 +1,81 @@
+import re
+
+from django.test import override_settings
+from django.urls import reverse
+
+from catalog import async_views
+from catalog.models import BookInstance
+from catalog.testing import LIBRARIAN_PASSWORD, PATRON_PASSWORD, CatalogTestCase, seed_dataset
+
+CSRF_TOKEN = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+READ_ROUTES = ['index', 'books', 'book-detail', 'my-borrowed', 'all-borrowed', 'authors', 'author-detail']
+
+
+@override_settings(ROOT_URLCONF='catalog.tests.async_urls')
+class AsyncViewsTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def url(self, name):
+        kwargs = {'pk': self.dataset['book'].pk} if name == 'book-detail' else {}
+        if name == 'author-detail':
+            kwargs = {'pk': self.dataset['author'].pk}
+        return reverse(name, kwargs=kwargs)
+
+    def test_read_routes_resolve_to_async_views(self):
+        for name in READ_ROUTES:
+            with self.subTest(name=name):
+                match = self.client.get(self.url(name)).resolver_match
+                view = getattr(match.func, 'view_class', match.func)
+                self.assertEqual(view.__module__, async_views.__name__)
+
+    async def test_pages_match_sync_views(self):
+        for username, password in ((None, None), ('patron', PATRON_PASSWORD), ('librarian', LIBRARIAN_PASSWORD)):
+            if username:
+                await self.async_client.alogin(username=username, password=password)
+            for name in READ_ROUTES:
+                with self.subTest(user=username, name=name):
+                    url = self.url(name)
+                    response = await self.async_client.get(url)
+                    with override_settings(ROOT_URLCONF='locallibrary.urls'):
+                        expected = await self.async_client.get(url)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    if name != 'index':  # el contador de visitas cambia en cada petición
+                        self.assertEqual(CSRF_TOKEN.sub(b'', response.content), CSRF_TOKEN.sub(b'', expected.content))
+
+    async def test_cursor_pages(self):
+        response = await self.async_client.get(reverse('books'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 10)
+        response = await self.async_client.get(reverse('books'), {'cursor': page.next_cursor})
+        self.assertEqual(response.context['book_list'][0].title, 'Book 010')
+        response = await self.async_client.get(reverse('books'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_missing_detail_is_404(self):
+        response = await self.async_client.get(reverse('book-detail', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_access_checks(self):
+        response = await self.async_client.get(reverse('my-borrowed'))
+        self.assertRedirects(response, '/accounts/login/?next=' + reverse('my-borrowed'), fetch_redirect_response=False)
+        await self.async_client.alogin(username='patron', password=PATRON_PASSWORD)
+        response = await self.async_client.get(reverse('all-borrowed'))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse('my-borrowed'))
+        loans = await BookInstance.objects.filter(borrower=self.dataset['patron'], status='o').acount()
+        self.assertEqual(len(response.context['bookinstance_list']), min(loans, 10))
+
+    async def test_anonymous_pages_are_cached(self):
+        self.assertEqual((await self.async_client.get(reverse('books')))['X-Cache'], 'MISS')
+        self.assertEqual((await self.async_client.get(reverse('books')))['X-Cache'], 'HIT')
+
+    async def test_conditional_get(self):
+        await self.async_client.alogin(username='patron', password=PATRON_PASSWORD)
+        url = self.url('book-detail')
+        # La primera página crea la cookie CSRF, que forma parte del ETag de los usuarios.
+        await self.async_client.get(url)
+        etag = (await self.async_client.get(url))['ETag']
+        response = await self.async_client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
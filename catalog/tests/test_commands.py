@@ -0,0 +1,247 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from catalog import counters, search
+from catalog.management.commands.bench import LIBRARIAN_USERNAME
+from catalog.testing import CatalogTestCase, CatalogTransactionTestCase, seed_dataset
+from catalog.models import Author, Book, BookInstance, Genre, ImportCheckpoint
+
+
+class BenchLoanIndexesCommandTest(CatalogTransactionTestCase):
+    def test_reports_plans_and_restores_indexes(self):
+        out = StringIO()
+        call_command('bench_loan_indexes', rows=300, seed=True, repeat=2, interactive=False, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Ejemplares en la tabla: 300', output)
+        self.assertIn('sin índices', output)
+        self.assertIn('con índices', output)
+        self.assertIn('all-borrowed, página profunda', output)
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, BookInstance._meta.db_table)
+        for index in BookInstance._meta.indexes:
+            self.assertIn(index.name, constraints)
+        indexed_columns = [info['columns'] for info in constraints.values() if info['index']]
+        self.assertIn(['book_id'], indexed_columns)
+        self.assertIn(['borrower_id'], indexed_columns)
+
+
+    def test_asks_before_dropping_indexes(self):
+        with mock.patch('builtins.input', return_value='no'):
+            with self.assertRaisesMessage(CommandError, 'Medición cancelada.'):
+                call_command('bench_loan_indexes', rows=10, seed=True, stdout=StringIO())
+        self.assertFalse(BookInstance.objects.exists())
+
+
+class SeedLibraryCommandTest(CatalogTransactionTestCase):
+    def seed(self, stdout=None):
+        call_command(
+            'seed_library', authors=5, genres=3, books=20, users=4, copies=60, seed=1, stdout=stdout or StringIO(),
+        )
+        return (
+            list(Book.objects.order_by('pk').values_list('title', 'isbn', 'author__last_name')),
+            sorted(BookInstance.objects.values_list('status', 'due_back', 'book__title')),
+        )
+
+    def test_generates_catalog_deterministically(self):
+        out = StringIO()
+        first = self.seed(out)
+        self.assertIn('copies:', out.getvalue())
+        self.assertIn('indexes:', out.getvalue())
+        self.assertEqual(Author.objects.count(), 5)
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(BookInstance.objects.count(), 60)
+        self.assertEqual(BookInstance.objects.filter(status='o', borrower__isnull=True).count(), 0)
+        self.assertEqual(BookInstance.objects.filter(status='o', due_back__isnull=True).count(), 0)
+        for book in Book.objects.prefetch_related('genre'):
+            self.assertIn(len(book.genre.all()), (1, 2, 3))
+        self.assertEqual(counters.get_counters(), counters.compute_counters())
+        self.assertTrue(search.search(first[0][0][0]))
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, BookInstance._meta.db_table)
+        for index in BookInstance._meta.indexes:
+            self.assertIn(index.name, constraints)
+        indexed_columns = [info['columns'] for info in constraints.values() if info['index']]
+        self.assertIn(['book_id'], indexed_columns)
+        self.assertIn(['borrower_id'], indexed_columns)
+
+        for model in (BookInstance, Book, Author, Genre):
+            model.objects.all().delete()
+        self.assertEqual(self.seed()[1], first[1])
+
+    def test_seeds_a_database_that_has_data(self):
+        self.seed()
+        self.seed()
+        self.assertEqual(BookInstance.objects.count(), 120)
+        self.assertEqual(counters.get_counters(), counters.compute_counters())
+
+
+class ImportCatalogCommandTest(CatalogTestCase):
+    def write(self, name, content):
+        path = Path(self.tmpdir.name) / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        Genre.objects.create(name='Fantasy')
+
+    def test_import_csv(self):
+        path = self.write('catalog.csv', (
+            'title,summary,isbn,author_first_name,author_last_name,genres,copies,imprint\n'
+            'Earthsea,Wizards,111,Ursula,Le Guin,Fantasy|Classic,2,Parnassus\n'
+            'The Dispossessed,Anarres,222,Ursula,Le Guin,Science Fiction,1,Harper\n'
+            'I Robot,Robots,333,Isaac,Asimov,Science Fiction|Classic,0,\n'
+        ))
+        out = StringIO()
+        call_command('import_catalog', path, batch_size=2, stdout=out)
+
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(BookInstance.objects.filter(status='a').count(), 3)
+        earthsea = Book.objects.get(title='Earthsea')
+        self.assertEqual(earthsea.author.last_name, 'Le Guin')
+        self.assertEqual(sorted(genre.name for genre in earthsea.genre.all()), ['Classic', 'Fantasy'])
+        self.assertEqual(search.search('asimov'), [Book.objects.get(title='I Robot').pk])
+        self.assertIn('filas/s', out.getvalue())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_invalidates_cached_pages(self):
+        pages = {
+            reverse('books'): 'Earthsea',
+            reverse('authors'): 'Asimov',
+            reverse('api-genres'): 'Sea',
+            Author.objects.get().get_absolute_url(): 'Earthsea',
+        }
+        for url in pages:
+            self.client.get(url)
+        path = self.write('catalog.csv', (
+            'title,author_first_name,author_last_name,genres\n'
+            'Earthsea,Ursula,Le Guin,Sea\n'
+            'I Robot,Isaac,Asimov,\n'
+        ))
+        call_command('import_catalog', path, stdout=StringIO())
+        for url, text in pages.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertContains(response, text)
+
+    def test_import_jsonl_resumes_from_checkpoint(self):
+        rows = [
+            {'title': f'Book {i}', 'author': 'Doe, John', 'genres': ['Fantasy'], 'copies': 1}
+            for i in range(5)
+        ]
+        path = self.write('catalog.jsonl', '\n'.join(json.dumps(row) for row in rows) + '\n')
+        ImportCheckpoint.objects.create(name=path, rows=3)
+
+        call_command('import_catalog', path, resume=True, stdout=StringIO())
+
+        self.assertEqual(list(Book.objects.order_by('title').values_list('title', flat=True)), ['Book 3', 'Book 4'])
+        self.assertEqual(Author.objects.filter(last_name='Doe', first_name='John').count(), 1)
+        self.assertEqual(BookInstance.objects.count(), 2)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_commits_with_its_batch(self):
+        path = self.write('catalog.csv', 'title,copies\nA,1\nB,1\nC,1\n,1\nE,1\n')
+        with self.assertRaisesMessage(CommandError, 'Fila 4'):
+            call_command('import_catalog', path, batch_size=2, stdout=StringIO())
+        # El primer lote se confirmó con su punto de control; el segundo no dejó nada.
+        self.assertEqual(ImportCheckpoint.objects.get(name=path).rows, 2)
+        self.assertEqual(Book.objects.count(), 2)
+
+        Path(path).write_text('title,copies\nA,1\nB,1\nC,1\nD,1\nE,1\n', encoding='utf-8')
+        call_command('import_catalog', path, batch_size=2, resume=True, stdout=StringIO())
+        self.assertEqual(list(Book.objects.order_by('title').values_list('title', flat=True)), list('ABCDE'))
+
+    def test_missing_title_is_an_error(self):
+        path = self.write('catalog.csv', 'title,summary\n,No title\n')
+        with self.assertRaisesMessage(CommandError, 'Fila 1'):
+            call_command('import_catalog', path, stdout=StringIO())
+
+    def test_unknown_status_is_an_error(self):
+        path = self.write('catalog.csv', 'title,copies,status\nA,1,a\nB,1,x\n')
+        with self.assertRaisesMessage(CommandError, 'Fila 2: estado "x" desconocido.'):
+            call_command('import_catalog', path, stdout=StringIO())
+        self.assertFalse(BookInstance.objects.exists())
+
+    def test_jsonl_genres_must_be_a_list(self):
+        path = self.write('catalog.jsonl', '\n'.join([
+            json.dumps({'title': 'A', 'genres': ['Fantasy']}),
+            json.dumps({'title': 'B', 'genres': 'Fantasy'}),
+        ]) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Fila 2: "genres" debe ser una lista de nombres.'):
+            call_command('import_catalog', path, stdout=StringIO())
+        self.assertEqual(list(Genre.objects.values_list('name', flat=True)), ['Fantasy'])
+
+
+class BenchConnectionsCommandTest(CatalogTransactionTestCase):
+    def test_reports_both_connection_modes(self):
+        out = StringIO()
+        call_command('bench_connections', requests=5, stdout=out)
+        self.assertIn('conexión nueva por petición', out.getvalue())
+        self.assertIn('persistente + health checks', out.getvalue())
+
+
+class BenchSqliteConcurrencyCommandTest(CatalogTestCase):
+    def test_reports_both_profiles(self):
+        out = StringIO()
+        call_command('bench_sqlite_concurrency', readers=2, writers=1, duration=0.2, rows=100, stdout=out)
+        self.assertIn('por defecto', out.getvalue())
+        self.assertIn('perfil de producción', out.getvalue())
+        self.assertEqual(out.getvalue().count('ops/s'), 4)
+
+
+class SyncSqliteReplicasCommandTest(CatalogTestCase):
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_requires_sqlite_replicas(self):
+        with self.assertRaisesMessage(CommandError, 'réplica SQLite'):
+            call_command('sync_sqlite_replicas', stdout=StringIO())
+
+
+class BenchCommandTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset()
+
+    def bench(self, **options):
+        out = StringIO()
+        call_command('bench', repeat=2, warmup=0, routes=['books', 'book-detail'], stdout=out, **options)
+        return out.getvalue()
+
+    def test_writes_results_and_compares_with_baseline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'baseline.json'
+            output = self.bench(output=str(path))
+            self.assertIn('librarian book-detail', output)
+            report = json.loads(path.read_text())
+            self.assertEqual(len(report['results']), 6)
+            result = report['results']['anonymous books']
+            self.assertEqual(result['status_code'], 200)
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['alloc_kib'], 0)
+            self.assertEqual(report['meta']['rows']['books'], 25)
+            self.assertFalse(User.objects.filter(username=LIBRARIAN_USERNAME).exists())
+            self.assertFalse(Session.objects.exists())
+
+            # Misma medida con una consulta menos en la línea base: cuenta como regresión.
+            report['results']['patron books']['queries'] -= 1
+            path.write_text(json.dumps(report))
+            output = self.bench(baseline=str(path), threshold=1000)
+            self.assertIn('REGRESIÓN: +1 consultas', output)
+            with self.assertRaisesMessage(CommandError, '1 regresiones'):
+                self.bench(baseline=str(path), threshold=1000, fail_on_regression=True)
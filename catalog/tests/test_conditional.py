@@ -0,0 +1,96 @@
+import datetime
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import loans
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import CatalogTestCase, seed_dataset
+
+
+class ConditionalGetTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def setUp(self):
+        self.book = Book.objects.get(pk=self.dataset['book'].pk)
+        self.book_url = self.book.get_absolute_url()
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertNotModified(self, url, etag):
+        with self.assertNumQueries(1), self.assertTemplateNotUsed('catalog/book_detail.html'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    @override_settings(CATALOG_PAGE_CACHE=False)
+    def test_unchanged_detail_is_304_after_one_query(self):
+        etag = self.etag(self.book_url)
+        self.assertNotModified(self.book_url, etag)
+
+    def test_if_modified_since(self):
+        past = timezone.now() - datetime.timedelta(days=1)
+        Book.objects.filter(pk=self.book.pk).update(updated_at=past)
+        Author.objects.filter(pk=self.book.author_id).update(updated_at=past)
+        BookInstance.objects.filter(book=self.book).update(updated_at=past)
+        response = self.client.get(self.book_url)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(self.book_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_book_page_changes(self):
+        changes = [
+            lambda: loans.checkout(self.book, self.dataset['patron']),
+            lambda: loans.renew(
+                BookInstance.objects.filter(book=self.book, status='o').values_list('pk', flat=True)[0],
+                datetime.date.today() + datetime.timedelta(weeks=2),
+            ),
+            lambda: self.book.genre.add(Genre.objects.create(name='Nuevo')),
+            lambda: Author.objects.get(pk=self.book.author_id).save(),
+            lambda: Genre.objects.filter(book=self.book).first().save(),
+        ]
+        for change in changes:
+            etag = self.etag(self.book_url)
+            change()
+            self.assertNotEqual(self.etag(self.book_url), etag)
+
+    def test_author_page_changes_when_a_book_leaves(self):
+        author = Author.objects.get(pk=self.book.author_id)
+        url = author.get_absolute_url()
+        etag = self.etag(url)
+        self.book.author = Author.objects.exclude(pk=author.pk).first()
+        self.book.save()
+        self.assertNotEqual(self.etag(url), etag)
+
+        etag = self.etag(url)
+        Book.objects.filter(author=author).first().delete()
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_list_etag_follows_deletions(self):
+        url = reverse('books')
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Book.objects.order_by('-updated_at').last().delete()
+        self.assertNotEqual(self.etag(url), etag)
+
+        url = reverse('authors')
+        etag = self.etag(url)
+        Author.objects.create(first_name='Nueva', last_name='Autora')
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_etag_depends_on_user(self):
+        anonymous = self.etag(self.book_url)
+        self.client.force_login(self.dataset['patron'])
+        self.assertNotEqual(self.etag(self.book_url), anonymous)
+
+    def test_cached_page_answers_304_without_queries(self):
+        etag = self.etag(self.book_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.book_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
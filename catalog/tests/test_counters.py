@@ -0,0 +1,180 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core import serializers
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import counters
+from catalog.models import Author, Book, BookInstance
+from catalog.testing import CatalogTestCase
+
+
+class CatalogCountersTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Doe')
+        cls.book = Book.objects.create(
+            title='Book Title', summary='My book summary', isbn='ABCDEFG', author=cls.author,
+        )
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='o')
+
+    def test_compute_counters_in_one_query(self):
+        with self.assertNumQueries(1):
+            values = counters.compute_counters()
+        self.assertEqual(values, {
+            'num_books': 1,
+            'num_instances': 2,
+            'num_instances_available': 1,
+            'num_authors': 1,
+        })
+
+    def test_index_uses_cached_counters(self):
+        counters.rebuild()
+        with self.assertNumQueries(0):
+            values = counters.get_counters()
+        self.assertEqual(values['num_instances'], 2)
+
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_books'], 1)
+        self.assertEqual(response.context['num_instances_available'], 1)
+
+    def test_counters_follow_saves_and_deletes(self):
+        counters.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(first_name='Jane', last_name='Roe')
+            book = Book.objects.create(title='Other', summary='Summary', isbn='123', author=self.author)
+            copy = BookInstance.objects.create(book=book, imprint='Imprint', status='m')
+        self.assertEqual(counters.get_counters(), {
+            'num_books': 2,
+            'num_instances': 3,
+            'num_instances_available': 1,
+            'num_authors': 2,
+        })
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.status = 'a'
+            copy.save()
+        self.assertEqual(counters.get_counters()['num_instances_available'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.delete()
+            book.delete()
+        values = counters.get_counters()
+        self.assertEqual(values['num_books'], 1)
+        self.assertEqual(values['num_instances'], 2)
+        self.assertEqual(values['num_instances_available'], 1)
+        self.assertEqual(values, counters.compute_counters())
+
+    def test_deleting_copies_loaded_with_deferred_fields(self):
+        counters.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.only('pk').filter(status='a').delete()
+        self.assertEqual(counters.get_counters()['num_instances_available'], 0)
+        self.assertEqual(counters.get_counters(), counters.compute_counters())
+
+    def test_fixture_loads_do_not_adjust_counters(self):
+        counters.rebuild()
+        now = timezone.now()
+        data = serializers.serialize('json', [
+            BookInstance(book=self.book, imprint='Fixture', status='a', updated_at=now),
+            Author(pk=self.author.pk + 1, first_name='Jane', last_name='Roe', updated_at=now),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            for obj in serializers.deserialize('json', data):
+                obj.save()
+        values = counters.get_counters()
+        self.assertEqual((values['num_instances'], values['num_instances_available'], values['num_authors']), (2, 1, 1))
+
+    def test_adjustments_wait_for_the_transaction_of_their_database(self):
+        with mock.patch.object(transaction, 'on_commit') as on_commit:
+            counters.adjust('other', num_books=1)
+            counters.invalidate('other')
+        self.assertEqual([call.kwargs for call in on_commit.call_args_list], [{'using': 'other'}] * 2)
+
+    @override_settings(CATALOG_SHARED_CACHE=False)
+    def test_process_local_cache_expires_counters(self):
+        with self.assertNumQueries(1):
+            counters.get_counters()
+        key = counters.CACHE_PREFIX + 'num_books'
+        self.assertTrue(cache.has_key(key))
+        self.assertEqual(counters.cache_timeout(), counters.LOCAL_CACHE_TIMEOUT)
+
+    def test_rebuild_counters_command(self):
+        cache.set(counters.CACHE_PREFIX + 'num_books', 99, None)
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('num_books: 1', out.getvalue())
+        self.assertEqual(counters.get_counters()['num_books'], 1)
+
+
+class BookCopyCountersTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG')
+        cls.other = Book.objects.create(title='Other', summary='Summary', isbn='123')
+
+    def copies(self, book):
+        book.refresh_from_db(fields=['copies_total', 'copies_available'])
+        return book.copies_total, book.copies_available
+
+    def test_follow_creates_status_changes_moves_and_deletes(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o')
+        self.assertEqual(self.copies(self.book), (2, 1))
+
+        copy.status = 'o'
+        copy.save()
+        self.assertEqual(self.copies(self.book), (2, 0))
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status, copy.book = 'a', self.other
+        copy.save()
+        self.assertEqual(self.copies(self.book), (1, 0))
+        self.assertEqual(self.copies(self.other), (1, 1))
+
+        # update_fields sin el estado ni el libro no toca los contadores.
+        with self.assertNumQueries(1):
+            copy.imprint = 'Nueva'
+            copy.save(update_fields=['imprint'])
+
+        copy.delete()
+        self.assertEqual(self.copies(self.other), (0, 0))
+        self.assertEqual(counters.stale_book_copies().count(), 0)
+
+    def test_saving_a_stale_book_keeps_counters(self):
+        book = Book.objects.get(pk=self.book.pk)
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        book.title = 'Renamed'
+        book.save()
+        self.assertEqual(self.copies(book), (1, 1))
+
+    def test_rolled_back_save_does_not_change_counters(self):
+        try:
+            with transaction.atomic():
+                BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.copies(self.book), (0, 0))
+
+    def test_rebuild_counters_repairs_bulk_changes(self):
+        BookInstance.objects.bulk_create([
+            BookInstance(book=self.book, imprint='Imprint', status='a'),
+            BookInstance(book=self.book, imprint='Imprint', status='m'),
+        ])
+        BookInstance.objects.create(book=self.other, imprint='Imprint', status='a')
+        BookInstance.objects.filter(book=self.other).update(status='o')
+        self.assertEqual(counters.stale_book_copies().count(), 2)
+
+        out = StringIO()
+        call_command('rebuild_counters', stdout=out)
+        self.assertIn('desajustados: 2', out.getvalue())
+        self.assertEqual(self.copies(self.book), (2, 1))
+        self.assertEqual(self.copies(self.other), (1, 0))
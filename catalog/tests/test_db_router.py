@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from catalog.db_router import SESSION_KEY, PrimaryReplicaRouter, ReplicaStickinessMiddleware
+from catalog.models import Book
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def view(self, request):
+        # Anota de dónde leería el catálogo y simula una escritura si se pide.
+        self.reads.append(self.router.db_for_read(Book))
+        if request.GET.get('write'):
+            self.router.db_for_write(Book)
+        return HttpResponse()
+
+    def request(self, method='get', session=None, **params):
+        request = getattr(self.factory, method)('/', params)
+        request.session = {} if session is None else session
+        ReplicaStickinessMiddleware(self.view)(request)
+        return request
+
+    def test_catalog_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Book), 'replica_1')
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+
+    def test_other_apps_read_from_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica_1', 'catalog'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'catalog'))
+
+    def test_write_makes_rest_of_session_read_from_primary(self):
+        request = self.request()
+        self.assertNotIn(SESSION_KEY, request.session)
+        request = self.request(session=request.session, write='1')
+        self.assertIs(request.session[SESSION_KEY], True)
+        self.request(session=request.session)
+        self.assertEqual(self.reads, ['replica_1', 'replica_1', 'default'])
+        # Fuera de la petición se vuelve a leer de la réplica.
+        self.assertEqual(self.router.db_for_read(Book), 'replica_1')
+
+    def test_unsafe_methods_read_from_primary(self):
+        self.request(method='post')
+        self.assertEqual(self.reads, ['default'])
+
+    async def test_async_middleware_marks_session(self):
+        session = SessionStore()
+
+        async def view(request):
+            self.router.db_for_write(Book)
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.session = session
+        await ReplicaStickinessMiddleware(view)(request)
+        self.assertIs(await session.aget(SESSION_KEY), True)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_middleware_unused_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaStickinessMiddleware(self.view)
+        self.assertEqual(self.router.db_for_read(Book), 'default')
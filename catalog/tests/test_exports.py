@@ -0,0 +1,104 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.urls import reverse
+
+from catalog import exports
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import CatalogTestCase
+
+User = get_user_model()
+
+
+class ExportTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        genres = [Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Classic')]
+        for i in range(7):
+            book = Book.objects.create(title=f'Book {i}', summary='Summary', isbn=f'{i}', author=author)
+            book.genre.set(genres)
+            BookInstance.objects.create(
+                book=book, imprint='Imprint', status='o', borrower=cls.librarian,
+                due_back=datetime.date(2030, 1, 1),
+            )
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_requires_permission(self):
+        User.objects.create_user(username='patron', password='2HJ1vRV0Z&3iD')
+        self.client.login(username='patron', password='2HJ1vRV0Z&3iD')
+        self.assertEqual(self.client.get(reverse('export-books')).status_code, 403)
+
+    def test_books_csv(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('export-books'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(self.read(response).decode())))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['author_last_name'], 'Le Guin')
+        self.assertEqual(sorted(rows[0]['genres'].split('|')), ['Classic', 'Fantasy'])
+
+    def test_loans_jsonl_gzip(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('export-loans'), {'format': 'jsonl', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('loans.jsonl.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(self.read(response)).splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['borrower'], 'librarian')
+        self.assertEqual(rows[0]['due_back'], '2030-01-01')
+
+    async def test_asgi_response_streams_chunk_by_chunk(self):
+        produced = []
+
+        def counted_rows(**kwargs):
+            for row in exports.book_rows(**kwargs):
+                produced.append(row)
+                yield row
+
+        await self.async_client.aforce_login(self.librarian)
+        with mock.patch.dict(exports.EXPORTS, {'books': (counted_rows, exports.BOOK_FIELDS)}), \
+                mock.patch.object(exports, 'BUFFER_SIZE', 1):
+            response = await self.async_client.get(reverse('export-books'))
+            self.assertTrue(response.is_async)
+            chunks = response.__aiter__()
+            header = await anext(chunks)
+            self.assertTrue(header.startswith(b'id,title'))
+            # Sin list(): tras el primer bloque sólo se leyó lo necesario, no los 7 libros.
+            self.assertLess(len(produced), 7)
+            body = header + b''.join([chunk async for chunk in chunks])
+        self.assertEqual(len(produced), 7)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(body.decode())))), 7)
+
+    def test_unknown_format_is_404(self):
+        self.client.force_login(self.librarian)
+        self.assertEqual(self.client.get(reverse('export-books'), {'format': 'xml'}).status_code, 404)
+
+    def test_related_data_is_loaded_per_chunk(self):
+        # Una consulta de libros leída por bloques de 3 + una de géneros por bloque.
+        with self.assertNumQueries(4):
+            rows = list(exports.book_rows(chunk_size=3))
+        self.assertEqual(len(rows), 7)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(exports.loan_rows(chunk_size=3))), 7)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'books.csv.gz')
+            call_command('export_catalog', 'books', gzip=True, output=path)
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 7)
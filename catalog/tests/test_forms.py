@@ -1,7 +1,11 @@
 import datetime
+import uuid
+from urllib.parse import urlencode
+
+from django.http import QueryDict
 from django.test import TestCase
 from django.utils import timezone
-from catalog.forms import RenewBookForm
+from catalog.forms import BulkLoanForm, RenewBookForm
 
 class RenewBookFormTest(TestCase):
     def test_renew_form_date_field_label(self):
@@ -41,4 +45,28 @@ class RenewBookFormTest(TestCase):
     def test_renew_form_date_max_range(self):
         date = timezone.localtime() + datetime.timedelta(weeks=4)
         form = RenewBookForm(data={'renewal_date': date})
-        self.assertTrue(form.is_valid())
\ No newline at end of file
+        self.assertTrue(form.is_valid())
+
+class BulkLoanFormTest(TestCase):
+    def form(self, **data):
+        return BulkLoanForm(data=QueryDict(urlencode({'copies': [str(uuid.uuid4())], **data}, doseq=True)))
+
+    def test_renewal_uses_the_renewal_date_rules(self):
+        form = self.form(action='renew', renewal_date=datetime.date.today() + datetime.timedelta(weeks=5))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['renewal_date'], ['Invalid date - renewal more than 4 weeks ahead'])
+        self.assertFalse(self.form(action='renew').is_valid())
+        self.assertTrue(self.form(action='renew', renewal_date=datetime.date.today()).is_valid())
+
+    def test_return_needs_no_date(self):
+        self.assertTrue(self.form(action='return').is_valid())
+
+    def test_copies_are_required_uuids(self):
+        form = BulkLoanForm(data=QueryDict(urlencode({'copies': ['x'], 'action': 'return'}, doseq=True)))
+        self.assertIn('copies', form.errors)
+        self.assertIn('copies', BulkLoanForm(data={'action': 'return'}).errors)
+
+    def test_copies_are_capped(self):
+        copies = [str(uuid.uuid4()) for _ in range(BulkLoanForm.MAX_COPIES + 1)]
+        form = BulkLoanForm(data=QueryDict(urlencode({'copies': copies, 'action': 'return'}, doseq=True)))
+        self.assertEqual(form.errors['copies'], ['Select at most %d copies.' % BulkLoanForm.MAX_COPIES])
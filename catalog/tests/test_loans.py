@@ -0,0 +1,73 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from catalog import counters, loans
+from catalog.models import Book, BookInstance
+from catalog.testing import CatalogTestCase, CatalogTransactionTestCase, QueryCapture
+
+
+class LoanServiceTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.patron = User.objects.create_user('patron')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1')
+        cls.copies = [BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a') for _ in range(2)]
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='m')
+
+    def test_checkout_until_no_copy_is_left(self):
+        taken = {loans.checkout(self.book, self.patron), loans.checkout(self.book.pk, self.patron)}
+        self.assertEqual(taken, {copy.pk for copy in self.copies})
+        with self.assertRaises(loans.NoCopyAvailable):
+            loans.checkout(self.book, self.patron)
+
+        copy = BookInstance.objects.get(pk=self.copies[0].pk)
+        self.assertEqual((copy.status, copy.borrower), ('o', self.patron))
+        self.assertEqual(copy.due_back, datetime.date.today() + loans.LOAN_PERIOD)
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_total, self.book.copies_available), (3, 0))
+
+    def statements(self, capture):
+        return [sql.split()[0] for sql in capture.normalized if 'SAVEPOINT' not in sql]
+
+    def test_checkout_and_return_are_single_updates(self):
+        with QueryCapture() as capture:
+            copy_id = loans.checkout(self.book, self.patron)
+        # La copia, el UPDATE condicional y el contador del libro.
+        self.assertEqual(self.statements(capture), ['SELECT', 'UPDATE', 'UPDATE'])
+        with QueryCapture() as capture:
+            loans.return_copy(copy_id)
+        self.assertEqual(self.statements(capture), ['SELECT', 'UPDATE', 'UPDATE'])
+        self.assertEqual(counters.stale_book_copies().count(), 0)
+        copy = BookInstance.objects.get(pk=copy_id)
+        self.assertEqual((copy.status, copy.borrower, copy.due_back), ('a', None, None))
+
+    def test_return_and_renew_require_a_loan(self):
+        with self.assertRaises(loans.CopyNotOnLoan):
+            loans.return_copy(self.copies[0].pk)
+        with self.assertRaises(loans.CopyNotOnLoan):
+            loans.renew(self.copies[0].pk, datetime.date.today())
+
+        copy_id = loans.checkout(self.book, self.patron)
+        due_back = datetime.date.today() + datetime.timedelta(days=10)
+        loans.renew(copy_id, due_back)
+        self.assertEqual(BookInstance.objects.get(pk=copy_id).due_back, due_back)
+
+    def test_global_counters_follow_loans(self):
+        counters.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            copy_id = loans.checkout(self.book, self.patron)
+        self.assertEqual(counters.get_counters()['num_instances_available'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            loans.return_copy(copy_id)
+        self.assertEqual(counters.get_counters(), counters.compute_counters())
+
+
+class StressLoansCommandTest(CatalogTransactionTestCase):
+    def test_concurrent_loans_never_lend_a_copy_twice(self):
+        out = StringIO()
+        call_command('stress_loans', threads=4, books=2, copies=2, operations=25, stdout=out)
+        self.assertIn('Préstamos dobles: 0, copias sin devolver: 0, libros con contadores desajustados: 0', out.getvalue())
+        self.assertFalse(Book.objects.exists())
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from catalog.testing import CatalogTestCase, seed_dataset
+
+# Cada proceso atiende dos peticiones a la lista de libros.
+WORKER = """
+import django
+django.setup()
+from django.test import Client
+client = Client(HTTP_HOST='localhost')
+for _ in range(2):
+    assert client.get('/catalog/books/').status_code == 200
+"""
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(CATALOG_METRICS=True)
+class MetricsTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def test_requests_latency_and_queries_by_url_name(self):
+        labels = {'view': 'book-detail', 'method': 'GET', 'status': '200'}
+        before = sample('catalog_http_requests_total', **labels)
+        latency = sample('catalog_http_request_duration_seconds_count', view='book-detail')
+        queries = sample('catalog_db_queries_total', view='book-detail')
+
+        url = reverse('book-detail', kwargs={'pk': self.dataset['book'].pk})
+        self.client.get(url)
+
+        self.assertEqual(sample('catalog_http_requests_total', **labels), before + 1)
+        self.assertEqual(sample('catalog_http_request_duration_seconds_count', view='book-detail'), latency + 1)
+        self.assertGreater(sample('catalog_db_queries_total', view='book-detail'), queries)
+
+    def test_unresolved_paths_share_a_label(self):
+        before = sample('catalog_http_requests_total', view='unmatched', method='GET', status='404')
+        self.client.get('/catalog/no-existe-1/')
+        self.client.get('/catalog/no-existe-2/')
+        self.assertEqual(sample('catalog_http_requests_total', view='unmatched', method='GET', status='404'), before + 2)
+
+    def test_page_cache_hits_and_misses(self):
+        hits = sample('catalog_cache_requests_total', cache='page', result='hit')
+        misses = sample('catalog_cache_requests_total', cache='page', result='miss')
+        for _ in range(3):
+            self.client.get(reverse('books'))
+        self.assertEqual(sample('catalog_cache_requests_total', cache='page', result='miss'), misses + 1)
+        self.assertEqual(sample('catalog_cache_requests_total', cache='page', result='hit'), hits + 2)
+
+    def test_exposition_format(self):
+        self.client.get(reverse('books'))
+        self.client.force_login(self.dataset['librarian'])
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(response, 'catalog_http_request_duration_seconds_bucket{le="0.005",view="books"}')
+
+    def test_requires_staff_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.dataset['patron'])
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.dataset['librarian'])
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(CATALOG_METRICS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CATALOG_METRICS=False)
+    def test_disabled_metrics_are_not_found(self):
+        self.client.force_login(self.dataset['librarian'])
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_aggregates_worker_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ, PROMETHEUS_MULTIPROC_DIR=directory, DJANGO_SETTINGS_MODULE='locallibrary.settings',
+                DJANGO_SECRET_KEY='x', DATABASE_URL='sqlite:///%s/db.sqlite3' % directory,
+            )
+            subprocess.run([sys.executable, '-c', 'from django.core.management import call_command; '
+                            'import django; django.setup(); call_command("migrate", verbosity=0)'],
+                           env=env, cwd=settings.BASE_DIR, check=True)
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', WORKER], env=env, cwd=settings.BASE_DIR, check=True)
+            self.client.force_login(self.dataset['librarian'])
+            with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directory):
+                response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'catalog_http_requests_total{method="GET",status="200",view="books"} 4.0')
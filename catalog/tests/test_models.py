@@ -107,4 +107,30 @@ class BookInstanceModelTest(TestCase):
 
     def test_string_representation(self):
         book_instance = self.book_instance
-        self.assertIn('Test Book', str(book_instance))
\ No newline at end of file
+        self.assertIn('Test Book', str(book_instance))
+
+class BookInstanceQuerySetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        test_author = Author.objects.create(first_name='John', last_name='Doe')
+        test_book = Book.objects.create(title='Test Book', summary='Test summary', isbn='1', author=test_author)
+        today = datetime.date.today()
+        cls.overdue = BookInstance.objects.create(
+            book=test_book, imprint='Imprint', status='o', due_back=today - datetime.timedelta(days=3),
+        )
+        cls.due_today = BookInstance.objects.create(book=test_book, imprint='Imprint', status='o', due_back=today)
+        cls.returned_late = BookInstance.objects.create(
+            book=test_book, imprint='Imprint', status='a', due_back=today - datetime.timedelta(days=3),
+        )
+
+    def test_overdue_only_returns_late_loans(self):
+        self.assertEqual(list(BookInstance.objects.overdue()), [self.overdue])
+
+    def test_with_is_overdue_matches_property(self):
+        annotated = BookInstance.objects.with_is_overdue()
+        for book_instance in annotated:
+            self.assertEqual(book_instance.is_overdue, BookInstance.objects.get(pk=book_instance.pk).is_overdue)
+        self.assertEqual(
+            set(annotated.filter(is_overdue=True).values_list('pk', flat=True)),
+            {self.overdue.pk, self.returned_late.pk},
+        )
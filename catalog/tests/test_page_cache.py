@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from catalog import page_cache
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import CatalogTestCase
+
+User = get_user_model()
+
+
+class PageCacheTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.book = Book.objects.create(title='Earthsea', summary='Wizards', isbn='1', author=cls.author)
+        cls.genre = Genre.objects.create(name='Fantasy')
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertCached(self, url):
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        return response
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        for url in (reverse('books'), self.book.get_absolute_url(),
+                    reverse('authors'), self.author.get_absolute_url()):
+            with self.subTest(url=url):
+                self.assertCached(url)
+
+    def test_authenticated_users_bypass_cache(self):
+        user = User.objects.create_user(username='patron', password='2HJ1vRV0Z&3iD')
+        self.client.force_login(user)
+        response = self.get(reverse('books'))
+        self.assertNotIn('X-Cache', response)
+
+    def test_book_change_invalidates_list_and_detail(self):
+        self.assertCached(reverse('books'))
+        self.assertCached(self.book.get_absolute_url())
+        self.book.title = 'A Wizard of Earthsea'
+        self.book.save()
+        self.assertContains(self.get(reverse('books')), 'A Wizard of Earthsea')
+        self.assertContains(self.get(self.book.get_absolute_url()), 'A Wizard of Earthsea')
+
+    def test_author_change_invalidates_book_pages(self):
+        self.assertCached(self.book.get_absolute_url())
+        self.author.last_name = 'LeGuin'
+        self.author.save()
+        self.assertContains(self.get(self.book.get_absolute_url()), 'LeGuin')
+        self.assertContains(self.get(reverse('authors')), 'LeGuin')
+
+    def test_genre_and_copy_changes_invalidate_book_detail(self):
+        url = self.book.get_absolute_url()
+        self.assertCached(url)
+        self.book.genre.add(self.genre)
+        self.assertContains(self.get(url), 'Fantasy')
+
+        self.genre.name = 'Fantasía'
+        self.genre.save()
+        self.assertContains(self.get(url), 'Fantasía')
+
+        copy = BookInstance.objects.create(book=self.book, imprint='Parnassus Press', status='a')
+        self.assertContains(self.get(url), 'Parnassus Press')
+        copy.delete()
+        self.assertNotContains(self.get(url), 'Parnassus Press')
+
+    def test_book_moving_author_invalidates_both_authors(self):
+        other = Author.objects.create(first_name='Isaac', last_name='Asimov')
+        self.assertCached(self.author.get_absolute_url())
+        self.assertCached(other.get_absolute_url())
+        book = Book.objects.get(pk=self.book.pk)
+        book.author = other
+        book.save()
+        self.assertNotContains(self.get(self.author.get_absolute_url()), 'Earthsea')
+        self.assertContains(self.get(other.get_absolute_url()), 'Earthsea')
+
+    def test_bump_on_commit_discards_pages_cached_during_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book.title = 'Changed'
+            self.book.save()
+            self.get(self.book.get_absolute_url())  # se guarda bajo la versión nueva
+        versions = page_cache.get_versions([page_cache.book_key(self.book.pk)])
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versions, page_cache.get_versions([page_cache.book_key(self.book.pk)]))
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'], DATABASE_REPLICA_LAG=60)
+    def test_pages_are_not_stored_while_replicas_may_lag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = 'Changed'
+            self.book.save()
+        self.assertEqual(self.get(self.book.get_absolute_url())['X-Cache'], 'MISS')
+        self.assertEqual(self.get(self.book.get_absolute_url())['X-Cache'], 'MISS')
+        with override_settings(DATABASE_REPLICA_LAG=0):
+            self.assertCached(self.book.get_absolute_url())
+
+    def test_stats(self):
+        self.assertCached(reverse('books'))
+        self.assertEqual(page_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        out, err = StringIO(), StringIO()
+        call_command('page_cache_stats', stdout=out, stderr=err)
+        self.assertIn('hit_ratio: 0.500', out.getvalue())
+        with self.settings(CATALOG_SHARED_CACHE=False):
+            call_command('page_cache_stats', stdout=out, stderr=err)
+        self.assertIn('La cache es de este proceso', err.getvalue())
@@ -0,0 +1,122 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import FORWARD, CursorPaginator, EstimatedCountPaginator, estimated_row_count
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Doe')
+        book = Book.objects.create(title='Book', summary='Summary', isbn='1', author=author)
+        today = datetime.date.today()
+        # Fechas repetidas y nulas para forzar el desempate por pk y el orden de los NULL.
+        for i in range(23):
+            due_back = None if i % 5 == 0 else today + datetime.timedelta(days=i % 4)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back, status='o')
+
+    def walk(self, ordering, per_page=4):
+        paginator = CursorPaginator(BookInstance.objects.all(), per_page, ordering)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def expected(self, ordering):
+        rows = list(BookInstance.objects.all())
+        for name in reversed(ordering + ['pk']):
+            attr = name.lstrip('-')
+            descending = name.startswith('-')
+            non_null = sorted(
+                (row for row in rows if getattr(row, attr) is not None),
+                key=lambda row: getattr(row, attr), reverse=descending,
+            )
+            nulls = [row for row in rows if getattr(row, attr) is None]
+            # Los NULL quedan donde los ordena la base de datos.
+            if connection.features.nulls_order_largest != descending:
+                rows = non_null + nulls
+            else:
+                rows = nulls + non_null
+        return rows
+
+    def assertWalksInOrder(self, ordering):
+        paginator, pages = self.walk(ordering)
+        walked = [row for page in pages for row in page]
+        self.assertEqual([row.pk for row in walked], [row.pk for row in self.expected(ordering)])
+
+        # Y hacia atrás desde la última página se recorren las mismas páginas.
+        backwards = [pages[-1]]
+        while backwards[-1].has_previous():
+            backwards.append(paginator.page(backwards[-1].previous_cursor))
+        self.assertEqual(
+            [[row.pk for row in page] for page in reversed(backwards)],
+            [[row.pk for row in page] for page in pages],
+        )
+
+    def test_ascending_with_nulls(self):
+        self.assertWalksInOrder(['due_back'])
+
+    def test_descending_with_nulls(self):
+        self.assertWalksInOrder(['-due_back'])
+
+    def test_first_and_last_page_flags(self):
+        paginator, pages = self.walk(['due_back'])
+        self.assertEqual(len(pages), 6)
+        self.assertFalse(pages[0].has_previous())
+        self.assertFalse(pages[-1].has_next())
+        self.assertEqual(len(pages[-1]), 3)
+
+    def test_deep_page_does_not_count(self):
+        paginator, pages = self.walk(['due_back'])
+        with self.assertNumQueries(1):
+            paginator.page(pages[3].next_cursor)
+
+    def test_list_orderings_use_an_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Se comprueba el plan de SQLite.')
+        cases = [
+            (Book.objects.all(), ['title'], 'book_title_idx'),
+            (Book.objects.all(), ['-copies_available', 'title'], 'book_available_idx'),
+            (Author.objects.all(), ['last_name'], 'author_last_name_idx'),
+        ]
+        for queryset, ordering, index in cases:
+            paginator = CursorPaginator(queryset, 10, ordering)
+            cursor = paginator.encode_cursor(FORWARD, queryset.first())
+            for page_cursor in (None, cursor):
+                with self.subTest(ordering=ordering, cursor=page_cursor):
+                    plan = paginator._page_queryset(page_cursor)[2].explain()
+                    self.assertIn(index, plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(title='Book', summary='Summary', isbn='1')
+        BookInstance.objects.bulk_create(BookInstance(book=book, imprint='Imprint', status='a') for _ in range(30))
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Las estadísticas de prueba se generan con ANALYZE de SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_unfiltered_large_table_uses_the_estimate(self):
+        self.assertEqual(estimated_row_count(BookInstance), 30)
+        paginator = EstimatedCountPaginator(BookInstance.objects.order_by('pk'), 10)
+        paginator.exact_threshold = 20
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE sqlite_stat1 SET stat = '1000' || substr(stat, instr(stat, ' ')) WHERE tbl = %s",
+                           [BookInstance._meta.db_table])
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 1000)
+        self.assertEqual(paginator.num_pages, 100)
+
+    def test_filtered_or_small_tables_are_counted(self):
+        paginator = EstimatedCountPaginator(BookInstance.objects.filter(status='o').order_by('pk'), 10)
+        paginator.exact_threshold = 20
+        self.assertEqual(paginator.count, 0)
+        self.assertEqual(EstimatedCountPaginator(BookInstance.objects.order_by('pk'), 10).count, 30)
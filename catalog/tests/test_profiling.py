@@ -0,0 +1,76 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+from django.urls import reverse
+
+from catalog.testing import LIBRARIAN_PASSWORD, PATRON_PASSWORD, CatalogTestCase, seed_dataset
+
+
+@override_settings(CATALOG_PROFILING=True, CATALOG_PROFILING_SAMPLE_RATE=0, CATALOG_PAGE_CACHE=False)
+class RequestProfilingTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+
+    def get(self, name, **kwargs):
+        with self.assertLogs('catalog.profiling', 'INFO') as logs:
+            response = self.client.get(reverse(name, kwargs=kwargs))
+        return response, [json.loads(record.getMessage()) for record in logs.records]
+
+    def timings(self, response):
+        timings = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            timings[name] = dict(param.split('=', 1) for param in params)
+        return timings
+
+    def test_log_line_has_queries_and_timings(self):
+        self.client.login(username='patron', password=PATRON_PASSWORD)
+        response, lines = self.get('book-detail', pk=self.dataset['book'].pk)
+        self.assertEqual(response.status_code, 200)
+        line = lines[0]
+        self.assertEqual(line['view'], 'book-detail')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['template_ms'], 0)
+        self.assertGreaterEqual(line['total_ms'], line['db_ms'] + line['template_ms'])
+
+    def test_server_timing_only_for_staff(self):
+        response, _ = self.get('books')
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.login(username='librarian', password=LIBRARIAN_PASSWORD)
+        response, lines = self.get('books')
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'tpl', 'py', 'total'})
+        self.assertEqual(timings['db']['desc'], '"%d queries"' % lines[0]['queries'])
+
+    def test_slow_sampled_requests_are_dumped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CATALOG_PROFILING_SAMPLE_RATE=1, CATALOG_PROFILING_SLOW_MS=0,
+                                   CATALOG_PROFILING_DIR=directory):
+                self.client = self.client_class()
+                _, lines = self.get('index')
+            profiles = list(Path(directory).iterdir())
+            self.assertEqual(len(profiles), 1)
+            self.assertRegex(profiles[0].name, r'-index-\d+ms\.prof$')
+            self.assertEqual(lines[0]['profile'], str(profiles[0]))
+
+    def test_fast_sampled_requests_are_not_dumped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(CATALOG_PROFILING_SAMPLE_RATE=1, CATALOG_PROFILING_DIR=directory):
+                self.client = self.client_class()
+                self.get('index')
+            self.assertEqual(list(Path(directory).iterdir()), [])
+
+    @override_settings(ROOT_URLCONF='catalog.tests.async_urls')
+    async def test_async_views_are_measured(self):
+        with self.assertLogs('catalog.profiling', 'INFO') as logs:
+            response = await self.async_client.get(reverse('books'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(line['view'], 'books')
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['template_ms'], 0)
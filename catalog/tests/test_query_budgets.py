@@ -0,0 +1,95 @@
+"""
+Presupuesto de consultas por ruta.
+
+Cada ruta con nombre de catalog/urls.py y cada lista de cambios del admin del catálogo
+se visita como usuario anónimo y como bibliotecario sobre un conjunto de datos realista.
+El número de consultas y el tiempo total de SQL no pueden superar lo registrado en
+query_budgets.json; si lo hacen, la prueba falla mostrando el diff de las consultas.
+
+Para regenerar el archivo tras un cambio intencional:
+
+    QUERY_BUDGETS_UPDATE=1 python manage.py test catalog.tests.test_query_budgets
+"""
+import json
+import os
+from pathlib import Path
+
+from django.core.cache import cache
+
+from catalog.testing import CatalogTestCase, QueryCapture, catalog_routes, query_diff, seed_dataset
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+DEFAULT_MAX_TIME_MS = 250
+UPDATE_BUDGETS = os.environ.get('QUERY_BUDGETS_UPDATE') == '1'
+
+
+class QueryBudgetTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = seed_dataset()
+        cls.routes = catalog_routes(cls.dataset)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = json.loads(BUDGETS_FILE.read_text()) if BUDGETS_FILE.exists() else {}
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE_BUDGETS and cls.measured:
+            budgets = {
+                key: {
+                    'status_code': result['status_code'],
+                    'max_queries': len(result['queries']),
+                    'max_time_ms': cls.budgets.get(key, {}).get('max_time_ms', DEFAULT_MAX_TIME_MS),
+                    'queries': result['queries'],
+                }
+                for key, result in sorted(cls.measured.items())
+            }
+            BUDGETS_FILE.write_text(json.dumps(budgets, indent=2) + '\n')
+        super().tearDownClass()
+
+    def measure(self, url):
+        # Cache vacía en cada visita: medimos el camino completo, no el acierto de cache.
+        cache.clear()
+        with QueryCapture() as capture:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, capture
+
+    def check_routes(self, user_label):
+        for name, url in self.routes:
+            key = f'{user_label}:{name}'
+            with self.subTest(route=key):
+                response, capture = self.measure(url)
+                self.measured[key] = {'status_code': response.status_code, 'queries': capture.normalized}
+                if UPDATE_BUDGETS:
+                    continue
+                self.assertIn(key, self.budgets, f'{key} has no query budget; regenerate query_budgets.json')
+                budget = self.budgets[key]
+                self.assertEqual(response.status_code, budget['status_code'])
+                if len(capture) > budget['max_queries']:
+                    self.fail('%s ran %d queries (budget %d):\n%s' % (
+                        key, len(capture), budget['max_queries'],
+                        query_diff(budget['queries'], capture.normalized),
+                    ))
+                self.assertLessEqual(
+                    capture.time_ms, budget['max_time_ms'],
+                    '%s spent %.1f ms in SQL (budget %d ms)' % (key, capture.time_ms, budget['max_time_ms']),
+                )
+
+    def test_anonymous_budgets(self):
+        self.check_routes('anonymous')
+
+    def test_librarian_budgets(self):
+        self.client.force_login(self.dataset['librarian'])
+        self.check_routes('librarian')
+
+    def test_every_budget_matches_a_route(self):
+        if UPDATE_BUDGETS:
+            self.skipTest('regenerating budgets')
+        names = {name for name, url in self.routes}
+        stale = [key for key in self.budgets if key.split(':', 1)[1] not in names]
+        self.assertEqual(stale, [], 'budgets for routes that no longer exist')
@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from catalog import search
+from catalog.models import Author, Book, Genre
+
+
+class BookSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.other_author = Author.objects.create(first_name='Isaac', last_name='Asimov')
+        cls.genre = Genre.objects.create(name='Ciencia Ficción')
+        cls.dragons = Book.objects.create(
+            title='A Wizard of Earthsea', summary='A young mage and a shadow.', isbn='1', author=cls.author,
+        )
+        cls.robots = Book.objects.create(
+            title='I, Robot', summary='Stories about robots and wizardry.', isbn='2', author=cls.other_author,
+        )
+        cls.robots.genre.add(cls.genre)
+
+    def test_matches_title_author_and_genre(self):
+        self.assertEqual(search.search('earthsea'), [self.dragons.pk])
+        self.assertEqual(search.search('guin'), [self.dragons.pk])
+        self.assertEqual(search.search('ficcion'), [self.robots.pk])
+
+    def test_prefix_and_all_terms_required(self):
+        self.assertEqual(search.search('asim robo'), [self.robots.pk])
+        self.assertEqual(search.search('asimov earthsea'), [])
+
+    def test_title_ranks_above_summary(self):
+        self.assertEqual(search.search('wizard'), [self.dragons.pk, self.robots.pk])
+
+    def test_user_input_is_not_fts_syntax(self):
+        self.assertEqual(search.search('"robot"* ('), [self.robots.pk])
+        self.assertEqual(search.search('  ***  '), [])
+
+    def test_index_follows_changes(self):
+        self.author.last_name = 'LeGuin'
+        self.author.save()
+        self.assertEqual(search.search('leguin'), [self.dragons.pk])
+
+        self.dragons.genre.add(self.genre)
+        self.assertCountEqual(search.search('ficcion'), [self.dragons.pk, self.robots.pk])
+
+        self.genre.name = 'Fantasía'
+        self.genre.save()
+        self.assertCountEqual(search.search('fantasia'), [self.dragons.pk, self.robots.pk])
+
+        self.genre.book_set.clear()
+        self.assertEqual(search.search('fantasia'), [])
+
+        self.robots.delete()
+        self.assertEqual(search.search('robot'), [])
+
+    def test_deleting_author_reindexes_books(self):
+        self.other_author.delete()
+        self.assertEqual(search.search('asimov'), [])
+        self.assertEqual(search.search('robot'), [self.robots.pk])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % search.FTS_TABLE)
+        self.assertEqual(search.search('robot'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(search.search('robot'), [self.robots.pk])
+
+    def test_search_view(self):
+        response = self.client.get(reverse('search'), {'q': 'robot'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/search_results.html')
+        self.assertEqual(response.context['book_list'], [self.robots])
+        self.assertFalse(response.context['has_next'])
+
+    def test_search_view_paginates(self):
+        for i in range(11):
+            Book.objects.create(title=f'Robot {i}', summary='Summary', isbn='3', author=self.author)
+        response = self.client.get(reverse('search'), {'q': 'robot'})
+        self.assertEqual(len(response.context['book_list']), 10)
+        self.assertTrue(response.context['has_next'])
+        response = self.client.get(reverse('search'), {'q': 'robot', 'page': 2})
+        self.assertEqual(len(response.context['book_list']), 2)
+        self.assertFalse(response.context['has_next'])
+
+
+class SearchIndexMigrationTest(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('catalog', target)])
+        return executor.loader.project_state(('catalog', target)).apps
+
+    def test_migration_indexes_existing_books(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Se comprueba la tabla FTS5 de SQLite.')
+        latest = MigrationExecutor(connection).loader.graph.leaf_nodes('catalog')[0][1]
+        apps = self.migrate('0002_alter_author_options_alter_bookinstance_options_and_more')
+        try:
+            author = apps.get_model('catalog', 'Author').objects.create(first_name='Ursula', last_name='Le Guin')
+            book = apps.get_model('catalog', 'Book').objects.create(
+                title='Earthsea', summary='Wizards', isbn='1', author=author,
+            )
+            book.genre.create(name='Fantasy')
+            self.migrate('0003_book_search_index')
+            self.assertEqual(search.search('guin fantasy'), [book.pk])
+        finally:
+            self.migrate(latest)
@@ -1,15 +1,18 @@
-from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 import datetime
 import uuid
 
+from catalog import counters
 from catalog.models import Author, Book, BookInstance, Genre
+from catalog.testing import CatalogTestCase
 
 User = get_user_model()
 
-class AuthorListViewTest(TestCase):
+class AuthorListViewTest(CatalogTestCase):
     @classmethod
     def setUpTestData(cls):
         # Crear 13 autores para pruebas de paginación
@@ -41,14 +44,48 @@ class AuthorListViewTest(TestCase):
         self.assertEqual(len(response.context['author_list']), 10)
 
     def test_lists_all_authors(self):
-        # Obtener segunda página y confirmar que tiene 3 elementos restantes
-        response = self.client.get(reverse('authors') + '?page=2')
+        # Seguir el cursor a la segunda página y confirmar que tiene 3 elementos restantes
+        response = self.client.get(reverse('authors'))
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('authors'), {'cursor': next_cursor})
         self.assertEqual(response.status_code, 200)
         self.assertTrue('is_paginated' in response.context)
         self.assertTrue(response.context['is_paginated'] == True)
         self.assertEqual(len(response.context['author_list']), 3)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_previous_cursor_returns_first_page(self):
+        first = self.client.get(reverse('authors'))
+        second = self.client.get(reverse('authors'), {'cursor': first.context['page_obj'].next_cursor})
+        back = self.client.get(reverse('authors'), {'cursor': second.context['page_obj'].previous_cursor})
+        self.assertEqual(list(back.context['author_list']), list(first.context['author_list']))
+        self.assertFalse(back.context['page_obj'].has_previous())
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('authors'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+class BookListViewTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i, statuses in enumerate(['', 'ao', 'aam', 'o']):
+            book = Book.objects.create(title=f'Book {i}', summary='Summary', isbn=f'{i}')
+            for status in statuses:
+                BookInstance.objects.create(book=book, imprint='Imprint', status=status)
 
-class LoanedBookInstancesByUserListViewTest(TestCase):
+    def test_shows_availability_without_loading_copies(self):
+        counters.rebuild()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('books'))
+        self.assertContains(response, '2 de 3 copias disponibles')
+        self.assertFalse(any('catalog_bookinstance' in query['sql'] for query in queries.captured_queries))
+
+    def test_sort_by_availability(self):
+        response = self.client.get(reverse('books') + '?sort=available')
+        self.assertEqual([book.title for book in response.context['book_list']], ['Book 2', 'Book 1', 'Book 0', 'Book 3'])
+
+
+class LoanedBookInstancesByUserListViewTest(CatalogTestCase):
     def setUp(self):
         # Crear dos usuarios
         test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
@@ -127,7 +164,7 @@ class LoanedBookInstancesByUserListViewTest(TestCase):
             self.assertEqual(response.context['user'], book_item.borrower)
             self.assertEqual(book_item.status, 'o')
 
-class RenewBookInstancesViewTest(TestCase):
+class RenewBookInstancesViewTest(CatalogTestCase):
     def setUp(self):
         # Crear usuarios
         test_user1 = User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
@@ -225,6 +262,18 @@ class RenewBookInstancesViewTest(TestCase):
         )
         self.assertRedirects(response, reverse('all-borrowed'))
 
+    def test_renewing_a_returned_copy_shows_an_error(self):
+        login = self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
+        # Otro bibliotecario lo devolvió entre el GET y el POST.
+        BookInstance.objects.filter(pk=self.test_bookinstance1.pk).update(status='a', borrower=None, due_back=None)
+        response = self.client.post(
+            reverse('renew-book-librarian', kwargs={'pk': self.test_bookinstance1.pk}),
+            {'renewal_date': datetime.date.today() + datetime.timedelta(weeks=2)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no está prestado', response.context['form'].non_field_errors()[0])
+        self.assertIsNone(BookInstance.objects.get(pk=self.test_bookinstance1.pk).due_back)
+
     def test_form_invalid_renewal_date_past(self):
         login = self.client.login(username='testuser2', password='2HJ1vRV0Z&3iD')
         date_in_past = datetime.date.today() - datetime.timedelta(weeks=1)
@@ -246,7 +295,65 @@ class RenewBookInstancesViewTest(TestCase):
         self.assertFormError(response.context['form'], 'renewal_date', 'Invalid date - renewal more than 4 weeks ahead')
 
 # DESAFÍO: Pruebas para AuthorCreate view
-class AuthorCreateViewTest(TestCase):
+class BulkLoansViewTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1')
+        cls.copies = [
+            BookInstance.objects.create(
+                book=book, imprint='Imprint', status='o', borrower=cls.librarian, due_back=datetime.date.today(),
+            )
+            for _ in range(3)
+        ]
+
+    def post(self, **data):
+        self.client.force_login(self.librarian)
+        return self.client.post(reverse('bulk-loans'), {'copies': [copy.pk for copy in self.copies], **data}, follow=True)
+
+    def test_forbidden_without_permission(self):
+        self.client.force_login(User.objects.create_user(username='patron'))
+        response = self.client.post(reverse('bulk-loans'), {'copies': [self.copies[0].pk], 'action': 'return'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_list_has_checkboxes(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('all-borrowed'))
+        self.assertContains(response, 'name="copies" value="%s"' % self.copies[0].pk)
+
+    def test_overdue_flag_comes_from_the_query(self):
+        BookInstance.objects.filter(pk=self.copies[0].pk).update(due_back=datetime.date.today() - datetime.timedelta(days=1))
+        self.client.force_login(self.librarian)
+        for url in (reverse('all-borrowed'), reverse('my-borrowed')):
+            response = self.client.get(url)
+            flags = {copy.pk: copy.__dict__.get('_is_overdue') for copy in response.context['bookinstance_list']}
+            self.assertEqual(flags, {copy.pk: copy == self.copies[0] for copy in self.copies})
+            self.assertContains(response, 'class="text-danger"', count=1)
+
+    def test_bulk_renew_in_one_update(self):
+        due_back = datetime.date.today() + datetime.timedelta(weeks=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(action='renew', renewal_date=due_back)
+        self.assertRedirects(response, reverse('all-borrowed'))
+        self.assertContains(response, 'Renovados 3 préstamos')
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "catalog_bookinstance"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(BookInstance.objects.values_list('due_back', flat=True)), {due_back})
+
+    def test_bulk_renew_validates_the_date(self):
+        response = self.post(action='renew', renewal_date=datetime.date.today() - datetime.timedelta(days=1))
+        self.assertContains(response, 'Invalid date - renewal in past')
+        self.assertEqual(set(BookInstance.objects.values_list('due_back', flat=True)), {datetime.date.today()})
+
+    def test_bulk_return(self):
+        BookInstance.objects.filter(pk=self.copies[0].pk).update(status='a', borrower=None, due_back=None)
+        response = self.post(action='return')
+        self.assertContains(response, 'Devueltos 2 ejemplares. 1 de los seleccionados no estaban prestados.')
+        self.assertFalse(BookInstance.objects.on_loan().exists())
+
+
+class AuthorCreateViewTest(CatalogTestCase):
     def setUp(self):
         # Crear un usuario con permisos para añadir autores
         test_user = User.objects.create_user(username='testuser', password='testpass123')
@@ -285,4 +392,98 @@ class AuthorCreateViewTest(TestCase):
         response = self.client.get(reverse('author-create'))
         self.assertEqual(response.status_code, 200)
         # Verificar que el campo date_of_death tiene un valor inicial
-        self.assertIn('date_of_death', response.context['form'].initial)
\ No newline at end of file
+        self.assertIn('date_of_death', response.context['form'].initial)
+
+class CatalogViewsQueryCountTest(CatalogTestCase):
+    """Las vistas del catálogo deben usar un número fijo de consultas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        cls.genres = [Genre.objects.create(name=f'Genre {i}') for i in range(3)]
+
+    def create_books(self, number_of_books, copies_per_book):
+        for i in range(number_of_books):
+            author = Author.objects.create(first_name=f'First {i}', last_name=f'Last {i}')
+            book = Book.objects.create(title=f'Book {i}', summary='Summary', isbn=f'{i}', author=author)
+            book.genre.set(self.genres)
+            for copy in range(copies_per_book):
+                BookInstance.objects.create(
+                    book=book,
+                    imprint='Imprint',
+                    status='o',
+                    borrower=self.librarian,
+                    due_back=datetime.date.today() + datetime.timedelta(days=copy),
+                )
+        return book
+
+    def count_queries(self, url):
+        self.client.force_login(self.librarian)
+        # Contadores del catálogo ya en la cache, como en estado estable.
+        counters.rebuild()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url_for):
+        book = self.create_books(1, 1)
+        small = self.count_queries(url_for(book))
+        book = self.create_books(9, 5)
+        large = self.count_queries(url_for(book))
+        self.assertEqual(small, large)
+
+    def test_book_list(self):
+        self.assertConstantQueries(lambda book: reverse('books'))
+
+    def test_book_detail(self):
+        self.assertConstantQueries(lambda book: book.get_absolute_url())
+
+    def test_author_detail(self):
+        def url_for(book):
+            for i in range(4):
+                Book.objects.create(title=f'Extra {i}', summary='Summary', isbn='1', author=book.author)
+            return book.author.get_absolute_url()
+        self.assertConstantQueries(url_for)
+
+    def test_all_borrowed(self):
+        self.assertConstantQueries(lambda book: reverse('all-borrowed'))
+
+    def test_my_borrowed(self):
+        self.assertConstantQueries(lambda book: reverse('my-borrowed'))
+
+
+class OverdueReportViewTest(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        test_author = Author.objects.create(first_name='John', last_name='Doe')
+        test_book = Book.objects.create(title='Book Title', summary='Summary', isbn='1', author=test_author)
+        today = datetime.date.today()
+        for days_late in (1, 7, 8, 30, 45, 200, 0, -5):
+            BookInstance.objects.create(
+                book=test_book, imprint='Imprint', status='o', borrower=cls.librarian,
+                due_back=today - datetime.timedelta(days=days_late),
+            )
+
+    def test_forbidden_without_permission(self):
+        User.objects.create_user(username='patron', password='2HJ1vRV0Z&3iD')
+        self.client.login(username='patron', password='2HJ1vRV0Z&3iD')
+        self.assertEqual(self.client.get(reverse('overdue-report')).status_code, 403)
+
+    def test_report_lists_and_groups_overdue_copies(self):
+        self.client.force_login(self.librarian)
+        response = self.client.get(reverse('overdue-report'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/overdue_report.html')
+        self.assertEqual(len(response.context['overdue_list']), 6)
+        self.assertEqual(response.context['overdue_total'], 6)
+        self.assertEqual(
+            response.context['overdue_buckets'],
+            [('1-7', 2), ('8-14', 1), ('15-30', 1), ('31-90', 1), ('90+', 1)],
+        )
+        # Del más atrasado al más reciente
+        due_dates = [copy.due_back for copy in response.context['overdue_list']]
+        self.assertEqual(due_dates, sorted(due_dates))
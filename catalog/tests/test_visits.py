@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import checks
+from catalog.testing import CatalogTestCase
+
+
+class VisitCounterTest(CatalogTestCase):
+    def visit(self, times):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(times):
+                response = self.client.get(reverse('index'))
+        writes = [q for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE')) and 'django_session' in q['sql']]
+        return response, len(writes)
+
+    @override_settings(CATALOG_VISITS_FLUSH_EVERY=5)
+    def test_counts_every_visit_but_writes_in_batches(self):
+        response, writes = self.visit(11)
+        self.assertEqual(response.context['num_visits'], 11)
+        # Primera visita (crea la sesión) y dos volcados a las 6 y 11 visitas.
+        self.assertEqual(writes, 3)
+        self.assertEqual(self.client.session['num_visits'], 11)
+
+    @override_settings(CATALOG_VISITS_FLUSH_EVERY=1)
+    def test_flush_every_one_writes_every_visit(self):
+        response, writes = self.visit(4)
+        self.assertEqual(response.context['num_visits'], 4)
+        self.assertEqual(writes, 4)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        response, writes = self.visit(3)
+        self.assertEqual(response.context['num_visits'], 3)
+        self.assertEqual(writes, 0)
+
+    def test_bench_visits_command(self):
+        out = StringIO()
+        call_command('bench_visits', requests=20, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('20 escrituras / 20 visitas', lines[0])
+        self.assertIn(' 0 escrituras', lines[2])
+
+
+class SessionCacheCheckTest(CatalogTestCase):
+    def test_default_settings_do_not_cache_sessions_per_process(self):
+        self.assertEqual(checks.check_session_cache(None), [])
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    def test_cached_db_sessions_need_a_shared_cache(self):
+        self.assertEqual([error.id for error in checks.check_session_cache(None)], ['catalog.W002'])
@@ -1,19 +1,40 @@
-
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+
+def build_urlpatterns(read_views):
+    """
+    Rutas del catálogo. ``read_views`` es el módulo con las páginas de lectura:
+    catalog.views (WSGI) o catalog.async_views (ASGI).
+    """
+    return [
+        path('', read_views.index, name='index'),
+        path('books/', read_views.BookListView.as_view(), name='books'),
+        path('book/<int:pk>', read_views.BookDetailView.as_view(), name='book-detail'),
+        path('search/', views.search_books, name='search'),
+        path('mybooks/', read_views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+        path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+
+        path('all-borrowed/', read_views.AllLoanedBooksListView.as_view(), name='all-borrowed'),
+        path('all-borrowed/bulk/', views.bulk_loans, name='bulk-loans'),
+        path('overdue/', views.OverdueReportView.as_view(), name='overdue-report'),
+        path('export/books/', views.export_books, name='export-books'),
+        path('export/loans/', views.export_loans, name='export-loans'),
+        path('authors/', read_views.AuthorListView.as_view(), name='authors'),
+        path('author/<int:pk>', read_views.AuthorDetailView.as_view(), name='author-detail'),
+        path('author/create/', views.AuthorCreate.as_view(), name='author-create'),
+        path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author-update'),
+        path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author-delete'),
+
+        path('api/books/', api.BookList.as_view(), name='api-books'),
+        path('api/books/<int:pk>/', api.BookDetail.as_view(), name='api-book'),
+        path('api/books/<int:pk>/copies/', api.BookCopyList.as_view(), name='api-book-copies'),
+        path('api/authors/', api.AuthorList.as_view(), name='api-authors'),
+        path('api/authors/<int:pk>/', api.AuthorDetail.as_view(), name='api-author'),
+        path('api/genres/', api.GenreList.as_view(), name='api-genres'),
+
+    ]
 
-urlpatterns = [
-    path('', views.index, name='index'),
-    path('books/', views.BookListView.as_view(), name='books'),
-    path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
-    path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
-    path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
-    
-    path('all-borrowed/', views.AllLoanedBooksListView.as_view(), name='all-borrowed'),
-    path('authors/', views.AuthorListView.as_view(), name='authors'),
-    path('author/<int:pk>', views.AuthorDetailView.as_view(), name='author-detail'),
-    path('author/create/', views.AuthorCreate.as_view(), name='author-create'),
-    path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author-update'),
-    path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author-delete'),
 
-]
+urlpatterns = build_urlpatterns(async_views if settings.CATALOG_ASYNC_VIEWS else views)
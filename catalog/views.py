@@ -1,50 +1,131 @@
 from django.shortcuts import render
 from django.views import generic
+from django.db.models import Count, Prefetch, Q
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 # Create your views here.
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
+from django.views.decorators.http import require_POST
 from .models import Book, Author, BookInstance, Genre
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponseRedirect
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse
 import datetime
 from .forms import RenewBookForm
-from .forms import RenewBookModelForm
+from .forms import BulkLoanForm
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import PermissionRequiredMixin
+from . import conditional, counters, exports, loans, search, visits
+from .conditional import ConditionalGetMixin
+from .pagination import CursorPaginationMixin
+from .page_cache import CachedPageMixin
+from . import page_cache
 
 
 def index(request):
     """
     Función vista para la página inicio del sitio.
     """
-    # Genera contadores de algunos de los objetos principales
-    num_books=Book.objects.all().count()
-    num_instances=BookInstance.objects.all().count()
-    # Libros disponibles (status = 'a')
-    num_instances_available=BookInstance.objects.filter(status__exact='a').count()
-    num_authors=Author.objects.count()  # El 'all()' esta implícito por defecto.
-    num_visits = request.session.get('num_visits', 0)
-    num_visits += 1
-    request.session['num_visits'] = num_visits
+    # Contadores de los objetos principales (desde la cache, ver catalog/counters.py)
+    catalog_counters = counters.get_counters()
+    # Visitas de la sesión, con escrituras agrupadas (ver catalog/visits.py)
+    num_visits = visits.record_visit(request)
 
     # Renderiza la plantilla HTML index.html con los datos en la variable contexto
-    return render(
-        request,
-        'index.html',
-        context={'num_books':num_books,'num_instances':num_instances,'num_instances_available':num_instances_available,'num_authors':num_authors, 'num_visits': num_visits,},
-    )
-class BookListView(generic.ListView):
+    return render(request, 'index.html', context=index_context(catalog_counters, num_visits))
+
+
+def index_context(catalog_counters, num_visits):
+    return {
+        'num_books': catalog_counters['num_books'],
+        'num_instances': catalog_counters['num_instances'],
+        # Libros disponibles (status = 'a')
+        'num_instances_available': catalog_counters['num_instances_available'],
+        'num_authors': catalog_counters['num_authors'],
+        'num_visits': num_visits,
+    }
+
+
+class BookListView(CachedPageMixin, ConditionalGetMixin, CursorPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 10
+    cursor_ordering = ['title']
+    # ?sort=available: primero los libros con más ejemplares disponibles (índice book_available_idx)
+    sort_orderings = {'available': ['-copies_available', 'title']}
+
+    def get_cache_dependencies(self):
+        return [page_cache.BOOK_LIST]
+
+    def get_validators(self):
+        return conditional.book_list_validators(self.request)
 
-class BookDetailView(generic.DetailView):
+    def get_cursor_ordering(self):
+        return self.sort_orderings.get(self.request.GET.get('sort'), self.cursor_ordering)
+
+    def get_queryset(self):
+        # Autor en el mismo JOIN y sólo las columnas que usa book_list.html
+        return (
+            Book.objects.select_related('author')
+            .only('id', 'title', 'copies_total', 'copies_available', 'author__first_name', 'author__last_name')
+        )
+
+class BookDetailView(CachedPageMixin, ConditionalGetMixin, generic.DetailView):
     model = Book
 
+    def get_cache_dependencies(self):
+        return [page_cache.book_key(self.kwargs['pk'])]
+
+    def get_validators(self):
+        return conditional.book_page_validators(self.request, self.kwargs['pk'])
+
+    def get_queryset(self):
+        # Géneros y ejemplares en dos consultas fijas, sin importar cuántas copias haya
+        return Book.objects.select_related('author').prefetch_related(
+            Prefetch('genre', queryset=Genre.objects.only('id', 'name')),
+            Prefetch(
+                'bookinstance_set',
+                queryset=BookInstance.objects.only('id', 'book_id', 'status', 'due_back', 'imprint'),
+            ),
+        )
+
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+def search_books(request):
+    """
+    Búsqueda de texto completo sobre título, resumen, autor y géneros (ver catalog/search.py).
+    """
+    query = request.GET.get('q', '').strip()
+    per_page = 10
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    book_list = []
+    has_next = False
+    if query:
+        # Pedimos un resultado extra para saber si hay página siguiente sin contar
+        ids = search.search(query, limit=per_page + 1, offset=(page - 1) * per_page)
+        has_next = len(ids) > per_page
+        ids = ids[:per_page]
+        books = Book.objects.select_related('author').only(
+            'id', 'title', 'author__first_name', 'author__last_name'
+        ).in_bulk(ids)
+        book_list = [books[pk] for pk in ids if pk in books]
+
+    context = {
+        'query': query,
+        'book_list': book_list,
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': has_next,
+    }
+    return render(request, 'catalog/search_results.html', context)
+
+
+class LoanedBooksByUserListView(LoginRequiredMixin, CursorPaginationMixin, generic.ListView):
     """Vista para listar libros prestados al usuario actual."""
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
@@ -55,14 +136,16 @@ class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
             borrower=self.request.user
         ).filter(
             status__exact='o'
-        ).order_by('due_back')
+        ).select_related('book').only(
+            'id', 'due_back', 'book__id', 'book__title'
+        ).with_is_overdue().order_by('due_back')
     
 
 @login_required
 @permission_required('catalog.can_mark_returned', raise_exception=True)
 def renew_book_librarian(request, pk):
     """View function for renewing a specific BookInstance by librarian."""
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book', 'borrower'), pk=pk)
 
     # Si es POST request, procesar datos del formulario
     if request.method == 'POST':
@@ -70,10 +153,13 @@ def renew_book_librarian(request, pk):
         form = RenewBookForm(request.POST)  # Asegúrate de usar RenewBookForm
         
         if form.is_valid():
-            # Procesar los datos en form.cleaned_data
-            book_instance.due_back = form.cleaned_data['renewal_date']  # Usar 'renewal_date'
-            book_instance.save()
-            return HttpResponseRedirect(reverse('all-borrowed'))
+            # Un UPDATE condicional: falla si otro bibliotecario lo devolvió mientras tanto.
+            try:
+                loans.renew(book_instance.pk, form.cleaned_data['renewal_date'])
+            except loans.CopyNotOnLoan as e:
+                form.add_error(None, str(e))
+            else:
+                return HttpResponseRedirect(reverse('all-borrowed'))
     
     # Si es GET (o cualquier otro método) crear formulario por defecto
     else:
@@ -87,25 +173,133 @@ def renew_book_librarian(request, pk):
     
     return render(request, 'catalog/book_renew_librarian.html', context)
 
-class AuthorListView(generic.ListView):
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+@require_POST
+def bulk_loans(request):
+    """Renueva o devuelve de una vez los ejemplares marcados en la lista de préstamos."""
+    form = BulkLoanForm(request.POST)
+    if form.is_valid():
+        messages.success(request, form.save())
+    else:
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+    return HttpResponseRedirect(reverse('all-borrowed'))
+
+
+def _export(request, kind):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        raise Http404('Unknown export format')
+    compress = request.GET.get('gzip') == '1'
+    stream = exports.astream if isinstance(request, ASGIRequest) else exports.stream
+    response = StreamingHttpResponse(
+        stream(kind, fmt, compress=compress),
+        content_type=exports.content_type(fmt, compress),
+    )
+    response['Content-Disposition'] = 'attachment; filename="%s"' % exports.filename(kind, fmt, compress)
+    return response
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def export_books(request):
+    """Exporta todo el catálogo en flujo (?format=csv|jsonl, ?gzip=1)."""
+    return _export(request, 'books')
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def export_loans(request):
+    """Exporta todos los ejemplares con su estado y prestatario en flujo."""
+    return _export(request, 'loans')
+
+
+class AuthorListView(CachedPageMixin, ConditionalGetMixin, CursorPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
 
-# VISTA PARA DETALLE DE AUTOR (FALTANTE)  
-class AuthorDetailView(generic.DetailView):
+    def get_cache_dependencies(self):
+        return [page_cache.AUTHOR_LIST]
+
+    def get_validators(self):
+        return conditional.author_list_validators(self.request)
+
+    def get_queryset(self):
+        return Author.objects.only('id', 'first_name', 'last_name')
+
+class AuthorDetailView(CachedPageMixin, ConditionalGetMixin, generic.DetailView):
     model = Author
 
-# VISTA PARA TODOS LOS LIBROS PRESTADOS (FALTANTE)
-class AllLoanedBooksListView(PermissionRequiredMixin, generic.ListView):
+    def get_cache_dependencies(self):
+        return [page_cache.author_key(self.kwargs['pk'])]
+
+    def get_validators(self):
+        return conditional.author_page_validators(self.request, self.kwargs['pk'])
+
+    def get_queryset(self):
+        return Author.objects.prefetch_related(
+            Prefetch('book_set', queryset=Book.objects.only('id', 'author_id', 'title', 'summary'))
+        )
+
+class AllLoanedBooksListView(PermissionRequiredMixin, CursorPaginationMixin, generic.ListView):
     permission_required = 'catalog.can_mark_returned'
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_all.html'
     paginate_by = 10
     
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        return BookInstance.objects.filter(status__exact='o').select_related(
+            'book', 'borrower'
+        ).only(
+            'id', 'due_back', 'book__id', 'book__title', 'borrower__username'
+        ).with_is_overdue().order_by('due_back')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['proposed_renewal_date'] = datetime.date.today() + loans.LOAN_PERIOD
+        return context
     
 
+class OverdueReportView(PermissionRequiredMixin, CursorPaginationMixin, generic.ListView):
+    """Informe de ejemplares vencidos, del más antiguo al más reciente, con conteos por antigüedad."""
+    permission_required = 'catalog.can_mark_returned'
+    model = BookInstance
+    template_name = 'catalog/overdue_report.html'
+    context_object_name = 'overdue_list'
+    paginate_by = 20
+
+    # (etiqueta, días mínimos, días máximos) de atraso
+    OVERDUE_BUCKETS = (
+        ('1-7', 1, 7),
+        ('8-14', 8, 14),
+        ('15-30', 15, 30),
+        ('31-90', 31, 90),
+        ('90+', 91, None),
+    )
+
+    def get_queryset(self):
+        self.today = datetime.date.today()
+        return BookInstance.objects.overdue(self.today).select_related('book', 'borrower').only(
+            'id', 'due_back', 'book__id', 'book__title', 'borrower__username'
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Todos los conteos en una sola consulta agregada sobre el índice de préstamos
+        aggregates = {'total': Count('pk')}
+        for label, min_days, max_days in self.OVERDUE_BUCKETS:
+            condition = Q(due_back__lte=self.today - datetime.timedelta(days=min_days))
+            if max_days is not None:
+                condition &= Q(due_back__gte=self.today - datetime.timedelta(days=max_days))
+            aggregates[label] = Count('pk', filter=condition)
+        counts = BookInstance.objects.overdue(self.today).aggregate(**aggregates)
+        context['overdue_total'] = counts['total']
+        context['overdue_buckets'] = [(label, counts[label]) for label, *days in self.OVERDUE_BUCKETS]
+        return context
+
+
 class AuthorCreate(PermissionRequiredMixin, CreateView):
     model = Author
     fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
@@ -120,4 +314,10 @@ class AuthorUpdate(PermissionRequiredMixin, UpdateView):
 class AuthorDelete(PermissionRequiredMixin, DeleteView):
     model = Author
     success_url = reverse_lazy('authors')
-    permission_required = 'catalog.delete_author'
\ No newline at end of file
+    permission_required = 'catalog.delete_author'
+
+    def get_queryset(self):
+        # author_confirm_delete.html recorre author.book_set.all dos veces
+        return Author.objects.prefetch_related(
+            Prefetch('book_set', queryset=Book.objects.only('id', 'author_id', 'title'))
+        )
\ No newline at end of file
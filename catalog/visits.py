@@ -0,0 +1,57 @@
+"""
+Contador de visitas a la página de inicio con escrituras agrupadas.
+
+En lugar de guardar la sesión en cada visita, los incrementos se acumulan en la cache
+(una clave por sesión) y se vuelcan a ``request.session['num_visits']`` cada
+``CATALOG_VISITS_FLUSH_EVERY`` visitas. Así la tabla de sesiones recibe una escritura
+por cada N visitas en lugar de una por visita. Si la cache pierde la clave se pierden,
+como mucho, N-1 visitas del contador, que es sólo informativo.
+
+Con sesiones en cookies firmadas (SESSION_ENGINE = signed_cookies) no hay escrituras en
+la base de datos, así que el contador se guarda directamente en la sesión.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'catalog:visits:'
+CACHE_TIMEOUT = 60 * 60 * 24 * 14  # Igual que SESSION_COOKIE_AGE por defecto
+
+
+def flush_every():
+    return getattr(settings, 'CATALOG_VISITS_FLUSH_EVERY', 10)
+
+
+def _uses_cookie_sessions():
+    return settings.SESSION_ENGINE.endswith('signed_cookies')
+
+
+def record_visit(request):
+    """
+    Cuenta una visita de la sesión actual y devuelve el total.
+    """
+    session = request.session
+    stored = session.get('num_visits', 0)
+    # Primera visita (todavía no hay sesión que identificar) o sin agrupación: se escribe ya.
+    if flush_every() <= 1 or session.session_key is None or _uses_cookie_sessions():
+        session['num_visits'] = stored + 1
+        return stored + 1
+
+    key = CACHE_PREFIX + session.session_key
+    if cache.add(key, 1, CACHE_TIMEOUT):
+        pending = 1
+    else:
+        try:
+            pending = cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, CACHE_TIMEOUT)
+            pending = 1
+
+    total = stored + pending
+    if pending >= flush_every():
+        session['num_visits'] = total
+        # decr y no delete: conserva los incrementos concurrentes que llegaron mientras tanto.
+        try:
+            cache.decr(key, pending)
+        except ValueError:
+            pass
+    return total
@@ -0,0 +1,24 @@
+"""
+Configuración de gunicorn (se carga sola al arrancar desde este directorio).
+
+Prepara el modo multiproceso de las métricas (catalog/metrics.py): cada worker guarda
+sus valores en PROMETHEUS_MULTIPROC_DIR y /metrics los suma.
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'locallibrary-metrics'))
+
+
+def on_starting(server):
+    # Los archivos de una ejecución anterior sumarían peticiones que ya no existen.
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -39,3 +39,8 @@ urlpatterns += [
     path('accounts/', include('django.contrib.auth.urls')),
 ]
 
+from catalog.metrics import metrics_view
+urlpatterns += [
+    path('metrics', metrics_view, name='metrics'),
+]
+